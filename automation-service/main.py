@@ -1,15 +1,23 @@
 """
 Automation Service for AppTrove Link Creation
 Separate service to handle browser automation (Playwright)
+Thin HTTP front for the automation engine shared with the backend
+(backend/apptrove_automation.py), run in dedicated worker processes.
 """
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from playwright.async_api import async_playwright
+from typing import List
 import os
+import sys
 from datetime import datetime
 
+# The automation engine is shared with the backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from automation_workers import AUTOMATION_WORKERS, AutomationWorkerPool
+from link_driver import template_url
+
 app = FastAPI(title="AppTrove Automation Service")
 
 # CORS
@@ -24,14 +32,53 @@ app.add_middleware(
 # Environment variables
 APPTROVE_DASHBOARD_EMAIL = os.getenv("APPTROVE_DASHBOARD_EMAIL")
 APPTROVE_DASHBOARD_PASSWORD = os.getenv("APPTROVE_DASHBOARD_PASSWORD")
+APPTROVE_COOKIES_FILE = os.getenv("APPTROVE_COOKIES_FILE", "apptrove_cookies.json")
 API_KEY = os.getenv("AUTOMATION_API_KEY", "change-me-in-production")
 
+if AUTOMATION_WORKERS > 0:
+    engine = AutomationWorkerPool(AUTOMATION_WORKERS)
+else:
+    import apptrove_automation as engine
+
 class CreateLinkRequest(BaseModel):
     template_id: str
     link_name: str
     campaign: str
     api_key: str
 
+class BatchLink(BaseModel):
+    link_name: str
+    campaign: str
+
+class CreateLinksBatchRequest(BaseModel):
+    template_id: str
+    links: List[BatchLink]
+    api_key: str
+
+def credentials_configured():
+    return bool(os.path.exists(APPTROVE_COOKIES_FILE) or APPTROVE_DASHBOARD_EMAIL)
+
+def check_request(api_key: str):
+    # Verify API key
+    if api_key != API_KEY:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+    # Check credentials
+    if not credentials_configured():
+        raise HTTPException(
+            status_code=500,
+            detail="AppTrove dashboard credentials not configured"
+        )
+
+@app.on_event("startup")
+async def warm_engine():
+    if credentials_configured():
+        await engine.start()
+
+@app.on_event("shutdown")
+async def stop_engine():
+    await engine.stop()
+
 @app.get("/")
 async def root():
     return {
@@ -45,7 +92,8 @@ async def health():
     return {
         "status": "ok",
         "timestamp": datetime.utcnow().isoformat(),
-        "credentials_configured": bool(APPTROVE_DASHBOARD_EMAIL and APPTROVE_DASHBOARD_PASSWORD)
+        "credentials_configured": credentials_configured(),
+        "automation": await engine.status()
     }
 
 @app.post("/create-link")
@@ -53,119 +101,34 @@ async def create_link(request: CreateLinkRequest):
     """
     Create AppTrove link via browser automation
     """
-    # Verify API key
-    if request.api_key != API_KEY:
-        raise HTTPException(status_code=401, detail="Invalid API key")
-    
-    # Check credentials
-    if not APPTROVE_DASHBOARD_EMAIL or not APPTROVE_DASHBOARD_PASSWORD:
-        raise HTTPException(
-            status_code=500,
-            detail="AppTrove dashboard credentials not configured"
-        )
-    
-    async with async_playwright() as p:
-        browser = None
-        try:
-            # Launch browser
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            print(f"[{datetime.utcnow().isoformat()}] Creating link: {request.link_name}")
-            
-            # Login to AppTrove
-            print("→ Logging in to AppTrove...")
-            await page.goto('https://dashboard.apptrove.com/login', timeout=30000)
-            await page.fill('input[type="email"]', APPTROVE_DASHBOARD_EMAIL)
-            await page.fill('input[type="password"]', APPTROVE_DASHBOARD_PASSWORD)
-            await page.click('button[type="submit"]')
-            await page.wait_for_url('**/dashboard', timeout=30000)
-            print("✓ Logged in")
-            
-            # Navigate to template
-            print(f"→ Opening template {request.template_id}...")
-            await page.goto(f'https://dashboard.apptrove.com/v2/app/{request.template_id}')
-            await page.wait_for_load_state('networkidle', timeout=30000)
-            print("✓ Template loaded")
-            
-            # Click "Add Link" button
-            print("→ Clicking Add Link...")
-            await page.click('button:has-text("Add Link"), a:has-text("Add Link")')
-            await page.wait_for_timeout(2000)
-            print("✓ Form opened")
-            
-            # Fill form - Step 1: Basic Details
-            print("→ Filling form...")
-            inputs = await page.locator('input[type="text"]').all()
-            if len(inputs) >= 3:
-                await inputs[0].fill(request.link_name)  # Link Name
-                await inputs[1].fill(request.campaign)    # Campaign
-                await inputs[2].fill(request.campaign)    # Deep Linking
-                print(f"✓ Filled: name={request.link_name}, campaign={request.campaign}")
-            
-            # Click Next
-            await page.click('button:has-text("Next")')
-            await page.wait_for_timeout(2000)
-            
-            # Step 2: Advanced Settings (skip)
-            await page.click('button:has-text("Next")')
-            await page.wait_for_timeout(2000)
-            
-            # Step 3: Redirection (submit)
-            print("→ Submitting...")
-            await page.click('button:has-text("Create"), button:has-text("Submit")')
-            await page.wait_for_timeout(5000)
-            print("✓ Submitted")
-            
-            # Extract created link
-            print("→ Extracting link URL...")
-            await page.goto(f'https://dashboard.apptrove.com/v2/app/{request.template_id}')
-            await page.wait_for_load_state('networkidle', timeout=30000)
-            await page.wait_for_timeout(3000)
-            
-            # Find the link in the table
-            link_url = await page.evaluate(f'''() => {{
-                const rows = document.querySelectorAll('tr');
-                for (const row of rows) {{
-                    if (row.textContent.includes('{request.link_name}')) {{
-                        const links = row.querySelectorAll('a[href*="applink"]');
-                        if (links.length > 0) {{
-                            return links[0].href;
-                        }}
-                    }}
-                }}
-                return null;
-            }}''')
-            
-            await browser.close()
-            browser = None
-            
-            if link_url:
-                link_id = link_url.split('/d/')[1].split('?')[0] if '/d/' in link_url else None
-                print(f"✓ Link created: {link_url}")
-                return {
-                    "success": True,
-                    "unilink": link_url,
-                    "linkId": link_id,
-                    "createdVia": "automation",
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            else:
-                print("⚠ Link created but URL not extracted")
-                return {
-                    "success": False,
-                    "error": "Link created but URL not found. Check dashboard manually.",
-                    "dashboardUrl": f"https://dashboard.apptrove.com/v2/app/{request.template_id}"
-                }
-                
-        except Exception as e:
-            print(f"✗ Error: {str(e)}")
-            if browser:
-                await browser.close()
-            raise HTTPException(
-                status_code=500,
-                detail=f"Automation failed: {str(e)}"
-            )
+    check_request(request.api_key)
+    print(f"[{datetime.utcnow().isoformat()}] Creating link: {request.link_name}")
+
+    result = await engine.create_link_via_automation(request.template_id, request.link_name, request.campaign)
+    if result.get("busy"):
+        raise HTTPException(status_code=503, detail=result["error"])
+    if result.get("success"):
+        return {**result, "timestamp": datetime.utcnow().isoformat()}
+    if result.get("error", "").startswith("Automation failed"):
+        raise HTTPException(status_code=500, detail=result["error"])
+    return {
+        **result,
+        "dashboardUrl": template_url(request.template_id)
+    }
+
+@app.post("/create-links")
+async def create_links(request: CreateLinksBatchRequest):
+    """
+    Create many links on one template in a single dashboard session
+    """
+    check_request(request.api_key)
+    items = [(link.link_name, link.campaign) for link in request.links]
+    results = await engine.create_links_batch_via_automation(request.template_id, items)
+    return {
+        "success": all(r.get("success") for r in results),
+        "results": results,
+        "timestamp": datetime.utcnow().isoformat()
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,27 @@
+"""
+Admin authentication for operational tooling
+Profiling and other diagnostics are unlocked by the ADMIN_API_KEY shared
+secret, sent in the X-Admin-Key header. With no key configured they stay
+disabled.
+"""
+
+import hmac
+import os
+
+from fastapi import HTTPException, Request
+
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+ADMIN_KEY_HEADER = "x-admin-key"
+
+
+def is_admin(request: Request) -> bool:
+    supplied = request.headers.get(ADMIN_KEY_HEADER, "")
+    return bool(ADMIN_API_KEY) and hmac.compare_digest(supplied.encode(), ADMIN_API_KEY.encode())
+
+
+async def require_admin(request: Request):
+    """Dependency for admin-only endpoints"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not is_admin(request):
+        raise HTTPException(status_code=401, detail="Admin key required")
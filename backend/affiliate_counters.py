@@ -0,0 +1,135 @@
+"""
+Affiliate counters for the dashboard headline numbers
+Total, active and pending-approval counts are kept as one counter record in
+the shared cache. Every API write to a user applies the difference between
+the item before and after the write, atomically across workers, so reading
+the counts is O(1) however many affiliates exist.
+
+Writes that bypass the API (console, scripts), concurrent updates to the
+same user and a wiped cache can all leave the counts off. A background job
+recounts from a fresh scan every AFFILIATE_COUNTERS_RECONCILE_SECONDS and
+reports any drift it corrects.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from shared_cache import cache
+
+AFFILIATE_COUNTERS_RECONCILE_SECONDS = float(os.getenv("AFFILIATE_COUNTERS_RECONCILE_SECONDS", "300"))
+COUNTERS_KEY = "counters:affiliates"
+# Outlives every data cache; reconciliation rebuilds it if it's ever lost
+COUNTERS_TTL = 30 * 24 * 3600
+
+# Counter name -> whether a user item counts towards it
+COUNTERS: Dict[str, Callable[[dict], bool]] = {
+    "totalAffiliates": lambda user: True,
+    "activeAffiliates": lambda user: user.get("status") == "active",
+    "pendingApproval": lambda user: user.get("approvalStatus") == "pending",
+}
+
+
+def contribution(user: Optional[dict]) -> Dict[str, int]:
+    if not user:
+        return {name: 0 for name in COUNTERS}
+    return {name: int(test(user)) for name, test in COUNTERS.items()}
+
+
+def count(users: Iterable[dict]) -> Dict[str, int]:
+    totals = {name: 0 for name in COUNTERS}
+    for user in users:
+        for name, value in contribution(user).items():
+            totals[name] += value
+    return totals
+
+
+class AffiliateCounters:
+    def __init__(
+        self,
+        load_users: Callable[[], List[dict]],
+        on_change: Optional[Callable[[Dict[str, int], Dict[str, int]], None]] = None
+    ):
+        # Uncached scan of every page of the users table, used for reconciliation
+        # only; it must raise rather than return a partial list
+        self.load_users = load_users
+        # Gets (new counts, delta) after a write or a corrected drift
+        self.on_change = on_change
+
+    def _notify(self, counts: Dict[str, int], delta: Dict[str, int]):
+        if self.on_change is None:
+            return
+        try:
+            self.on_change(counts, delta)
+        except Exception as e:
+            print(f"⚠️ Affiliate counter listener failed: {e}")
+
+    def record(self, before: Optional[dict], after: Optional[dict]):
+        """A user item changed from `before` to `after` (None for missing)"""
+        old, new = contribution(before), contribution(after)
+        delta = {name: new[name] - old[name] for name in COUNTERS}
+        if not any(delta.values()):
+            return
+
+        def apply(state):
+            if state is None:
+                # Nothing to adjust; the next read rebuilds from a scan
+                return None
+            counts = {name: state["counts"][name] + delta[name] for name in COUNTERS}
+            return {**state, "counts": counts, "seq": state["seq"] + 1, "updatedAt": time.time()}
+        try:
+            state = cache.update(COUNTERS_KEY, apply, COUNTERS_TTL)
+        except Exception as e:
+            print(f"⚠️ Could not update affiliate counters: {e}")
+            return
+        if state is None:
+            cache.delete(COUNTERS_KEY)
+            return
+        self._notify(dict(state["counts"]), delta)
+
+    def reconcile(self) -> Dict[str, Any]:
+        """Recount from a fresh scan; returns the drift that was corrected"""
+        seq = (cache.get(COUNTERS_KEY) or {}).get("seq")
+        counts = count(self.load_users())
+        result: Dict[str, Any] = {}
+
+        def apply(state):
+            now = time.time()
+            if state is not None and state["seq"] != seq:
+                # Writes landed during the scan; the scan may or may not include them, so try again later
+                result["skipped"] = True
+                return state
+            previous = state["counts"] if state else counts
+            result["drift"] = {name: counts[name] - previous[name] for name in COUNTERS}
+            return {"counts": counts, "seq": (seq or 0) + 1, "updatedAt": now, "reconciledAt": now}
+        state = cache.update(COUNTERS_KEY, apply, COUNTERS_TTL)
+
+        drift = {name: d for name, d in result.get("drift", {}).items() if d}
+        if drift:
+            print(f"⚠️ Affiliate counters drifted, corrected by {drift}")
+            self._notify(dict(state["counts"]), result["drift"])
+        return result
+
+    def state(self) -> Dict[str, Any]:
+        state = cache.get(COUNTERS_KEY)
+        if state is None:
+            self.reconcile()
+            state = cache.get(COUNTERS_KEY) or {"counts": contribution(None), "seq": 0}
+        return state
+
+    def snapshot(self) -> Dict[str, int]:
+        """The headline counts"""
+        return dict(self.state()["counts"])
+
+    async def reconcile_loop(self):
+        while True:
+            await asyncio.sleep(AFFILIATE_COUNTERS_RECONCILE_SECONDS)
+            # Every worker runs the loop; the first one due does the scan
+            reconciled_at = (cache.get(COUNTERS_KEY) or {}).get("reconciledAt") or 0
+            if time.time() - reconciled_at < AFFILIATE_COUNTERS_RECONCILE_SECONDS / 2:
+                continue
+            try:
+                await asyncio.to_thread(self.reconcile)
+            except Exception as e:
+                print(f"⚠️ Affiliate counter reconciliation failed: {e}")
@@ -0,0 +1,421 @@
+"""
+Columnar analytics snapshots for ad-hoc admin reports
+A background job copies the users and analytics tables into zstd-compressed
+Parquet files on local disk. Admin queries then run as grouped aggregations
+in an embedded DuckDB over those files, so questions like "earnings by
+platform" or "conversion rate by follower band" take well under a second on
+millions of rows and cost no DynamoDB reads.
+
+Snapshots are written page by page into a new generation directory, and
+current.json is switched to it only once every file is complete. Old
+generations are pruned. One worker per host builds at a time, under a lease
+in the shared cache. Emails and phone numbers are not copied.
+
+Queries are a JSON spec (dataset, groupBy, metrics, filters, orderBy,
+limit) rather than SQL. Every column is checked against the dataset's
+schema and values are bound as parameters, so a query can only read the
+snapshot.
+
+Needs pyarrow (writing) and duckdb (querying); without them snapshots are
+simply disabled.
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from cohorts import follower_band
+from shared_cache import cache
+
+ANALYTICS_SNAPSHOT_DIR = os.getenv(
+    "ANALYTICS_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "millionaires-adda-snapshots")
+)
+# Seconds between snapshots; 0 disables the background job (POST /api/admin/analytics/snapshot still works)
+ANALYTICS_SNAPSHOT_INTERVAL = float(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL", "900"))
+ANALYTICS_SNAPSHOT_KEEP = int(os.getenv("ANALYTICS_SNAPSHOT_KEEP", "2"))
+ANALYTICS_QUERY_TIMEOUT = float(os.getenv("ANALYTICS_QUERY_TIMEOUT", "10"))
+ANALYTICS_QUERY_MAX_ROWS = int(os.getenv("ANALYTICS_QUERY_MAX_ROWS", "1000"))
+_LEASE_KEY = "snapshot:lease"
+_LEASE_SECONDS = 1800
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def available() -> Dict[str, bool]:
+    return {name: importlib.util.find_spec(name) is not None for name in ("pyarrow", "duckdb")}
+
+
+def _day(value: Any) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None) if value else None
+    except ValueError:
+        return None
+
+
+def _number(value: Any, kind=float):
+    try:
+        return kind(value) if value not in (None, "") else kind(0)
+    except (TypeError, ValueError):
+        return kind(0)
+
+
+# ---------- schemas ----------
+
+# (column, arrow type name, numeric?)
+USER_COLUMNS = [
+    ("id", "string", False),
+    ("name", "string", False),
+    ("platform", "string", False),
+    ("followerCount", "int64", True),
+    ("followerBand", "string", False),
+    ("status", "string", False),
+    ("approvalStatus", "string", False),
+    ("hasLink", "bool", False),
+    ("createdAt", "timestamp", False),
+    ("approvedAt", "timestamp", False),
+    ("signupWeek", "date", False),
+]
+ANALYTICS_COLUMNS = [
+    ("id", "string", False),
+    ("userId", "string", False),
+    ("date", "date", False),
+    ("clicks", "int64", True),
+    ("installs", "int64", True),
+    ("revenue", "float64", True),
+    ("payout", "float64", True),
+]
+# Scan projections; emails, phone numbers and the rest never leave DynamoDB
+_USER_ATTRIBUTES = ["id", "name", "platform", "followerCount", "status", "approvalStatus",
+                    "linkId", "unilink", "createdAt", "approvedAt"]
+_ANALYTICS_ATTRIBUTES = ["id", "userId", "date", "createdAt", "clicks", "installs", "conversions",
+                         "revenue", "payout", "earnings", "network_cost"]
+
+
+def user_row(item: dict) -> Dict[str, Any]:
+    created = _timestamp(item.get("createdAt"))
+    return {
+        "id": str(item.get("id")),
+        "name": item.get("name"),
+        "platform": (item.get("platform") or "").strip().lower() or None,
+        "followerCount": _number(item.get("followerCount"), int),
+        "followerBand": follower_band(item.get("followerCount")),
+        "status": item.get("status"),
+        "approvalStatus": item.get("approvalStatus"),
+        "hasLink": bool(item.get("linkId") or item.get("unilink")),
+        "createdAt": created,
+        "approvedAt": _timestamp(item.get("approvedAt")),
+        "signupWeek": (created.date() - timedelta(days=created.weekday())) if created else None,
+    }
+
+
+def analytics_row(item: dict) -> Dict[str, Any]:
+    return {
+        "id": str(item.get("id")),
+        "userId": item.get("userId"),
+        "date": _day(item.get("date") or item.get("createdAt")),
+        "clicks": _number(item.get("clicks"), int),
+        "installs": _number(item.get("installs") or item.get("conversions"), int),
+        "revenue": _number(item.get("revenue")),
+        "payout": _number(item.get("payout") or item.get("earnings") or item.get("network_cost")),
+    }
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+    types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_(),
+             "timestamp": pa.timestamp("us"), "date": pa.date32()}
+    return pa.schema([(name, types[kind]) for name, kind, _ in columns])
+
+
+def scan_pages(table, attributes: List[str]) -> Iterator[List[dict]]:
+    names = {f"#a{i}": a for i, a in enumerate(attributes)}
+    kwargs = {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+    while True:
+        page = table.scan(**kwargs)
+        yield page.get("Items", [])
+        if not page.get("LastEvaluatedKey"):
+            return
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+# ---------- datasets exposed to queries ----------
+
+_ANALYTICS_DERIVED = [("week", "date", False), ("month", "date", False)]
+_JOINED_USER_COLUMNS = [c for c in USER_COLUMNS if c[0] in
+                        ("name", "platform", "followerCount", "followerBand", "status", "approvalStatus", "signupWeek")]
+
+DATASETS: Dict[str, List[Tuple[str, str, bool]]] = {
+    "users": USER_COLUMNS,
+    "analytics": ANALYTICS_COLUMNS + _ANALYTICS_DERIVED,
+    # Analytics rows with the affiliate's attributes, for breakdowns by platform, band, cohort...
+    "joined": ANALYTICS_COLUMNS + _ANALYTICS_DERIVED + _JOINED_USER_COLUMNS,
+}
+
+AGGREGATES = ("count", "count_distinct", "sum", "avg", "min", "max", "ratio")
+FILTER_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "in")
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier + '"'
+
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def build_query(spec: Dict[str, Any]) -> Tuple[str, List[Any], List[str]]:
+    """
+    Validated SQL, parameters and output column names for a query spec;
+    raises ValueError describing the first problem.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("query spec must be an object")
+    dataset = spec.get("dataset", "joined")
+    if not isinstance(dataset, str) or dataset not in DATASETS:
+        raise ValueError(f"dataset must be one of {', '.join(DATASETS)}")
+    columns = {name: numeric for name, _, numeric in DATASETS[dataset]}
+
+    def column(name, numeric=False):
+        if not isinstance(name, str) or name not in columns:
+            raise ValueError(f"Unknown column {name!r} for dataset {dataset}")
+        if numeric and not columns[name]:
+            raise ValueError(f"Column {name!r} is not numeric")
+        return _quote(name)
+
+    group_by = spec.get("groupBy") or []
+    if not isinstance(group_by, list) or len(group_by) > 4 or not all(isinstance(g, str) for g in group_by):
+        raise ValueError("groupBy must be a list of at most 4 columns")
+    select = [column(g) for g in group_by]
+    names = list(group_by)
+
+    metrics = spec.get("metrics") or [{"fn": "count"}]
+    if not isinstance(metrics, list) or not all(isinstance(m, dict) for m in metrics):
+        raise ValueError('metrics must be a list of objects like {"fn": "sum", "column": "clicks"}')
+    for metric in metrics:
+        fn = metric.get("fn")
+        if fn not in AGGREGATES:
+            raise ValueError(f"metric fn must be one of {', '.join(AGGREGATES)}")
+        if fn == "count":
+            expr, default = "COUNT(*)", "count"
+        elif fn == "count_distinct":
+            expr, default = f"COUNT(DISTINCT {column(metric.get('column'))})", f"distinct_{metric.get('column')}"
+        elif fn == "ratio":
+            num, den = metric.get("numerator"), metric.get("denominator")
+            expr = f"SUM({column(num, True)}) / NULLIF(SUM({column(den, True)}), 0)"
+            default = f"{num}_per_{den}"
+        else:
+            expr, default = f"{fn.upper()}({column(metric.get('column'), fn in ('sum', 'avg'))})", f"{fn}_{metric.get('column')}"
+        alias = metric.get("as") or default
+        if not isinstance(alias, str) or not _IDENTIFIER.match(alias) or alias in names:
+            raise ValueError(f"Invalid or duplicate metric name {alias!r}")
+        select.append(f"{expr} AS {_quote(alias)}")
+        names.append(alias)
+
+    filters = spec.get("filters") or []
+    if not isinstance(filters, list) or not all(isinstance(f, dict) for f in filters):
+        raise ValueError('filters must be a list of objects like {"column": "platform", "op": "=", "value": "youtube"}')
+    where, params = [], []
+    for f in filters:
+        op = f.get("op", "=")
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"filter op must be one of {', '.join(FILTER_OPERATORS)}")
+        if op == "in":
+            values = f.get("value")
+            if not isinstance(values, list) or not values or not all(isinstance(v, _SCALARS) for v in values):
+                raise ValueError("'in' filters need a non-empty list of values")
+            where.append(f"{column(f.get('column'))} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        else:
+            if not isinstance(f.get("value"), _SCALARS):
+                raise ValueError("filter values must be strings, numbers, booleans or null")
+            where.append(f"{column(f.get('column'))} {op} ?")
+            params.append(f.get("value"))
+
+    sql = f"SELECT {', '.join(select)} FROM {dataset}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if group_by:
+        sql += " GROUP BY " + ", ".join(_quote(g) for g in group_by)
+
+    order_by = spec.get("orderBy") or names[len(group_by)]
+    if not isinstance(order_by, str) or order_by not in names:
+        raise ValueError(f"orderBy must be one of {', '.join(names)}")
+    sql += f" ORDER BY {_quote(order_by)} {'DESC' if spec.get('desc', True) else 'ASC'} NULLS LAST LIMIT ?"
+
+    try:
+        limit = int(spec.get("limit") or 100)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be a number")
+    params.append(max(1, min(limit, ANALYTICS_QUERY_MAX_ROWS)))
+    return sql, params, names
+
+
+class AnalyticsSnapshots:
+    def __init__(self, users_table, analytics_table, directory: str = ANALYTICS_SNAPSHOT_DIR):
+        self.users_table = users_table
+        self.analytics_table = analytics_table
+        self.directory = directory
+        self.building = False
+        self.last_error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return all(available().values())
+
+    def manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, "current.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def age(self) -> Optional[float]:
+        manifest = self.manifest()
+        return time.time() - manifest["createdAt"] if manifest else None
+
+    # -- building --
+
+    def _write(self, path: str, table, attributes, columns, convert) -> Dict[str, Any]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = _arrow_schema(columns)
+        rows = 0
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for items in scan_pages(table, attributes):
+                if items:
+                    writer.write_batch(pa.RecordBatch.from_pylist([convert(i) for i in items], schema=schema))
+                    rows += len(items)
+        return {"file": os.path.basename(path), "rows": rows, "bytes": os.path.getsize(path)}
+
+    def build(self) -> Optional[Dict[str, Any]]:
+        """Write a new snapshot generation; None if another worker holds the build lease"""
+        lease = uuid.uuid4().hex
+
+        def take(holder):
+            return holder if holder and holder["expires"] > time.time() else {"id": lease, "expires": time.time() + _LEASE_SECONDS}
+        if cache.update(_LEASE_KEY, take, _LEASE_SECONDS)["id"] != lease:
+            return None
+
+        started = time.perf_counter()
+        generation = datetime.utcnow().strftime("%Y%m%dT%H%M%S") + "-" + lease[:6]
+        target = os.path.join(self.directory, generation)
+        self.building = True
+        try:
+            os.makedirs(target, exist_ok=True)
+            tables = {
+                "users": self._write(os.path.join(target, "users.parquet"), self.users_table,
+                                     _USER_ATTRIBUTES, USER_COLUMNS, user_row),
+                "analytics": self._write(os.path.join(target, "analytics.parquet"), self.analytics_table,
+                                         _ANALYTICS_ATTRIBUTES, ANALYTICS_COLUMNS, analytics_row),
+            }
+            manifest = {
+                "generation": generation,
+                "createdAt": time.time(),
+                "buildSeconds": round(time.perf_counter() - started, 2),
+                "tables": tables,
+            }
+            pending = os.path.join(self.directory, f".current.{lease}.json")
+            with open(pending, "w") as f:
+                json.dump(manifest, f)
+            os.replace(pending, os.path.join(self.directory, "current.json"))
+            self.last_error = None
+            self._prune(generation)
+            print(f"🗄️ Analytics snapshot {generation}: {tables['users']['rows']} users, "
+                  f"{tables['analytics']['rows']} analytics rows in {manifest['buildSeconds']:.1f}s")
+            return manifest
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            shutil.rmtree(target, ignore_errors=True)
+            raise
+        finally:
+            self.building = False
+            # A build that outlived its lease mustn't release the next holder's
+            cache.update(_LEASE_KEY, lambda holder: None if holder and holder["id"] == lease else holder, _LEASE_SECONDS)
+
+    def _prune(self, current: str):
+        generations = sorted(
+            d for d in os.listdir(self.directory)
+            if os.path.isdir(os.path.join(self.directory, d)) and d != current
+        )
+        # Keep a few older generations so queries already reading them can finish
+        for old in generations[:max(0, len(generations) - (ANALYTICS_SNAPSHOT_KEEP - 1))]:
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+
+    async def snapshot_loop(self):
+        if ANALYTICS_SNAPSHOT_INTERVAL <= 0 or not self.enabled:
+            return
+        while True:
+            age = self.age()
+            if age is None or age >= ANALYTICS_SNAPSHOT_INTERVAL:
+                try:
+                    await asyncio.to_thread(self.build)
+                except Exception as e:
+                    print(f"⚠️ Analytics snapshot failed: {e}")
+            await asyncio.sleep(min(ANALYTICS_SNAPSHOT_INTERVAL, 60))
+
+    # -- querying --
+
+    def query(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a query spec (see build_query) against the current snapshot"""
+        import duckdb
+        sql, params, names = build_query(spec)
+        manifest = self.manifest()
+        if manifest is None:
+            raise LookupError("No analytics snapshot yet")
+        base = os.path.join(self.directory, manifest["generation"])
+
+        def parquet(table):
+            return "'" + os.path.join(base, manifest["tables"][table]["file"]).replace("'", "''") + "'"
+
+        started = time.perf_counter()
+        con = duckdb.connect()
+        timer = threading.Timer(ANALYTICS_QUERY_TIMEOUT, con.interrupt)
+        try:
+            con.execute(f"CREATE VIEW users AS SELECT * FROM read_parquet({parquet('users')})")
+            con.execute(
+                "CREATE VIEW analytics AS SELECT *, CAST(date_trunc('week', date) AS DATE) AS week, "
+                f"CAST(date_trunc('month', date) AS DATE) AS month FROM read_parquet({parquet('analytics')})"
+            )
+            joined = ", ".join(f"u.{_quote(name)}" for name, _, _ in _JOINED_USER_COLUMNS)
+            con.execute(f"CREATE VIEW joined AS SELECT a.*, {joined} FROM analytics a LEFT JOIN users u ON a.userId = u.id")
+            timer.start()
+            rows = con.execute(sql, params).fetchall()
+        except duckdb.InterruptException:
+            raise TimeoutError(f"Query exceeded {ANALYTICS_QUERY_TIMEOUT:.0f}s")
+        finally:
+            timer.cancel()
+            con.close()
+        return {
+            "columns": names,
+            "rows": [list(row) for row in rows],
+            "rowCount": len(rows),
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+            "snapshot": {"generation": manifest["generation"], "createdAt": manifest["createdAt"]},
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "dependencies": available(),
+            "directory": self.directory,
+            "intervalSeconds": ANALYTICS_SNAPSHOT_INTERVAL,
+            "building": self.building,
+            "lastError": self.last_error,
+            "current": self.manifest(),
+            "datasets": {name: [c for c, _, _ in columns] for name, columns in DATASETS.items()},
+        }
@@ -0,0 +1,236 @@
+"""
+AppTrove dashboard automation
+Creates Unilinks through the dashboard UI. Contexts come from the warm
+browser pool, seeded from the in-memory session in session_state.py, and
+the wizard is driven by link_driver.py, so a job only pays for the form
+fill and the create call on the warm path.
+"""
+
+import os
+import time
+from typing import List, Tuple
+
+from browser_pool import BrowserPool, PoolAuthError, PoolLeaseTimeout
+from session_state import SessionStateManager
+from lean_mode import apply_lean_mode, lean_context_options, lean_stats
+from automation_timing import begin_capture, end_capture, record_step, run_timer, step, timing_summary
+from link_driver import DASHBOARD_URL, SessionExpired, create_link, create_links_batch, link_id_from_unilink
+
+APPTROVE_DASHBOARD_EMAIL = os.getenv("APPTROVE_DASHBOARD_EMAIL")
+APPTROVE_DASHBOARD_PASSWORD = os.getenv("APPTROVE_DASHBOARD_PASSWORD")
+APPTROVE_COOKIES_FILE = os.getenv("APPTROVE_COOKIES_FILE", "apptrove_cookies.json")
+
+CONTEXT_OPTIONS = lean_context_options({
+    "viewport": {'width': 1920, 'height': 1080},
+    "user_agent": 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+})
+
+
+async def login_with_credentials(page):
+    """Gmail OAuth first, then the dashboard's own email/password form"""
+    if not APPTROVE_DASHBOARD_EMAIL:
+        raise PoolAuthError("No cookies found and no login credentials configured. Run generate-cookies.py")
+
+    print("→ Logging in with credentials...")
+    with step("login"):
+        await _login(page)
+
+
+async def _login(page):
+    """The login flow itself, timed as one step by login_with_credentials"""
+    await page.goto(f'{DASHBOARD_URL}/login', timeout=30000)
+
+    try:
+        await page.click('button:has-text("Google"), button:has-text("Continue with Google"), a:has-text("Sign in with Google")', timeout=5000)
+        await page.wait_for_timeout(2000)
+
+        await page.wait_for_url('**/accounts.google.com/**', timeout=10000)
+        await page.fill('input[type="email"]', APPTROVE_DASHBOARD_EMAIL)
+        await page.click('button:has-text("Next"), #identifierNext')
+        await page.wait_for_timeout(2000)
+
+        if APPTROVE_DASHBOARD_PASSWORD:
+            await page.fill('input[type="password"]', APPTROVE_DASHBOARD_PASSWORD)
+            await page.click('button:has-text("Next"), #passwordNext')
+            await page.wait_for_timeout(3000)
+    except Exception:
+        print("   → Gmail OAuth failed, trying direct login")
+        await page.goto(f'{DASHBOARD_URL}/login')
+        await page.fill('input[type="email"]', APPTROVE_DASHBOARD_EMAIL)
+        if APPTROVE_DASHBOARD_PASSWORD:
+            await page.fill('input[type="password"]', APPTROVE_DASHBOARD_PASSWORD)
+            await page.click('button[type="submit"]')
+
+    try:
+        await page.wait_for_url('**/dashboard', timeout=30000)
+        print("   ✅ Login successful")
+    except Exception:
+        raise PoolAuthError("Login failed. Use generate-cookies.py for reliable auth")
+
+
+async def open_scratch_page(storage_state):
+    context = await automation_pool.new_scratch_context(storage_state)
+    return context, await context.new_page()
+
+
+async def is_logged_in(page) -> bool:
+    await page.goto(f'{DASHBOARD_URL}/dashboard', timeout=30000)
+    return '/login' not in page.url
+
+
+session = SessionStateManager(APPTROVE_COOKIES_FILE, open_scratch_page, login_with_credentials, is_logged_in)
+
+
+async def context_storage_state():
+    """
+    Seed pooled contexts from the in-memory session.
+    Priority: saved/refreshed cookies > Gmail OAuth (only when no usable session exists)
+    """
+    if not session.is_usable() and not await session.refresh():
+        raise PoolAuthError(session.last_error or "No usable dashboard session. Run generate-cookies.py")
+    return session.get_state()
+
+
+# Login runs on un-routed scratch contexts; only pooled job contexts are lean
+automation_pool = BrowserPool(
+    storage_state=context_storage_state,
+    prepare_context=apply_lean_mode,
+    context_options=CONTEXT_OPTIONS
+)
+session.on_refresh(automation_pool.recycle_idle)
+
+
+async def handle_session_expired(job_started: float):
+    """A job hit /login: drop the state and rebuild it once for every waiting job"""
+    session.invalidate(since=job_started)
+    await session.refresh()
+
+
+async def run_on_leased_page(run, flow, failed=lambda result: not result):
+    """Lease a pooled page, run `flow(page)` on it and capture artifacts for slow/failed runs"""
+    lease_started = time.perf_counter()
+    async with automation_pool.lease() as slot:
+        record_step("lease", time.perf_counter() - lease_started)
+        await begin_capture(slot.context)
+        try:
+            result = await flow(slot.page)
+        except Exception:
+            await end_capture(run, slot.context, slot.page, failed=True)
+            raise
+        await end_capture(run, slot.context, slot.page, failed=failed(result))
+        return result
+
+
+def finish_run(run, result):
+    """Attach the run's step timings to a result dict"""
+    result["timings"] = run.finish("ok" if result.get("success") else "error")
+    return result
+
+
+async def create_link_via_automation(template_id: str, link_name: str, campaign: str):
+    """
+    Create AppTrove link via Playwright browser automation.
+    Runs on a pre-authenticated pooled context; an expired session
+    recycles the context and retries once on a fresh one.
+    """
+    print(f"[Automation] Creating link: {link_name}")
+    with run_timer("create_link", link_name) as run:
+        for attempt in range(2):
+            job_started = time.time()
+            try:
+                link_url = await run_on_leased_page(
+                    run, lambda page: create_link(page, template_id, link_name, campaign)
+                )
+                break
+            except SessionExpired:
+                print("   ⚠️ Session expired, retrying on a fresh context")
+                with step("session_refresh"):
+                    await handle_session_expired(job_started)
+                if attempt == 1:
+                    return finish_run(run, {"success": False, "error": "Dashboard session expired. Run generate-cookies.py"})
+            except (PoolAuthError, PoolLeaseTimeout) as e:
+                return finish_run(run, {"success": False, "error": str(e)})
+            except Exception as e:
+                print(f"❌ Automation error: {e}")
+                return finish_run(run, {
+                    "success": False,
+                    "error": f"Automation failed: {str(e)}"
+                })
+
+        if link_url:
+            link_id = link_id_from_unilink(link_url)
+            print(f"✅ Link created: {link_url}")
+            return finish_run(run, {
+                "success": True,
+                "unilink": link_url,
+                "linkId": link_id,
+                "createdVia": "automation"
+            })
+        return finish_run(run, {
+            "success": False,
+            "error": "Link created but URL not found"
+        })
+
+
+async def create_links_batch_via_automation(template_id: str, items: List[Tuple[str, str]]):
+    """
+    Create many (link_name, campaign) pairs for one template in a single
+    authenticated session and template page. Returns one result dict per item.
+    """
+    print(f"[Automation] Creating {len(items)} links on template {template_id}")
+    with run_timer("create_links_batch", f"{template_id}x{len(items)}") as run:
+        for attempt in range(2):
+            job_started = time.time()
+            try:
+                outcomes = await run_on_leased_page(
+                    run,
+                    lambda page: create_links_batch(page, template_id, items),
+                    failed=lambda outcomes: any(not link for link, _ in outcomes)
+                )
+                break
+            except SessionExpired:
+                print("   ⚠️ Session expired, retrying batch on a fresh context")
+                with step("session_refresh"):
+                    await handle_session_expired(job_started)
+                if attempt == 1:
+                    outcomes = [(None, "Dashboard session expired. Run generate-cookies.py")] * len(items)
+            except Exception as e:
+                print(f"❌ Batch automation error: {e}")
+                outcomes = [(None, f"Automation failed: {str(e)}")] * len(items)
+                break
+
+        results = []
+        for link_url, error in outcomes:
+            if link_url:
+                results.append({
+                    "success": True,
+                    "unilink": link_url,
+                    "linkId": link_id_from_unilink(link_url),
+                    "createdVia": "automation-batch"
+                })
+            else:
+                results.append({"success": False, "error": error})
+        succeeded = len([r for r in results if r['success']])
+        run.finish("ok" if succeeded == len(items) else "error")
+        print(f"✅ Batch done: {succeeded}/{len(items)} links")
+        return results
+
+
+# ---------- engine lifecycle (same surface as automation_workers.AutomationWorkerPool) ----------
+
+async def start():
+    await automation_pool.start()
+
+
+async def stop():
+    await session.stop()
+    await automation_pool.stop()
+
+
+async def status():
+    return {
+        "pool": automation_pool.status(),
+        "session": session.status(),
+        "leanMode": lean_stats.to_dict(),
+        "timings": timing_summary()
+    }
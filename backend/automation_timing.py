@@ -0,0 +1,154 @@
+"""
+Per-step timing for automation runs
+`run_timer()` opens a run, `step()` times one stage of it (navigation, form
+fill, submit, extract, ...). Durations land in histograms and each run logs
+one structured line. Slow or failed runs can leave a screenshot or a
+Playwright trace behind for debugging.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from metrics import Histogram
+
+# Runs slower than this are treated like failures for artifact capture
+AUTOMATION_SLOW_RUN_SECONDS = float(os.getenv("AUTOMATION_SLOW_RUN_SECONDS", "30"))
+# off | screenshot | trace  (trace records every run, only slow/failed ones are kept)
+AUTOMATION_CAPTURE = os.getenv("AUTOMATION_CAPTURE", "off").lower()
+AUTOMATION_CAPTURE_DIR = os.getenv("AUTOMATION_CAPTURE_DIR", "automation_captures")
+
+automation_step_seconds = Histogram(
+    "automation_step_seconds", "Duration of one automation step", ["step", "outcome"]
+)
+automation_run_seconds = Histogram(
+    "automation_run_seconds", "Duration of a whole automation run", ["kind", "outcome"]
+)
+
+_current_run: ContextVar[Optional["RunTimer"]] = ContextVar("automation_run", default=None)
+
+
+class RunTimer:
+    """Steps of one automation run, in order"""
+
+    def __init__(self, kind: str, label: str):
+        self.kind = kind
+        self.label = label
+        self.started = time.perf_counter()
+        self.steps: List[Dict[str, Any]] = []
+        self.total: Optional[float] = None
+        self.outcome: Optional[str] = None
+        self.artifact: Optional[str] = None
+
+    def record(self, name: str, seconds: float, outcome: str):
+        self.steps.append({"step": name, "seconds": round(seconds, 3), "outcome": outcome})
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def is_slow(self) -> bool:
+        return self.elapsed() > AUTOMATION_SLOW_RUN_SECONDS
+
+    def finish(self, outcome: str) -> Dict[str, Any]:
+        if self.total is None:
+            self.total = self.elapsed()
+            self.outcome = outcome
+            automation_run_seconds.observe(self.total, kind=self.kind, outcome=outcome)
+            print("[Automation timing] " + json.dumps(self.to_dict()))
+        return self.to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "label": self.label,
+            "outcome": self.outcome,
+            "total": round(self.total if self.total is not None else self.elapsed(), 3),
+            "steps": self.steps,
+            "artifact": self.artifact,
+        }
+
+
+@contextmanager
+def run_timer(kind: str, label: str):
+    """Make a RunTimer current for everything awaited inside the block"""
+    run = RunTimer(kind, label)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+def record_step(name: str, seconds: float, outcome: str = "ok"):
+    """Record a step timed elsewhere on the current run (if any) and in the step histogram"""
+    automation_step_seconds.observe(seconds, step=name, outcome=outcome)
+    run = _current_run.get()
+    if run is not None:
+        run.record(name, seconds, outcome)
+
+
+@contextmanager
+def step(name: str):
+    """Time the enclosed block as one step"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        record_step(name, time.perf_counter() - started, outcome)
+
+
+# ---------- artifacts ----------
+
+def _artifact_path(run: RunTimer, suffix: str) -> str:
+    os.makedirs(AUTOMATION_CAPTURE_DIR, exist_ok=True)
+    safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in run.label)[:60]
+    return os.path.join(AUTOMATION_CAPTURE_DIR, f"{int(time.time())}-{run.kind}-{safe_label}.{suffix}")
+
+
+async def begin_capture(context):
+    """Start a Playwright trace on the leased context when tracing is enabled"""
+    if AUTOMATION_CAPTURE != "trace":
+        return
+    try:
+        await context.tracing.start(screenshots=True, snapshots=True)
+    except Exception as e:
+        print(f"   ⚠️ Could not start trace: {e}")
+
+
+async def end_capture(run: RunTimer, context, page, failed: bool):
+    """Keep a trace or screenshot if the run failed or was slow; otherwise discard"""
+    if AUTOMATION_CAPTURE not in ("screenshot", "trace"):
+        return
+    keep = failed or run.is_slow()
+    try:
+        if AUTOMATION_CAPTURE == "trace":
+            if keep:
+                run.artifact = _artifact_path(run, "zip")
+                await context.tracing.stop(path=run.artifact)
+            else:
+                await context.tracing.stop()
+        elif keep:
+            run.artifact = _artifact_path(run, "png")
+            await page.screenshot(path=run.artifact, full_page=True)
+    except Exception as e:
+        run.artifact = None
+        print(f"   ⚠️ Could not capture automation artifact: {e}")
+    if run.artifact:
+        print(f"   📸 Saved {'failed' if failed else 'slow'} run artifact: {run.artifact}")
+
+
+def timing_summary() -> Dict[str, Any]:
+    """Per-step and per-run count / mean / p50 / p95"""
+    return {
+        "slowRunSeconds": AUTOMATION_SLOW_RUN_SECONDS,
+        "capture": AUTOMATION_CAPTURE,
+        "steps": automation_step_seconds.summary(),
+        "runs": automation_run_seconds.summary(),
+    }
@@ -0,0 +1,408 @@
+"""
+Out-of-process automation workers
+Chromium automation runs in dedicated worker processes so it never competes
+with the API event loop. The parent talks to each worker over a local
+JSON-lines RPC on stdin/stdout, bounds how much work may queue up, and
+recycles workers whose process tree grows past a memory limit.
+
+Run directly (`python automation_workers.py`) this file is a worker.
+"""
+
+import asyncio
+import glob
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+AUTOMATION_WORKERS = int(os.getenv("AUTOMATION_WORKERS", "1"))
+# Jobs a single worker runs at once (its browser pool should be at least this big)
+AUTOMATION_WORKER_CONCURRENCY = int(os.getenv("AUTOMATION_WORKER_CONCURRENCY", "2"))
+# Calls allowed to wait for a free worker before new ones are refused
+AUTOMATION_WORKER_MAX_QUEUE = int(os.getenv("AUTOMATION_WORKER_MAX_QUEUE", "50"))
+# RSS of the worker plus its Chromium children; above this the worker is drained and restarted
+AUTOMATION_WORKER_MEMORY_LIMIT_MB = int(os.getenv("AUTOMATION_WORKER_MEMORY_LIMIT_MB", "1536"))
+AUTOMATION_WORKER_CALL_TIMEOUT = float(os.getenv("AUTOMATION_WORKER_CALL_TIMEOUT", "900"))
+# Extra time a batch gets for each link beyond the first
+AUTOMATION_WORKER_BATCH_ITEM_SECONDS = float(os.getenv("AUTOMATION_WORKER_BATCH_ITEM_SECONDS", "60"))
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_SCRIPT = os.path.abspath(__file__)
+
+
+class AutomationBusy(Exception):
+    """Too many automation calls are already waiting for a worker"""
+
+
+class AutomationTimeout(Exception):
+    """
+    The caller stopped waiting, but the worker may still be running the job,
+    so its link may yet be created. `job` settles once the worker replies or exits.
+    """
+
+    def __init__(self, timeout: float, job: asyncio.Future):
+        super().__init__(
+            f"Automation timed out after {timeout:g}s and may still finish; "
+            "check AppTrove for the link before retrying"
+        )
+        self.job = job
+
+
+def process_tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and all its descendants (Linux /proc)"""
+    total_kb = 0
+    stack = [pid]
+    seen = set()
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            for children_file in glob.glob(f"/proc/{current}/task/*/children"):
+                with open(children_file) as f:
+                    stack.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+# ============ PARENT SIDE ============
+
+class _Worker:
+    """Handle on one worker process"""
+
+    def __init__(self, index: int, on_exit=None):
+        self.index = index
+        self.on_exit = on_exit
+        self.proc = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.inflight = 0
+        self.jobs = 0
+        self.rss_mb = 0.0
+        self.draining = False
+        self.stopping = False
+        self.restarting = False
+        self.started_at = 0.0
+        self._ids = itertools.count(1)
+        self._reader = None
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=BACKEND_DIR,
+            limit=16 * 1024 * 1024
+        )
+        self.started_at = time.time()
+        self._reader = asyncio.create_task(self._read_loop())
+        print(f"✅ Automation worker {self.index} started (pid {self.proc.pid})")
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self.proc.stdout.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                self.rss_mb = message.get("rssMb", self.rss_mb)
+                future = self.pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(RuntimeError(message["error"]))
+                else:
+                    future.set_result(message.get("result"))
+        except Exception as e:
+            print(f"⚠️ Automation worker {self.index} reader failed: {e}")
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("Automation worker exited"))
+            self.pending.clear()
+            if not self.stopping and self.on_exit:
+                print(f"❌ Automation worker {self.index} exited unexpectedly")
+                self.on_exit(self)
+
+    async def call(self, method: str, params: Dict[str, Any], timeout: float = AUTOMATION_WORKER_CALL_TIMEOUT):
+        if not self.alive():
+            raise RuntimeError("Automation worker is not running")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.proc.stdin.write((json.dumps({"id": request_id, "method": method, "params": params}) + "\n").encode())
+        await self.proc.stdin.drain()
+        try:
+            # Shielded: the job keeps running in the worker, so its future stays pending for the reply
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise AutomationTimeout(timeout, future) from None
+
+    async def stop(self, grace: float = 10):
+        self.stopping = True
+        if not self.alive():
+            return
+        try:
+            self.proc.stdin.write(b'{"method": "shutdown"}\n')
+            await self.proc.stdin.drain()
+            await asyncio.wait_for(self.proc.wait(), grace)
+        except Exception:
+            self.proc.kill()
+            await self.proc.wait()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "pid": self.proc.pid if self.proc else None,
+            "alive": self.alive(),
+            "inflight": self.inflight,
+            "jobs": self.jobs,
+            "rssMb": self.rss_mb,
+            "draining": self.draining,
+            "uptime": int(time.time() - self.started_at) if self.started_at else 0,
+        }
+
+
+class AutomationWorkerPool:
+    """
+    Parent-side scheduler. Exposes the same surface as the in-process
+    engine in apptrove_automation.py, so callers don't care where jobs run.
+    """
+
+    def __init__(
+        self,
+        workers: int = AUTOMATION_WORKERS,
+        concurrency: int = AUTOMATION_WORKER_CONCURRENCY,
+        max_queue: int = AUTOMATION_WORKER_MAX_QUEUE,
+        memory_limit_mb: int = AUTOMATION_WORKER_MEMORY_LIMIT_MB,
+    ):
+        self.size = max(1, workers)
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.memory_limit_mb = memory_limit_mb
+        self.workers: List[_Worker] = []
+        self.waiting = 0
+        self.restarts = 0
+        self.rejected = 0
+        self._capacity = asyncio.Condition()
+        self._start_lock = asyncio.Lock()
+        self._background = set()
+
+    async def start(self):
+        async with self._start_lock:
+            if self.workers:
+                return
+            self.workers = [_Worker(i, self._on_worker_exit) for i in range(self.size)]
+            await asyncio.gather(*[w.start() for w in self.workers])
+            # Let every worker warm its browser pool without waiting on it
+            for worker in self.workers:
+                self._spawn(self._warm(worker))
+
+    async def _warm(self, worker: _Worker):
+        try:
+            await worker.call("start", {})
+        except Exception as e:
+            print(f"⚠️ Automation worker {worker.index} warm-up failed: {e}")
+
+    async def stop(self):
+        await asyncio.gather(*[w.stop() for w in self.workers], return_exceptions=True)
+        self.workers = []
+
+    def _on_worker_exit(self, worker: _Worker):
+        self._spawn(self._restart(worker))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _pick(self) -> Optional[_Worker]:
+        candidates = [
+            w for w in self.workers
+            if w.alive() and not w.draining and w.inflight < self.concurrency
+        ]
+        return min(candidates, key=lambda w: w.inflight) if candidates else None
+
+    async def _acquire(self) -> _Worker:
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AutomationBusy(f"Automation queue full ({self.waiting} waiting), try again later")
+        self.waiting += 1
+        try:
+            async with self._capacity:
+                await self._capacity.wait_for(lambda: self._pick() is not None)
+                worker = self._pick()
+                worker.inflight += 1
+                return worker
+        finally:
+            self.waiting -= 1
+
+    async def _release(self, worker: _Worker):
+        worker.inflight -= 1
+        worker.jobs += 1
+        if worker.rss_mb > self.memory_limit_mb and not worker.draining:
+            print(f"⚠️ Automation worker {worker.index} at {worker.rss_mb}MB, draining for restart")
+            worker.draining = True
+        if (worker.draining and worker.inflight == 0) or not worker.alive():
+            self._spawn(self._restart(worker))
+        async with self._capacity:
+            self._capacity.notify_all()
+
+    async def _restart(self, worker: _Worker):
+        if worker not in self.workers or worker.stopping or worker.restarting:
+            return
+        # A crash is reported by both _release and the exit callback; only the first restarts
+        worker.restarting = True
+        crashed_early = time.time() - worker.started_at < 5
+        await worker.stop()
+        if crashed_early:
+            # Don't spin if the worker dies on startup
+            await asyncio.sleep(5)
+        if worker not in self.workers:
+            # The pool was stopped meanwhile
+            return
+        replacement = _Worker(worker.index, self._on_worker_exit)
+        self.workers[self.workers.index(worker)] = replacement
+        self.restarts += 1
+        await replacement.start()
+        self._spawn(self._warm(replacement))
+        async with self._capacity:
+            self._capacity.notify_all()
+
+    async def _call(self, method: str, timeout: float = AUTOMATION_WORKER_CALL_TIMEOUT, **params):
+        await self.start()
+        worker = await self._acquire()
+        settled = True
+        try:
+            return await worker.call(method, params, timeout)
+        except AutomationTimeout as e:
+            # The job still occupies the worker: keep its slot until the job settles, then restart it
+            worker.draining = True
+            settled = False
+            self._spawn(self._release_when_settled(worker, e.job))
+            raise
+        finally:
+            if settled:
+                await self._release(worker)
+
+    async def _release_when_settled(self, worker: _Worker, job: asyncio.Future):
+        try:
+            await asyncio.wait_for(job, AUTOMATION_WORKER_CALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Automation worker {worker.index} stuck on a timed-out job, restarting it")
+            await self._restart(worker)
+        except Exception:
+            pass
+        await self._release(worker)
+
+    # ---------- engine surface ----------
+
+    async def create_link_via_automation(self, template_id: str, link_name: str, campaign: str):
+        try:
+            return await self._call("create_link", template_id=template_id, link_name=link_name, campaign=campaign)
+        except AutomationBusy as e:
+            return {"success": False, "error": str(e), "busy": True}
+        except AutomationTimeout as e:
+            return {"success": False, "error": str(e), "timeout": True}
+        except Exception as e:
+            return {"success": False, "error": f"Automation worker failed: {str(e) or type(e).__name__}"}
+
+    async def create_links_batch_via_automation(self, template_id: str, items):
+        try:
+            timeout = AUTOMATION_WORKER_CALL_TIMEOUT + AUTOMATION_WORKER_BATCH_ITEM_SECONDS * max(0, len(items) - 1)
+            return await self._call("create_links_batch", timeout, template_id=template_id, items=[list(i) for i in items])
+        except AutomationBusy as e:
+            return [{"success": False, "error": str(e), "busy": True}] * len(items)
+        except AutomationTimeout as e:
+            return [{"success": False, "error": str(e), "timeout": True}] * len(items)
+        except Exception as e:
+            return [{"success": False, "error": f"Automation worker failed: {str(e) or type(e).__name__}"}] * len(items)
+
+    async def status(self):
+        engines = []
+        for worker in self.workers:
+            try:
+                engines.append(await worker.call("status", {}, timeout=5))
+            except Exception as e:
+                engines.append({"error": str(e)})
+        return {
+            "mode": "workers",
+            "concurrency": self.concurrency,
+            "maxQueue": self.max_queue,
+            "memoryLimitMb": self.memory_limit_mb,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "workers": [w.status() for w in self.workers],
+            "engines": engines,
+        }
+
+
+# ============ WORKER SIDE ============
+
+async def _handle(engine, message: Dict[str, Any], out):
+    method = message.get("method")
+    params = message.get("params") or {}
+    try:
+        if method == "create_link":
+            result = await engine.create_link_via_automation(params["template_id"], params["link_name"], params["campaign"])
+        elif method == "create_links_batch":
+            result = await engine.create_links_batch_via_automation(params["template_id"], [tuple(i) for i in params["items"]])
+        elif method == "start":
+            result = await engine.start()
+        elif method == "status":
+            result = await engine.status()
+        else:
+            raise ValueError(f"Unknown method {method}")
+        reply = {"id": message.get("id"), "result": result}
+    except Exception as e:
+        reply = {"id": message.get("id"), "error": str(e)}
+    reply["rssMb"] = process_tree_rss_mb(os.getpid())
+    out.write(json.dumps(reply, default=str) + "\n")
+    out.flush()
+
+
+async def _serve(out):
+    import apptrove_automation as engine
+
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    tasks = set()
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        message = json.loads(line)
+        if message.get("method") == "shutdown":
+            break
+        task = asyncio.create_task(_handle(engine, message, out))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    for task in list(tasks):
+        task.cancel()
+    await engine.stop()
+
+
+def run_worker():
+    # Replies own the real stdout; everything the engine prints goes to stderr
+    out = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+    asyncio.run(_serve(out))
+
+
+if __name__ == "__main__":
+    run_worker()
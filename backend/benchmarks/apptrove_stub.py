@@ -0,0 +1,343 @@
+"""
+Offline stand-in for dashboard.apptrove.com
+Serves just enough of the dashboard for link_driver.py: the login form, the
+template page with its links table, the three-step Add Link wizard and the
+create-link API call. Latency and failures can be injected so pool, batch
+and wait-strategy changes can be measured without the real dashboard.
+
+Run standalone:
+    python benchmarks/apptrove_stub.py --port 8765 --page-latency-ms 150
+and point the backend at it with APPTROVE_DASHBOARD_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+
+from stub_server import BackgroundServer, Latency
+
+SESSION_COOKIE = "stub_session"
+# Accepted until the first injected expiry; benchmarks seed their cookie file with it
+DEFAULT_SESSION_TOKEN = "bench-session"
+UNILINK_BASE = "https://stub.applink.io/d"
+
+
+@dataclass
+class StubConfig:
+    page_latency_ms: int = 0
+    api_latency_ms: int = 0
+    # +/- fraction applied to every latency
+    jitter: float = 0.2
+    # Create-link call returns 500 and no link is created
+    fail_rate: float = 0.0
+    # Link is created but the response carries no URL (forces the table fallback)
+    drop_response_rate: float = 0.0
+    # Invalidate every session after this many template page loads (0 = never)
+    expire_every: int = 0
+    # Bytes of the decorative image on each page (lean mode should skip it)
+    image_bytes: int = 200_000
+    seed: Optional[int] = None
+
+
+@dataclass
+class StubState:
+    links: Dict[str, List[Dict[str, str]]] = field(default_factory=dict)
+    sessions: Set[str] = field(default_factory=lambda: {DEFAULT_SESSION_TOKEN})
+    stats: Dict[str, int] = field(default_factory=lambda: {
+        "pageLoads": 0,
+        "logins": 0,
+        "linksCreated": 0,
+        "injectedFailures": 0,
+        "droppedResponses": 0,
+        "expiries": 0,
+        "imageRequests": 0,
+    })
+
+
+LOGIN_PAGE = """<!doctype html>
+<html><head><title>AppTrove Login</title></head>
+<body>
+  <h1>Sign in</h1>
+  <form id="login">
+    <input type="email" name="email">
+    <input type="password" name="password">
+    <button type="submit">Sign in</button>
+  </form>
+  <script>
+    document.getElementById('login').addEventListener('submit', async (event) => {
+      event.preventDefault();
+      const form = new FormData(event.target);
+      await fetch('/api/login', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({email: form.get('email')})
+      });
+      window.location.href = '/dashboard';
+    });
+  </script>
+</body></html>
+"""
+
+DASHBOARD_PAGE = """<!doctype html>
+<html><head><title>AppTrove Dashboard</title></head>
+<body><h1>Dashboard</h1><img src="/static/banner.png" alt=""></body></html>
+"""
+
+# The wizard renders one step at a time, so hidden steps never hold a
+# second "Next" button or stale text inputs
+TEMPLATE_PAGE = """<!doctype html>
+<html><head><title>Template __TEMPLATE__</title>
+<link rel="stylesheet" href="/static/fonts.css">
+</head>
+<body>
+  <img src="/static/banner.png" alt="">
+  <h1>Template __TEMPLATE__</h1>
+  <button id="add-link">Add Link</button>
+  <div id="wizard"></div>
+  <table id="links">
+    <thead><tr><th>Name</th><th>Campaign</th><th>Unilink</th></tr></thead>
+    <tbody>__ROWS__</tbody>
+  </table>
+  <script>
+    const templateId = '__TEMPLATE__';
+    const wizard = document.getElementById('wizard');
+    let draft = {};
+
+    function addRow(link) {
+      const row = document.createElement('tr');
+      row.innerHTML = '<td></td><td></td><td><a></a></td>';
+      row.children[0].textContent = link.name;
+      row.children[1].textContent = link.campaign;
+      row.querySelector('a').href = link.unilink;
+      row.querySelector('a').textContent = link.unilink;
+      document.querySelector('#links tbody').appendChild(row);
+    }
+
+    function stepOne() {
+      wizard.innerHTML = `
+        <h2>Basic details</h2>
+        <input type="text" id="name" placeholder="Link name">
+        <input type="text" id="campaign" placeholder="Campaign">
+        <input type="text" id="sub1" placeholder="Sub campaign">
+        <button id="next-1">Next</button>`;
+      document.getElementById('next-1').onclick = () => {
+        draft = {
+          name: document.getElementById('name').value,
+          campaign: document.getElementById('campaign').value
+        };
+        stepTwo();
+      };
+    }
+
+    function stepTwo() {
+      wizard.innerHTML = `
+        <h2>Advanced settings</h2>
+        <label><input type="checkbox" checked> Deferred deep linking</label>
+        <button id="next-2">Next</button>`;
+      document.getElementById('next-2').onclick = stepThree;
+    }
+
+    function stepThree() {
+      wizard.innerHTML = `
+        <h2>Review</h2>
+        <p></p>
+        <button id="create">Create</button>`;
+      wizard.querySelector('p').textContent = draft.name;
+      document.getElementById('create').onclick = async () => {
+        const response = await fetch(`/api/v2/apps/${templateId}/link`, {
+          method: 'POST',
+          headers: {'Content-Type': 'application/json'},
+          body: JSON.stringify(draft)
+        });
+        if (response.ok) {
+          const link = await response.json();
+          if (link.unilink) addRow(link);
+        }
+        wizard.innerHTML = '';
+      };
+    }
+
+    document.getElementById('add-link').onclick = stepOne;
+  </script>
+</body></html>
+"""
+
+
+def _row_html(link: Dict[str, str]) -> str:
+    return (
+        f"<tr><td>{link['name']}</td><td>{link['campaign']}</td>"
+        f"<td><a href=\"{link['unilink']}\">{link['unilink']}</a></td></tr>"
+    )
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    config = config or StubConfig()
+    state = StubState()
+    rng = random.Random(config.seed)
+    delay = Latency(config.jitter, config.seed)
+    link_ids = itertools.count(1)
+    image = b"\x89PNG\r\n\x1a\n" + b"\0" * max(0, config.image_bytes - 8)
+
+    app = FastAPI(title="AppTrove dashboard stub")
+    app.state.config = config
+    app.state.stub = state
+
+    def logged_in(request: Request) -> bool:
+        return request.cookies.get(SESSION_COOKIE) in state.sessions
+
+    @app.get("/login")
+    async def login_page():
+        await delay(config.page_latency_ms)
+        return HTMLResponse(LOGIN_PAGE)
+
+    @app.post("/api/login")
+    async def login():
+        await delay(config.api_latency_ms)
+        token = f"session-{next(link_ids)}-{int(time.time())}"
+        state.sessions.add(token)
+        state.stats["logins"] += 1
+        response = JSONResponse({"success": True})
+        response.set_cookie(SESSION_COOKIE, token, path="/")
+        return response
+
+    @app.get("/dashboard")
+    async def dashboard(request: Request):
+        await delay(config.page_latency_ms)
+        if not logged_in(request):
+            return RedirectResponse("/login")
+        return HTMLResponse(DASHBOARD_PAGE)
+
+    @app.get("/v2/app/{template_id}")
+    async def template_page(template_id: str, request: Request):
+        await delay(config.page_latency_ms)
+        state.stats["pageLoads"] += 1
+        if config.expire_every and state.stats["pageLoads"] % config.expire_every == 0:
+            state.sessions.clear()
+            state.stats["expiries"] += 1
+        if not logged_in(request):
+            return RedirectResponse("/login")
+        rows = "".join(_row_html(link) for link in state.links.get(template_id, []))
+        html = TEMPLATE_PAGE.replace("__TEMPLATE__", template_id).replace("__ROWS__", rows)
+        return HTMLResponse(html)
+
+    @app.post("/api/v2/apps/{template_id}/link")
+    async def create_link(template_id: str, request: Request):
+        await delay(config.api_latency_ms)
+        if not logged_in(request):
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        if rng.random() < config.fail_rate:
+            state.stats["injectedFailures"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+
+        body = await request.json()
+        link_id = f"stub{next(link_ids):06d}"
+        link = {
+            "name": body.get("name", ""),
+            "campaign": body.get("campaign", ""),
+            "unilink": f"{UNILINK_BASE}/{link_id}?pid={template_id}",
+        }
+        state.links.setdefault(template_id, []).append(link)
+        state.stats["linksCreated"] += 1
+
+        if rng.random() < config.drop_response_rate:
+            state.stats["droppedResponses"] += 1
+            return JSONResponse({"success": True})
+        return JSONResponse({"success": True, "data": {**link, "id": link_id}})
+
+    @app.get("/static/banner.png")
+    async def banner():
+        state.stats["imageRequests"] += 1
+        return Response(image, media_type="image/png")
+
+    @app.get("/static/fonts.css")
+    async def fonts():
+        return Response("body { font-family: sans-serif; }", media_type="text/css")
+
+    @app.get("/__stub/stats")
+    async def stats():
+        return {"stats": state.stats, "templates": {t: len(links) for t, links in state.links.items()}}
+
+    @app.post("/__stub/reset")
+    async def reset():
+        state.links.clear()
+        state.sessions.clear()
+        state.sessions.add(DEFAULT_SESSION_TOKEN)
+        for key in state.stats:
+            state.stats[key] = 0
+        return {"success": True}
+
+    return app
+
+
+def seed_cookie(host: str = "127.0.0.1") -> List[Dict[str, object]]:
+    """Cookie list (generate-cookies.py format) holding the stub's default session"""
+    return [{
+        "name": SESSION_COOKIE,
+        "value": DEFAULT_SESSION_TOKEN,
+        "domain": host,
+        "path": "/",
+        "expires": -1,
+        "httpOnly": False,
+        "secure": False,
+        "sameSite": "Lax",
+    }]
+
+
+class StubServer(BackgroundServer):
+    """Runs the stub on a background thread with its own event loop"""
+
+    name = "AppTrove stub"
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 8765):
+        super().__init__(create_stub_app(config), host, port)
+
+    def stats(self) -> Dict[str, object]:
+        state = self.app.state.stub
+        return {"stats": dict(state.stats), "templates": {t: len(links) for t, links in state.links.items()}}
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--page-latency-ms", type=int, default=0)
+    parser.add_argument("--api-latency-ms", type=int, default=0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-response-rate", type=float, default=0.0)
+    parser.add_argument("--expire-every", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def stub_config_from_args(args) -> StubConfig:
+    return StubConfig(
+        page_latency_ms=args.page_latency_ms,
+        api_latency_ms=args.api_latency_ms,
+        jitter=args.jitter,
+        fail_rate=args.fail_rate,
+        drop_response_rate=args.drop_response_rate,
+        expire_every=args.expire_every,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline AppTrove dashboard stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--write-cookies", help="Write a cookie file holding the stub session to this path")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    if args.write_cookies:
+        with open(args.write_cookies, "w") as f:
+            json.dump(seed_cookie(args.host), f, indent=2)
+        print(f"✅ Wrote stub session cookie to {args.write_cookies}")
+
+    import uvicorn
+    print(f"🧪 AppTrove stub on http://{args.host}:{args.port}")
+    uvicorn.run(create_stub_app(stub_config_from_args(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,412 @@
+"""
+API load test
+Starts the backend (serve.py, N workers) against the offline DynamoDB and
+Adjust/AppTrove stubs, drives a traffic mix and reports throughput plus
+p50/p95/p99 latency per endpoint, along with the DynamoDB and upstream calls
+the run caused. Save a run with --json and pass it to --compare after a
+change to get a before/after table.
+
+    cd backend
+    python benchmarks/bench_api.py --mix mixed --duration 30 --concurrency 16
+    python benchmarks/bench_api.py --mix registration --requests 500 --json before.json
+    python benchmarks/bench_api.py --mix registration --requests 500 --compare before.json
+    python benchmarks/bench_api.py --mix "dashboard_poll=5,stats_lookup=2" --env STATS_CACHE_TTL=0
+
+Needs only the backend's own requirements.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dynamo_stub
+import upstream_stub
+
+USERS_TABLE = "bench-users"
+LINKS_TABLE = "bench-links"
+ANALYTICS_TABLE = "bench-analytics"
+
+# Weighted scenarios; "name=weight,..." on the command line builds a custom mix
+MIXES: Dict[str, Dict[str, int]] = {
+    "mixed": {"admin_list": 3, "admin_search": 2, "user_detail": 2, "dashboard_poll": 4, "stats_lookup": 2, "register": 1},
+    "registration": {"register": 1},
+    "admin": {"admin_list": 4, "admin_search": 4, "user_detail": 2},
+    "dashboard": {"dashboard_poll": 1},
+    "stats": {"stats_lookup": 3, "link_stats": 1},
+}
+
+
+class Client:
+    """One simulated user: its own connection pool, RNG, conditional-GET cache and samples"""
+
+    def __init__(self, base_url: str, people: List[dict], seed: int, timeout: float = 30):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.rng = random.Random(seed)
+        self.people = people
+        self.approved = [p for p in people if p.get("linkId")] or people
+        self.timeout = timeout
+        self.etags: Dict[str, str] = {}
+        self.samples: List[tuple] = []
+
+    def request(self, label: str, method: str, path: str, revalidate: bool = False, **kwargs):
+        """Send one request and record (label, status or exception name, seconds)"""
+        headers = {}
+        if revalidate and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=headers, timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        self.samples.append((label, status, time.perf_counter() - started))
+        if revalidate and response is not None and response.headers.get("etag"):
+            self.etags[path] = response.headers["etag"]
+        return response
+
+
+# ---------- scenarios: each makes one request through the client ----------
+
+def register(client: Client):
+    suffix = uuid.uuid4().hex[:10]
+    body = {
+        "name": f"Bench {suffix}",
+        "email": f"bench-{suffix}@example.com",
+        "phone": f"9{client.rng.randint(100000000, 999999999)}",
+        "platform": client.rng.choice(dynamo_stub.PLATFORMS),
+        "socialHandle": f"@bench_{suffix}",
+        "followerCount": client.rng.randint(100, 100_000),
+    }
+    client.request("POST /api/users", "POST", "/api/users", json=body)
+
+
+def admin_list(client: Client):
+    params = {
+        "approvalStatus": client.rng.choice(["all", "pending", "approved", "rejected"]),
+        "status": client.rng.choice(["all", "active", "pending"]),
+    }
+    client.request("GET /api/users (filter)", "GET", "/api/users", params=params, revalidate=True)
+
+
+def admin_search(client: Client):
+    person = client.rng.choice(client.people)
+    term = person["name"].split()[client.rng.randrange(2)][:4]
+    client.request("GET /api/users (search)", "GET", "/api/users", params={"search": term})
+
+
+def user_detail(client: Client):
+    person = client.rng.choice(client.people)
+    client.request("GET /api/users/{id}", "GET", f"/api/users/{person['id']}")
+
+
+def dashboard_poll(client: Client):
+    # The admin dashboard refreshes both panels; a browser revalidates with its cached ETag
+    path = client.rng.choice(["/api/dashboard/stats", "/api/dashboard/analytics"])
+    client.request(f"GET {path}", "GET", path, revalidate=True)
+
+
+def stats_lookup(client: Client):
+    person = client.rng.choice(client.approved)
+    client.request("GET /api/trackier/stats", "GET", "/api/trackier/stats", params={"linkId": person.get("linkId") or person["id"]})
+
+
+def link_stats(client: Client):
+    person = client.rng.choice(client.approved)
+    client.request("GET /api/apptrove/stats", "GET", "/api/apptrove/stats", params={"linkId": person.get("linkId") or person["id"]})
+
+
+SCENARIOS: Dict[str, Callable[[Client], None]] = {
+    "register": register,
+    "admin_list": admin_list,
+    "admin_search": admin_search,
+    "user_detail": user_detail,
+    "dashboard_poll": dashboard_poll,
+    "stats_lookup": stats_lookup,
+    "link_stats": link_stats,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    if spec in MIXES:
+        return MIXES[spec]
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)} or a mix: {', '.join(MIXES)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the backend API against offline stubs")
+    parser.add_argument("--mix", default="mixed", help=f"One of {', '.join(MIXES)} or 'scenario=weight,...'")
+    parser.add_argument("--duration", type=float, default=20, help="Measured seconds (ignored with --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many measured requests")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of unmeasured traffic first")
+    parser.add_argument("--concurrency", type=int, default=8, help="Simulated clients (closed loop)")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request client timeout, seconds")
+    parser.add_argument("--workers", type=int, default=2, help="serve.py worker processes")
+    parser.add_argument("--users", type=int, default=2000, help="Seeded affiliates")
+    parser.add_argument("--analytics-per-user", type=float, default=0.5, help="Seeded analytics rows per affiliate")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--dynamo-port", type=int, default=8791)
+    parser.add_argument("--upstream-port", type=int, default=8792)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra backend setting, e.g. to flip a feature between before/after runs")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    parser.add_argument("--compare", help="A previous --json report to diff against")
+    dynamo_stub.add_stub_arguments(parser)
+    upstream_stub.add_stub_arguments(parser)
+    return parser.parse_args()
+
+
+# ---------- backend process ----------
+
+def backend_environment(args, dynamo_url: str, upstream: upstream_stub.UpstreamStubServer, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(upstream.environment())
+    env.update({
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "AWS_REGION": "ap-south-1",
+        "DYNAMODB_ENDPOINT_URL": dynamo_url,
+        "DYNAMODB_USERS_TABLE": USERS_TABLE,
+        "DYNAMODB_LINKS_TABLE": LINKS_TABLE,
+        "DYNAMODB_ANALYTICS_TABLE": ANALYTICS_TABLE,
+        "SHARED_CACHE_PATH": os.path.join(workdir, "shared-cache.sqlite"),
+        # Every simulated client shares 127.0.0.1; re-enable with --env RATE_LIMIT_ENABLED=true
+        "RATE_LIMIT_ENABLED": "false",
+        # The API bench leaves browser automation out; bench_automation.py covers it
+        "AUTOMATION_WORKERS": "0",
+        "AUTOMATION_POOL_WARM_ON_STARTUP": "false",
+        "PYTHONUNBUFFERED": "1",
+    })
+    for setting in args.env:
+        key, _, value = setting.partition("=")
+        env[key] = value
+    return env
+
+
+def start_backend(args, env: Dict[str, str], workdir: str):
+    log_path = os.path.join(workdir, "backend.log")
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "serve.py"),
+         "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(args.workers)],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if requests.get(base_url + "/health", timeout=1).ok:
+                return process, base_url, log_path
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_backend(process)
+    with open(log_path) as f:
+        print(f.read()[-3000:])
+    raise RuntimeError("Backend did not become healthy")
+
+
+def stop_backend(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ---------- load ----------
+
+def drive(clients: List[Client], mix: Dict[str, int], seconds: float, max_requests: int = 0):
+    """Closed loop: every client sends its next request as soon as the last one returns"""
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + seconds
+    budget = {"left": max_requests}
+    budget_lock = threading.Lock()
+    for client in clients:
+        client.samples = []
+
+    def take_one() -> bool:
+        if not max_requests:
+            return time.perf_counter() < deadline
+        with budget_lock:
+            budget["left"] -= 1
+            return budget["left"] >= 0
+
+    def run(index: int):
+        client = clients[index]
+        while take_one():
+            SCENARIOS[client.rng.choices(names, weights)[0]](client)
+
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(len(clients))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [s for client in clients for s in client.samples], time.perf_counter() - started
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    # Nearest-rank, so p99 of a small sample is a real observation
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples, elapsed: float) -> Dict[str, Dict[str, object]]:
+    by_label: Dict[str, List[tuple]] = {}
+    for label, status, seconds in samples:
+        by_label.setdefault(label, []).append((status, seconds))
+    by_label["ALL"] = [(status, seconds) for _, status, seconds in samples]
+
+    endpoints = {}
+    for label, rows in by_label.items():
+        latencies = sorted(seconds * 1000 for _, seconds in rows)
+        statuses: Dict[str, int] = {}
+        for status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 500)
+        endpoints[label] = {
+            "count": len(rows),
+            "errors": errors,
+            "statuses": statuses,
+            "rps": round(len(rows) / elapsed, 1) if elapsed else 0,
+            "p50Ms": round(percentile(latencies, 0.50), 2),
+            "p95Ms": round(percentile(latencies, 0.95), 2),
+            "p99Ms": round(percentile(latencies, 0.99), 2),
+            "maxMs": round(latencies[-1], 2),
+        }
+    return endpoints
+
+
+def stats_delta(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    return {key: value - before.get(key, 0) for key, value in after.items() if value - before.get(key, 0)}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def bench(args) -> Dict[str, object]:
+    mix = parse_mix(args.mix)
+    dynamo = dynamo_stub.DynamoStubServer(dynamo_stub.stub_config_from_args(args), port=args.dynamo_port)
+    people = dynamo_stub.seed_tables(dynamo.stub, args.users, args.analytics_per_user,
+                                     USERS_TABLE, LINKS_TABLE, ANALYTICS_TABLE, seed=args.seed)
+    upstream = upstream_stub.UpstreamStubServer(upstream_stub.stub_config_from_args(args), port=args.upstream_port)
+    dynamo.start()
+    upstream.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="api-bench-") as workdir:
+            env = backend_environment(args, dynamo.url, upstream, workdir)
+            process, base_url, log_path = start_backend(args, env, workdir)
+            try:
+                clients = [Client(base_url, people, args.seed * 1000 + i, args.timeout) for i in range(args.concurrency)]
+                if args.warmup:
+                    drive(clients, mix, args.warmup)
+                dynamo_before = dict(dynamo.stub.stats)
+                upstream_before = upstream.stats()["stats"]
+                samples, elapsed = drive(clients, mix, args.duration, args.requests)
+                return {
+                    "config": {
+                        "mix": mix,
+                        "concurrency": args.concurrency,
+                        "workers": args.workers,
+                        "users": args.users,
+                        "analyticsRows": dynamo.stub.count(ANALYTICS_TABLE),
+                        "env": args.env,
+                        "dynamo": vars(dynamo.stub.config),
+                        "upstream": vars(upstream.app.state.config),
+                        "revision": git_revision(),
+                    },
+                    "elapsedSeconds": round(elapsed, 2),
+                    "endpoints": summarize(samples, elapsed),
+                    "dynamoCalls": stats_delta(dynamo_before, dynamo.stub.stats),
+                    "upstreamCalls": stats_delta(upstream_before, upstream.stats()["stats"]),
+                }
+            finally:
+                stop_backend(process)
+    finally:
+        upstream.stop()
+        dynamo.stop()
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_report(report, baseline=None):
+    config = report["config"]
+    print()
+    print(f"Mix {config['mix']} | {config['concurrency']} clients | {config['workers']} worker(s) | "
+          f"{config['users']} users | {report['elapsedSeconds']}s | rev {config['revision']}")
+    header = f"{'endpoint':<34}{'count':>7}{'err':>5}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    print("\n" + header)
+    for label, row in sorted(report["endpoints"].items(), key=lambda item: (item[0] == "ALL", item[0])):
+        print(f"{label:<34}{row['count']:>7}{row['errors']:>5}{_fmt(row['rps']):>8}{_fmt(row['p50Ms']):>9}"
+              f"{_fmt(row['p95Ms']):>9}{_fmt(row['p99Ms']):>9}{_fmt(row['maxMs']):>9}")
+        extra = {s: n for s, n in row["statuses"].items() if s != "200"}
+        if extra and label != "ALL":
+            print(f"{'':<34}statuses {extra}")
+
+    print(f"\nDynamoDB calls: {json.dumps(report['dynamoCalls'])}")
+    print(f"Upstream calls: {json.dumps(report['upstreamCalls'])}")
+
+    if baseline:
+        print(f"\nvs {baseline['config'].get('revision')} {baseline['config'].get('env') or ''}".rstrip())
+        print(f"{'endpoint':<34}{'req/s':>16}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}")
+        for label, row in sorted(report["endpoints"].items(), key=lambda item: (item[0] == "ALL", item[0])):
+            old = baseline["endpoints"].get(label)
+            if not old:
+                continue
+            cells = []
+            for key in ("rps", "p50Ms", "p95Ms", "p99Ms"):
+                change = (row[key] - old[key]) / old[key] * 100 if old[key] else 0
+                cells.append(f"{_fmt(old[key])}→{_fmt(row[key])} {change:+.0f}%")
+            print(f"{label:<34}" + "".join(f"{cell:>18}" for cell in cells))
+
+
+def main():
+    args = parse_args()
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report = bench(args)
+    print_report(report, baseline)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
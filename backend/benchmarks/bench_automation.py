@@ -0,0 +1,193 @@
+"""
+Automation benchmark
+Drives create_link_via_automation (or the batch path) against the offline
+AppTrove stub and reports links/minute plus per-step p50/p95.
+
+    cd backend
+    python benchmarks/bench_automation.py --links 40 --concurrency 4 --page-latency-ms 150
+    python benchmarks/bench_automation.py --links 40 --batch-size 10
+    python benchmarks/bench_automation.py --links 20 --automation-mode legacy
+
+Needs Playwright's Chromium (`playwright install chromium`), nothing else.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from apptrove_stub import StubServer, add_stub_arguments, seed_cookie, stub_config_from_args
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the AppTrove link automation against a local stub")
+    parser.add_argument("--links", type=int, default=20, help="Links to create in the measured run")
+    parser.add_argument("--warmup", type=int, default=1, help="Links created before measuring (pool + session warm-up)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Jobs in flight at once")
+    parser.add_argument("--batch-size", type=int, default=0, help="Use the batch path with this many links per call")
+    parser.add_argument("--pool-size", type=int, default=None, help="AUTOMATION_POOL_SIZE (defaults to --concurrency)")
+    parser.add_argument("--workers", type=int, default=0, help="Run through N automation worker processes instead of in-process")
+    parser.add_argument("--automation-mode", choices=["fast", "legacy"], default=None)
+    parser.add_argument("--lean", choices=["true", "false"], default=None, help="AUTOMATION_LEAN_MODE")
+    parser.add_argument("--template-id", default="benchTPL")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    add_stub_arguments(parser)
+    return parser.parse_args()
+
+
+def configure_environment(args, stub_url: str, workdir: str):
+    """The engine reads its settings at import time, so this runs before importing it"""
+    cookies_file = os.path.join(workdir, "stub_cookies.json")
+    with open(cookies_file, "w") as f:
+        json.dump(seed_cookie(), f)
+
+    os.environ["APPTROVE_DASHBOARD_URL"] = stub_url
+    os.environ["APPTROVE_COOKIES_FILE"] = cookies_file
+    os.environ["APPTROVE_DASHBOARD_EMAIL"] = "bench@example.com"
+    os.environ["APPTROVE_DASHBOARD_PASSWORD"] = "bench"
+    os.environ.pop("APPTROVE_SESSION_CHECK_URL", None)
+    os.environ["AUTOMATION_POOL_SIZE"] = str(args.pool_size or max(args.concurrency, 1))
+    os.environ["AUTOMATION_CAPTURE_DIR"] = os.path.join(workdir, "captures")
+    if args.automation_mode:
+        os.environ["AUTOMATION_MODE"] = args.automation_mode
+    if args.lean:
+        os.environ["AUTOMATION_LEAN_MODE"] = args.lean
+
+
+def link_items(prefix: str, count: int):
+    # Zero-padded so no name is a substring of another in the links table
+    return [(f"{prefix}-{i:05d}", f"{prefix}-campaign") for i in range(count)]
+
+
+async def run_jobs(engine, template_id: str, items, concurrency: int, batch_size: int):
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def single(name, campaign):
+        async with semaphore:
+            return [await engine.create_link_via_automation(template_id, name, campaign)]
+
+    async def batch(chunk):
+        async with semaphore:
+            return await engine.create_links_batch_via_automation(template_id, chunk)
+
+    if batch_size > 0:
+        chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        groups = await asyncio.gather(*[batch(chunk) for chunk in chunks])
+    else:
+        groups = await asyncio.gather(*[single(name, campaign) for name, campaign in items])
+    return [result for group in groups for result in group]
+
+
+async def collect_timings(engine):
+    """Step summaries from this process, or from every worker in worker mode"""
+    status = await engine.status()
+    if "engines" in status:
+        return [e.get("timings", {"error": e.get("error")}) for e in status["engines"]]
+    return [status["timings"]]
+
+
+async def reset_timings(engine):
+    if hasattr(engine, "workers"):
+        # Worker histograms live in the worker processes; warm-up runs stay in them
+        return
+    from automation_timing import automation_run_seconds, automation_step_seconds
+    automation_step_seconds.reset()
+    automation_run_seconds.reset()
+
+
+async def bench(args, stub: StubServer):
+    if args.workers > 0:
+        from automation_workers import AutomationWorkerPool
+        engine = AutomationWorkerPool(args.workers, concurrency=max(1, args.concurrency // args.workers))
+    else:
+        import apptrove_automation as engine
+
+    await engine.start()
+    try:
+        run_id = int(time.time())
+        if args.warmup:
+            await run_jobs(engine, args.template_id, link_items(f"warm{run_id}", args.warmup), args.concurrency, 0)
+        await reset_timings(engine)
+
+        items = link_items(f"bench{run_id}", args.links)
+        started = time.perf_counter()
+        results = await run_jobs(engine, args.template_id, items, args.concurrency, args.batch_size)
+        elapsed = time.perf_counter() - started
+
+        succeeded = [r for r in results if r.get("success")]
+        errors = {}
+        for r in results:
+            if not r.get("success"):
+                errors[r.get("error", "unknown")] = errors.get(r.get("error", "unknown"), 0) + 1
+
+        return {
+            "config": {
+                "links": args.links,
+                "concurrency": args.concurrency,
+                "batchSize": args.batch_size,
+                "workers": args.workers,
+                "poolSize": int(os.environ["AUTOMATION_POOL_SIZE"]),
+                "automationMode": os.getenv("AUTOMATION_MODE", "fast"),
+                "leanMode": os.getenv("AUTOMATION_LEAN_MODE", "true"),
+                "stub": vars(stub.app.state.config),
+            },
+            "elapsedSeconds": round(elapsed, 2),
+            "succeeded": len(succeeded),
+            "failed": len(results) - len(succeeded),
+            "linksPerMinute": round(len(succeeded) / elapsed * 60, 1) if elapsed else 0,
+            "errors": errors,
+            "timings": await collect_timings(engine),
+            "stubStats": stub.stats(),
+        }
+    finally:
+        await engine.stop()
+
+
+def print_report(report):
+    print()
+    print(f"Links created:  {report['succeeded']}/{report['succeeded'] + report['failed']}")
+    print(f"Elapsed:        {report['elapsedSeconds']}s")
+    print(f"Throughput:     {report['linksPerMinute']} links/min")
+    for error, count in report["errors"].items():
+        print(f"  ✗ {count} x {error}")
+
+    for index, timings in enumerate(report["timings"]):
+        if "steps" not in timings:
+            print(f"\nWorker {index}: timings unavailable ({timings.get('error')})")
+            continue
+        title = f"Worker {index} steps" if len(report["timings"]) > 1 else "Steps"
+        print(f"\n{title:<24}{'outcome':<9}{'count':>7}{'p50 s':>9}{'p95 s':>9}")
+        for row in timings["steps"] + [{**r, "step": f"run:{r['kind']}"} for r in timings["runs"]]:
+            p50 = "-" if row["p50"] is None else f"{row['p50']:.3f}"
+            p95 = "-" if row["p95"] is None else f"{row['p95']:.3f}"
+            print(f"{row['step']:<24}{row['outcome']:<9}{row['count']:>7}{p50:>9}{p95:>9}")
+
+    print(f"\nStub: {json.dumps(report['stubStats']['stats'])}")
+
+
+def main():
+    args = parse_args()
+    stub = StubServer(stub_config_from_args(args), port=args.port).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="apptrove-bench-") as workdir:
+            configure_environment(args, stub.url, workdir)
+            report = asyncio.run(bench(args, stub))
+    finally:
+        stub.stop()
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,785 @@
+"""
+Offline stand-in for DynamoDB
+Speaks enough of the DynamoDB JSON protocol for boto3 (pointed at it with
+DYNAMODB_ENDPOINT_URL) to run the backend unchanged: CreateTable /
+DescribeTable / ListTables, GetItem, PutItem, UpdateItem, DeleteItem, Scan,
+Query, BatchGetItem and BatchWriteItem, with condition, filter, projection
+and update expressions. Scans page at 1 MB like the real service. Latency
+is injected per call and per scanned page so cache and query-shape changes
+show up in benchmarks.
+
+Run standalone:
+    python benchmarks/dynamo_stub.py --port 8766 --dynamo-latency-ms 5 --seed-users 2000
+and point the backend at it with DYNAMODB_ENDPOINT_URL=http://127.0.0.1:8766
+(plus any AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY, which are not checked).
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+from stub_server import BackgroundServer, Latency
+
+CONTENT_TYPE = "application/x-amz-json-1.0"
+# DynamoDB stops a Scan/Query page once it has read this much data
+PAGE_BYTES = 1024 * 1024
+ERROR_PREFIX = "com.amazonaws.dynamodb.v20120810#"
+
+
+@dataclass
+class DynamoStubConfig:
+    # Every call
+    latency_ms: int = 0
+    # Added per Scan/Query page read, on top of latency_ms
+    page_latency_ms: int = 0
+    jitter: float = 0.2
+    page_bytes: int = PAGE_BYTES
+    seed: Optional[int] = None
+
+
+class DynamoError(Exception):
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+        self.message = message
+
+
+def validation(message: str) -> DynamoError:
+    return DynamoError("ValidationException", message)
+
+
+# ---------- typed values ----------
+
+def serialize(value: Any) -> Dict[str, Any]:
+    """Plain Python -> DynamoDB typed JSON (for seeding)"""
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, (int, float, Decimal)):
+        return {"N": str(value)}
+    if isinstance(value, str):
+        return {"S": value}
+    if isinstance(value, dict):
+        return {"M": {k: serialize(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {"L": [serialize(v) for v in value]}
+    if isinstance(value, (set, frozenset)):
+        if all(isinstance(v, str) for v in value):
+            return {"SS": sorted(value)}
+        return {"NS": sorted(str(v) for v in value)}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def deserialize(typed: Dict[str, Any]) -> Any:
+    (kind, value), = typed.items()
+    if kind == "N":
+        return Decimal(value)
+    if kind == "NS":
+        return {Decimal(v) for v in value}
+    if kind in ("SS", "BS"):
+        return set(value)
+    if kind == "M":
+        return {k: deserialize(v) for k, v in value.items()}
+    if kind == "L":
+        return [deserialize(v) for v in value]
+    if kind == "NULL":
+        return None
+    return value
+
+
+def _number(typed: Dict[str, Any]) -> Decimal:
+    if "N" not in typed:
+        raise validation("An operand in the update expression has an incorrect data type")
+    return Decimal(typed["N"])
+
+
+def _num_str(value: Decimal) -> str:
+    return str(value.normalize()) if value != value.to_integral_value() else str(int(value))
+
+
+def item_size(item: Dict[str, Any]) -> int:
+    return len(json.dumps(item, separators=(",", ":")))
+
+
+# ---------- expressions ----------
+
+_TOKEN = re.compile(r"\s*(<>|<=|>=|[=<>(),.+\-\[\]]|#[A-Za-z0-9_]+|:[A-Za-z0-9_]+|[A-Za-z_][A-Za-z0-9_]*)")
+
+
+def tokenize(expression: str) -> List[str]:
+    tokens, position = [], 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise validation(f"Invalid expression near: {expression[position:position + 20]!r}")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive-descent parser for condition and update expressions over top-level/map paths"""
+
+    def __init__(self, expression: str, names: Dict[str, str], values: Dict[str, Any]):
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or (expected and token.upper() != expected):
+            raise validation(f"Expected {expected or 'a token'}, got {token!r}")
+        self.position += 1
+        return token
+
+    def done(self) -> bool:
+        return self.position >= len(self.tokens)
+
+    # Operands compile to functions of the item returning a typed value (or None if absent)
+
+    def path(self) -> Tuple[str, ...]:
+        parts = [self._name(self.take())]
+        while self.peek() == ".":
+            self.take()
+            parts.append(self._name(self.take()))
+        return tuple(parts)
+
+    def _name(self, token: str) -> str:
+        if token.startswith("#"):
+            if token not in self.names:
+                raise validation(f"Unknown expression attribute name {token}")
+            return self.names[token]
+        if not re.match(r"[A-Za-z_]", token):
+            raise validation(f"Expected an attribute name, got {token!r}")
+        return token
+
+    def operand(self):
+        token = self.peek()
+        if token is None:
+            raise validation("Unexpected end of expression")
+        if token.startswith(":"):
+            self.take()
+            if token not in self.values:
+                raise validation(f"Unknown expression attribute value {token}")
+            value = self.values[token]
+            return lambda item: value
+        if token.lower() == "size" and self.peek(1) == "(":
+            self.take(); self.take("(")
+            path = self.path()
+            self.take(")")
+
+            def size(item):
+                value = get_path(item, path)
+                if value is None:
+                    return None
+                (kind, raw), = value.items()
+                return {"N": str(len(raw))}
+            return size
+        path = self.path()
+        return lambda item: get_path(item, path)
+
+    # ---- conditions ----
+
+    def condition(self):
+        left = self.conjunction()
+        while self.peek() and self.peek().upper() == "OR":
+            self.take()
+            right = self.conjunction()
+            left = (lambda a, b: lambda item: a(item) or b(item))(left, right)
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.peek() and self.peek().upper() == "AND":
+            self.take()
+            right = self.negation()
+            left = (lambda a, b: lambda item: a(item) and b(item))(left, right)
+        return left
+
+    def negation(self):
+        if self.peek() and self.peek().upper() == "NOT":
+            self.take()
+            inner = self.negation()
+            return lambda item: not inner(item)
+        return self.predicate()
+
+    def predicate(self):
+        token = self.peek()
+        if token == "(":
+            self.take()
+            inner = self.condition()
+            self.take(")")
+            return inner
+        function = (token or "").lower()
+        if function in ("attribute_exists", "attribute_not_exists", "begins_with", "contains", "attribute_type") \
+                and self.peek(1) == "(":
+            self.take(); self.take("(")
+            path = self.path()
+            argument = None
+            if self.peek() == ",":
+                self.take()
+                argument = self.operand()
+            self.take(")")
+            return _function(function, path, argument)
+
+        left = self.operand()
+        op = self.take()
+        if op.upper() == "BETWEEN":
+            low = self.operand()
+            self.take("AND")
+            high = self.operand()
+            return lambda item: compare(low(item), "<=", left(item)) and compare(left(item), "<=", high(item))
+        if op.upper() == "IN":
+            self.take("(")
+            options = [self.operand()]
+            while self.peek() == ",":
+                self.take()
+                options.append(self.operand())
+            self.take(")")
+            return lambda item: any(compare(left(item), "=", option(item)) for option in options)
+        if op not in ("=", "<>", "<", "<=", ">", ">="):
+            raise validation(f"Unsupported operator {op!r}")
+        right = self.operand()
+        return lambda item: compare(left(item), op, right(item))
+
+    # ---- updates ----
+
+    def update(self) -> List[Tuple[str, Tuple[str, ...], Any]]:
+        actions = []
+        while not self.done():
+            clause = self.take().upper()
+            if clause not in ("SET", "REMOVE", "ADD", "DELETE"):
+                raise validation(f"Unknown update clause {clause!r}")
+            while True:
+                path = self.path()
+                if clause == "SET":
+                    self.take("=")
+                    actions.append(("SET", path, self.set_value()))
+                elif clause == "REMOVE":
+                    actions.append(("REMOVE", path, None))
+                else:
+                    actions.append((clause, path, self.operand()))
+                if self.peek() != ",":
+                    break
+                self.take()
+        return actions
+
+    def set_value(self):
+        left = self.set_operand()
+        if self.peek() in ("+", "-"):
+            op = self.take()
+            right = self.set_operand()
+
+            def arithmetic(item):
+                a, b = _number(left(item)), _number(right(item))
+                return {"N": _num_str(a + b if op == "+" else a - b)}
+            return arithmetic
+        return left
+
+    def set_operand(self):
+        function = (self.peek() or "").lower()
+        if function == "if_not_exists" and self.peek(1) == "(":
+            self.take(); self.take("(")
+            path = self.path()
+            self.take(",")
+            default = self.set_value()
+            self.take(")")
+            return lambda item: get_path(item, path) or default(item)
+        if function == "list_append" and self.peek(1) == "(":
+            self.take(); self.take("(")
+            first = self.set_value()
+            self.take(",")
+            second = self.set_value()
+            self.take(")")
+            return lambda item: {"L": (first(item) or {"L": []})["L"] + (second(item) or {"L": []})["L"]}
+        return self.operand()
+
+
+def _function(name: str, path, argument):
+    def evaluate(item):
+        value = get_path(item, path)
+        if name == "attribute_exists":
+            return value is not None
+        if name == "attribute_not_exists":
+            return value is None
+        if value is None:
+            return False
+        expected = argument(item)
+        if name == "attribute_type":
+            return next(iter(value)) == expected.get("S")
+        if name == "begins_with":
+            return "S" in value and "S" in expected and value["S"].startswith(expected["S"])
+        # contains: substring of a string, or member of a set/list
+        (kind, raw), = value.items()
+        if kind == "S":
+            return "S" in expected and expected["S"] in raw
+        if kind in ("SS", "NS", "BS"):
+            return next(iter(expected.values())) in raw
+        if kind == "L":
+            return expected in raw
+        return False
+    return evaluate
+
+
+def compare(left, op: str, right) -> bool:
+    if left is None or right is None:
+        return op == "<>" and (left is None) != (right is None)
+    a, b = deserialize(left), deserialize(right)
+    if op == "=":
+        return a == b
+    if op == "<>":
+        return a != b
+    if type(a) is not type(b) or not isinstance(a, (str, Decimal)):
+        return False
+    return {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[op]
+
+
+def get_path(item: Dict[str, Any], path: Tuple[str, ...]):
+    value = item.get(path[0])
+    for part in path[1:]:
+        if value is None or "M" not in value:
+            return None
+        value = value["M"].get(part)
+    return value
+
+
+def set_path(item: Dict[str, Any], path: Tuple[str, ...], value):
+    target = item
+    for part in path[:-1]:
+        nested = target.get(part)
+        if nested is None or "M" not in nested:
+            raise validation("The document path provided in the update expression is invalid for update")
+        target = nested["M"]
+    if value is None:
+        target.pop(path[-1], None)
+    else:
+        target[path[-1]] = value
+
+
+def apply_update(item: Dict[str, Any], actions) -> Dict[str, Any]:
+    # Every right-hand side sees the item as it was before this update
+    before = json.loads(json.dumps(item))
+    for clause, path, operand in actions:
+        if clause == "SET":
+            set_path(item, path, operand(before))
+        elif clause == "REMOVE":
+            set_path(item, path, None)
+        elif clause == "ADD":
+            current, delta = get_path(item, path), operand(before)
+            if "N" in delta:
+                total = (_number(current) if current else Decimal(0)) + _number(delta)
+                set_path(item, path, {"N": _num_str(total)})
+            else:
+                kind = next(iter(delta))
+                merged = set(current[kind]) if current else set()
+                set_path(item, path, {kind: sorted(merged | set(delta[kind]))})
+        elif clause == "DELETE":
+            current, remove = get_path(item, path), operand(before)
+            if current:
+                kind = next(iter(remove))
+                remaining = set(current[kind]) - set(remove[kind])
+                set_path(item, path, {kind: sorted(remaining)} if remaining else None)
+    return item
+
+
+def project(item: Dict[str, Any], expression: Optional[str], names) -> Dict[str, Any]:
+    if not expression:
+        return item
+    parser = Parser(expression, names, {})
+    paths = [parser.path()]
+    while not parser.done():
+        parser.take(",")
+        paths.append(parser.path())
+    return {path[0]: item[path[0]] for path in paths if path[0] in item}
+
+
+# ---------- tables ----------
+
+class Table:
+    def __init__(self, name: str, key_schema: List[Dict[str, str]], attribute_definitions=None):
+        self.name = name
+        self.key_schema = key_schema
+        self.attribute_definitions = attribute_definitions or [
+            {"AttributeName": k["AttributeName"], "AttributeType": "S"} for k in key_schema
+        ]
+        self.hash_key = next(k["AttributeName"] for k in key_schema if k["KeyType"] == "HASH")
+        self.range_key = next((k["AttributeName"] for k in key_schema if k["KeyType"] == "RANGE"), None)
+        self.items: Dict[Tuple, Dict[str, Any]] = {}
+        self.created = time.time()
+
+    def key_of(self, item: Dict[str, Any]) -> Tuple:
+        names = [self.hash_key] + ([self.range_key] if self.range_key else [])
+        try:
+            return tuple(json.dumps(item[name], sort_keys=True) for name in names)
+        except KeyError:
+            raise validation("One of the required keys was not given a value")
+
+    def key_attributes(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        names = [self.hash_key] + ([self.range_key] if self.range_key else [])
+        return {name: item[name] for name in names}
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "TableName": self.name,
+            "TableStatus": "ACTIVE",
+            "KeySchema": self.key_schema,
+            "AttributeDefinitions": self.attribute_definitions,
+            "ItemCount": len(self.items),
+            "TableSizeBytes": sum(item_size(i) for i in self.items.values()),
+            "CreationDateTime": self.created,
+            "TableArn": f"arn:aws:dynamodb:stub:000000000000:table/{self.name}",
+            "BillingModeSummary": {"BillingMode": "PAY_PER_REQUEST"},
+        }
+
+
+class DynamoStub:
+    """Tables and the operations over them; the FastAPI app is a thin dispatcher"""
+
+    def __init__(self, config: Optional[DynamoStubConfig] = None):
+        self.config = config or DynamoStubConfig()
+        self.tables: Dict[str, Table] = {}
+        self.stats: Dict[str, int] = {}
+
+    # -- seeding helpers (plain Python values) --
+
+    def create_table(self, name: str, hash_key: str = "id", range_key: Optional[str] = None) -> Table:
+        schema = [{"AttributeName": hash_key, "KeyType": "HASH"}]
+        if range_key:
+            schema.append({"AttributeName": range_key, "KeyType": "RANGE"})
+        self.tables[name] = Table(name, schema)
+        return self.tables[name]
+
+    def put(self, table: str, item: Dict[str, Any]):
+        typed = {k: serialize(v) for k, v in item.items() if v is not None}
+        target = self.tables.get(table) or self.create_table(table)
+        target.items[target.key_of(typed)] = typed
+
+    def count(self, table: str) -> int:
+        return len(self.tables[table].items) if table in self.tables else 0
+
+    # -- protocol --
+
+    def table(self, name: str) -> Table:
+        if name not in self.tables:
+            raise DynamoError("ResourceNotFoundException", f"Requested resource not found: Table: {name} not found")
+        return self.tables[name]
+
+    def record(self, op: str, table: str = "", n: int = 1):
+        key = f"{op}:{table}" if table else op
+        self.stats[key] = self.stats.get(key, 0) + n
+
+    @staticmethod
+    def consumed(body, response, read_bytes: int = 0, write_bytes: int = 0):
+        """Attach ConsumedCapacity the way DynamoDB prices it: 4 KB reads (half for eventual), 1 KB writes"""
+        if body.get("ReturnConsumedCapacity", "NONE") == "NONE":
+            return response
+        if write_bytes:
+            units = float(max(1, math.ceil(write_bytes / 1024)))
+        else:
+            units = max(1, math.ceil(read_bytes / 4096)) * (1.0 if body.get("ConsistentRead") else 0.5)
+        response["ConsumedCapacity"] = {"TableName": body["TableName"], "CapacityUnits": units}
+        return response
+
+    def check_condition(self, body, item):
+        expression = body.get("ConditionExpression")
+        if expression:
+            parser = Parser(expression, body.get("ExpressionAttributeNames"), body.get("ExpressionAttributeValues"))
+            if not parser.condition()(item or {}):
+                self.record("ConditionalCheckFailed", body["TableName"])
+                raise DynamoError("ConditionalCheckFailedException", "The conditional request failed")
+
+    def CreateTable(self, body):
+        if body["TableName"] in self.tables:
+            raise DynamoError("ResourceInUseException", f"Table already exists: {body['TableName']}")
+        table = Table(body["TableName"], body["KeySchema"], body.get("AttributeDefinitions"))
+        self.tables[table.name] = table
+        return {"TableDescription": table.describe()}
+
+    def DescribeTable(self, body):
+        return {"Table": self.table(body["TableName"]).describe()}
+
+    def ListTables(self, body):
+        return {"TableNames": sorted(self.tables)}
+
+    def GetItem(self, body):
+        table = self.table(body["TableName"])
+        self.record("GetItem", table.name)
+        item = table.items.get(table.key_of(body["Key"]))
+        if item is None:
+            return self.consumed(body, {})
+        response = {"Item": project(item, body.get("ProjectionExpression"), body.get("ExpressionAttributeNames"))}
+        return self.consumed(body, response, read_bytes=item_size(item))
+
+    def PutItem(self, body):
+        table = self.table(body["TableName"])
+        self.record("PutItem", table.name)
+        key = table.key_of(body["Item"])
+        old = table.items.get(key)
+        self.check_condition(body, old)
+        table.items[key] = body["Item"]
+        response = {"Attributes": old} if old and body.get("ReturnValues") == "ALL_OLD" else {}
+        return self.consumed(body, response, write_bytes=max(item_size(body["Item"]), item_size(old or {})))
+
+    def DeleteItem(self, body):
+        table = self.table(body["TableName"])
+        self.record("DeleteItem", table.name)
+        key = table.key_of(body["Key"])
+        old = table.items.get(key)
+        self.check_condition(body, old)
+        table.items.pop(key, None)
+        response = {"Attributes": old} if old and body.get("ReturnValues") == "ALL_OLD" else {}
+        return self.consumed(body, response, write_bytes=item_size(old or {}))
+
+    def UpdateItem(self, body):
+        table = self.table(body["TableName"])
+        self.record("UpdateItem", table.name)
+        key = table.key_of(body["Key"])
+        old = table.items.get(key)
+        self.check_condition(body, old)
+        item = json.loads(json.dumps(old)) if old else dict(body["Key"])
+        if body.get("UpdateExpression"):
+            parser = Parser(body["UpdateExpression"], body.get("ExpressionAttributeNames"), body.get("ExpressionAttributeValues"))
+            apply_update(item, parser.update())
+        table.items[key] = item
+        return self.consumed(body, self._returned_values(body, old, item),
+                             write_bytes=max(item_size(item), item_size(old or {})))
+
+    @staticmethod
+    def _returned_values(body, old, item):
+        returns = body.get("ReturnValues", "NONE")
+        if returns == "ALL_NEW":
+            return {"Attributes": item}
+        if returns == "ALL_OLD":
+            return {"Attributes": old} if old else {}
+        if returns in ("UPDATED_NEW", "UPDATED_OLD"):
+            source = item if returns == "UPDATED_NEW" else (old or {})
+            changed = {k for k in set(item) | set(old or {}) if item.get(k) != (old or {}).get(k)}
+            return {"Attributes": {k: source[k] for k in changed if k in source}}
+        return {}
+
+    def _read_page(self, table: Table, body, candidates: List[Tuple[Tuple, Dict[str, Any]]]):
+        names, values = body.get("ExpressionAttributeNames"), body.get("ExpressionAttributeValues")
+        keep = Parser(body["FilterExpression"], names, values).condition() if body.get("FilterExpression") else None
+
+        start = body.get("ExclusiveStartKey")
+        if start:
+            start_key = table.key_of(start)
+            keys = [key for key, _ in candidates]
+            candidates = candidates[keys.index(start_key) + 1:] if start_key in keys else []
+
+        limit = body.get("Limit")
+        read_bytes, scanned, items, last = 0, 0, [], None
+        for index, (key, item) in enumerate(candidates):
+            if (limit and scanned >= limit) or read_bytes >= self.config.page_bytes:
+                last = table.key_attributes(candidates[index - 1][1])
+                break
+            scanned += 1
+            read_bytes += item_size(item)
+            if keep is None or keep(item):
+                items.append(project(item, body.get("ProjectionExpression"), names))
+
+        response = {"Count": len(items), "ScannedCount": scanned}
+        if body.get("Select") != "COUNT":
+            response["Items"] = items
+        if last:
+            response["LastEvaluatedKey"] = last
+        return response, read_bytes
+
+    def Scan(self, body):
+        table = self.table(body["TableName"])
+        response, read_bytes = self._read_page(table, body, list(table.items.items()))
+        self.record("Scan", table.name)
+        self.record("ScannedItems", table.name, response["ScannedCount"])
+        return self.consumed(body, response, read_bytes=read_bytes)
+
+    def Query(self, body):
+        table = self.table(body["TableName"])
+        names, values = body.get("ExpressionAttributeNames"), body.get("ExpressionAttributeValues")
+        # Index key schemas aren't modelled: the key condition is evaluated like a filter
+        match = Parser(body["KeyConditionExpression"], names, values).condition()
+        candidates = [(key, item) for key, item in table.items.items() if match(item)]
+        if table.range_key:
+            candidates.sort(key=lambda pair: deserialize(pair[1].get(table.range_key, {"S": ""})),
+                            reverse=not body.get("ScanIndexForward", True))
+        response, read_bytes = self._read_page(table, body, candidates)
+        self.record("Query", table.name)
+        self.record("ScannedItems", table.name, response["ScannedCount"])
+        return self.consumed(body, response, read_bytes=read_bytes)
+
+    def BatchGetItem(self, body):
+        responses = {}
+        for name, request in body["RequestItems"].items():
+            table = self.table(name)
+            self.record("BatchGetItem", name, len(request["Keys"]))
+            found = [table.items.get(table.key_of(key)) for key in request["Keys"]]
+            responses[name] = [
+                project(item, request.get("ProjectionExpression"), request.get("ExpressionAttributeNames"))
+                for item in found if item
+            ]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def BatchWriteItem(self, body):
+        for name, requests in body["RequestItems"].items():
+            table = self.table(name)
+            self.record("BatchWriteItem", name, len(requests))
+            for request in requests:
+                if "PutRequest" in request:
+                    item = request["PutRequest"]["Item"]
+                    table.items[table.key_of(item)] = item
+                else:
+                    table.items.pop(table.key_of(request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": {}}
+
+    def dispatch(self, operation: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        handler = getattr(self, operation, None) if operation[:1].isupper() else None
+        if handler is None:
+            raise DynamoError("UnknownOperationException", f"{operation} is not supported by the stub")
+        return handler(body)
+
+
+def create_stub_app(config: Optional[DynamoStubConfig] = None, stub: Optional[DynamoStub] = None) -> FastAPI:
+    stub = stub or DynamoStub(config)
+    config = stub.config
+    delay = Latency(config.jitter, config.seed)
+
+    app = FastAPI(title="DynamoDB stub")
+    app.state.stub = stub
+
+    @app.post("/")
+    async def handle(request: Request):
+        operation = request.headers.get("x-amz-target", "").split(".")[-1]
+        body = json.loads(await request.body() or b"{}")
+        await delay(config.latency_ms)
+        try:
+            result = stub.dispatch(operation, body)
+            status = 200
+        except DynamoError as e:
+            result, status = {"__type": ERROR_PREFIX + e.kind, "message": e.message}, 400
+        except (KeyError, TypeError) as e:
+            result, status = {"__type": ERROR_PREFIX + "ValidationException", "message": f"Malformed request: {e}"}, 400
+        if operation in ("Scan", "Query") and status == 200:
+            await delay(config.page_latency_ms)
+        return Response(json.dumps(result), status_code=status, media_type=CONTENT_TYPE)
+
+    @app.get("/__stub/stats")
+    async def stats():
+        return {"stats": stub.stats, "tables": {name: len(t.items) for name, t in stub.tables.items()}}
+
+    @app.post("/__stub/reset")
+    async def reset():
+        stub.stats.clear()
+        return {"success": True}
+
+    return app
+
+
+class DynamoStubServer(BackgroundServer):
+    name = "DynamoDB stub"
+
+    def __init__(self, config: Optional[DynamoStubConfig] = None, host: str = "127.0.0.1", port: int = 8766):
+        self.stub = DynamoStub(config)
+        super().__init__(create_stub_app(stub=self.stub), host, port)
+
+    def stats(self) -> Dict[str, object]:
+        return {"stats": dict(self.stub.stats), "tables": {name: len(t.items) for name, t in self.stub.tables.items()}}
+
+
+# ---------- seed data ----------
+
+PLATFORMS = ["instagram", "youtube", "telegram", "twitter", "facebook"]
+FIRST_NAMES = ["Aarav", "Diya", "Ishaan", "Kavya", "Rohan", "Saanvi", "Vihaan", "Ananya", "Arjun", "Meera"]
+
+
+def seed_tables(stub: DynamoStub, users: int, analytics_per_user: float = 0.0,
+                users_table: str = "edurise-users", links_table: str = "edurise-links",
+                analytics_table: str = "edurise-analytics", seed: int = 7) -> List[Dict[str, Any]]:
+    """Affiliates in every approval state (~60% approved with a tracker), plus analytics rows"""
+    rng = random.Random(seed)
+    for name in (users_table, links_table, analytics_table):
+        if name not in stub.tables:
+            stub.create_table(name)
+
+    people = []
+    for i in range(users):
+        first = rng.choice(FIRST_NAMES)
+        approval = rng.choices(["approved", "pending", "rejected"], weights=[6, 3, 1])[0]
+        created = f"2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00"
+        tracker = f"trk{i:06d}" if approval == "approved" else None
+        user = {
+            "id": f"user-{i:06d}",
+            "name": f"{first} {i}",
+            "email": f"{first.lower()}{i}@example.com",
+            "phone": f"9{rng.randint(100000000, 999999999)}",
+            "platform": rng.choice(PLATFORMS),
+            "socialHandle": f"@{first.lower()}_{i}",
+            "followerCount": rng.randint(100, 500_000),
+            "status": "active" if approval == "approved" else "pending",
+            "approvalStatus": approval,
+            "tracker_token": tracker,
+            "unilink": f"https://app.adjust.com/{tracker}" if tracker else None,
+            "linkId": tracker,
+            "createdAt": created,
+            "updatedAt": created,
+        }
+        stub.put(users_table, user)
+        people.append(user)
+
+    rows = int(users * analytics_per_user)
+    for i in range(rows):
+        user = people[rng.randrange(len(people))] if people else {"id": "none"}
+        stub.put(analytics_table, {
+            "id": f"an-{i:07d}",
+            "userId": user["id"],
+            "date": f"2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}",
+            "clicks": rng.randint(0, 500),
+            "installs": rng.randint(0, 40),
+            "revenue": Decimal(str(round(rng.uniform(0, 300), 2))),
+        })
+    return people
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--dynamo-latency-ms", type=int, default=0, help="Per DynamoDB call")
+    parser.add_argument("--dynamo-page-latency-ms", type=int, default=0, help="Extra per Scan/Query page")
+
+
+def stub_config_from_args(args) -> DynamoStubConfig:
+    return DynamoStubConfig(
+        latency_ms=args.dynamo_latency_ms,
+        page_latency_ms=args.dynamo_page_latency_ms,
+        seed=getattr(args, "seed", None),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline DynamoDB stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--seed-users", type=int, default=0, help="Create the backend's tables with this many users")
+    parser.add_argument("--seed-analytics", type=float, default=0.0, help="Analytics rows per seeded user")
+    parser.add_argument("--seed", type=int, default=None)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    stub = DynamoStub(stub_config_from_args(args))
+    seed_tables(stub, args.seed_users, args.seed_analytics)
+    print(f"DynamoDB stub on http://{args.host}:{args.port} ({args.seed_users} users)")
+    uvicorn.run(create_stub_app(stub=stub), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,54 @@
+"""
+Shared plumbing for the benchmark stubs
+Runs an ASGI app under uvicorn on a background thread, and injects latency
+with jitter the same way in every stub.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+
+class BackgroundServer:
+    """Runs an app on a background thread with its own event loop"""
+
+    name = "Stub"
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 8765):
+        import uvicorn
+
+        self.app = app
+        self.host = host
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10):
+        self.thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f"{self.name} did not start on {self.url}")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+class Latency:
+    """Sleeps `ms` +/- `jitter` (a fraction) per call; seeded for reproducible runs"""
+
+    def __init__(self, jitter: float = 0.2, seed=None):
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+
+    async def __call__(self, ms: int):
+        if ms > 0:
+            await asyncio.sleep(ms * (1 + self.rng.uniform(-self.jitter, self.jitter)) / 1000)
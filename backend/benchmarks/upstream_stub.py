@@ -0,0 +1,182 @@
+"""
+Offline stand-in for the Adjust and AppTrove REST APIs
+Serves the calls the backend makes outside the dashboard automation:
+Adjust tracker creation and the Report Service, and AppTrove's
+link-template and unilink stats endpoints. Report rows are derived from the
+tracker token, so repeated runs see the same numbers. Latency and failures
+can be injected per service.
+
+Run standalone:
+    python benchmarks/upstream_stub.py --port 8767 --adjust-latency-ms 250
+and point the backend at it with
+    ADJUST_API_URL=http://127.0.0.1:8767
+    ADJUST_REPORT_URL=http://127.0.0.1:8767/reports-service/report
+    APPTROVE_API_URL=http://127.0.0.1:8767
+"""
+
+import argparse
+import hashlib
+import itertools
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from stub_server import BackgroundServer, Latency
+
+
+@dataclass
+class UpstreamStubConfig:
+    adjust_latency_ms: int = 0
+    apptrove_latency_ms: int = 0
+    jitter: float = 0.2
+    # Fraction of calls answered with a 500
+    fail_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class UpstreamStubState:
+    stats: Dict[str, int] = field(default_factory=lambda: {
+        "trackersCreated": 0,
+        "reportRequests": 0,
+        "templateRequests": 0,
+        "linkStatsRequests": 0,
+        "injectedFailures": 0,
+    })
+
+
+def report_row(tracker: str) -> Dict[str, float]:
+    """Stable per-tracker numbers, so dashboards and caches see consistent data"""
+    digest = int(hashlib.sha1(tracker.encode()).hexdigest()[:8], 16)
+    clicks = digest % 5000
+    installs = clicks // 12
+    return {
+        "network": tracker,
+        "clicks": clicks,
+        "installs": installs,
+        "revenue_events": installs // 4,
+        "revenue": round(installs * 3.5, 2),
+        "network_cost": round(installs * 1.25, 2),
+    }
+
+
+def create_stub_app(config: Optional[UpstreamStubConfig] = None) -> FastAPI:
+    config = config or UpstreamStubConfig()
+    state = UpstreamStubState()
+    rng = random.Random(config.seed)
+    delay = Latency(config.jitter, config.seed)
+    tracker_ids = itertools.count(1)
+
+    app = FastAPI(title="Adjust / AppTrove API stub")
+    app.state.config = config
+    app.state.stub = state
+
+    def injected_failure():
+        if rng.random() < config.fail_rate:
+            state.stats["injectedFailures"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        return None
+
+    @app.post("/public/v2/apps/{app_token}/trackers")
+    async def create_tracker(app_token: str, request: Request):
+        await delay(config.adjust_latency_ms)
+        failure = injected_failure()
+        if failure:
+            return failure
+        body = await request.json()
+        state.stats["trackersCreated"] += 1
+        token = f"stub{next(tracker_ids):06d}"
+        return {"data": {"items": [{"token": token, "name": body.get("name"), "label": body.get("label")}]}}
+
+    @app.get("/reports-service/report")
+    async def report(tracker_filter: str = ""):
+        await delay(config.adjust_latency_ms)
+        failure = injected_failure()
+        if failure:
+            return failure
+        state.stats["reportRequests"] += 1
+        return {"rows": [report_row(tracker_filter)] if tracker_filter else []}
+
+    @app.get("/internal/link-template")
+    async def link_templates():
+        await delay(config.apptrove_latency_ms)
+        failure = injected_failure()
+        if failure:
+            return failure
+        state.stats["templateRequests"] += 1
+        templates = [{"id": f"tpl{i}", "name": f"Template {i}", "status": "active"} for i in range(1, 6)]
+        return {"data": {"linkTemplateList": templates}}
+
+    @app.get("/internal/unilink/{link_id}/stats")
+    async def link_stats(link_id: str):
+        await delay(config.apptrove_latency_ms)
+        failure = injected_failure()
+        if failure:
+            return failure
+        state.stats["linkStatsRequests"] += 1
+        row = report_row(link_id)
+        return {"clicks": row["clicks"], "conversions": row["installs"], "revenue": row["revenue"]}
+
+    @app.get("/__stub/stats")
+    async def stats():
+        return {"stats": state.stats}
+
+    @app.post("/__stub/reset")
+    async def reset():
+        for key in state.stats:
+            state.stats[key] = 0
+        return {"success": True}
+
+    return app
+
+
+class UpstreamStubServer(BackgroundServer):
+    name = "Upstream API stub"
+
+    def __init__(self, config: Optional[UpstreamStubConfig] = None, host: str = "127.0.0.1", port: int = 8767):
+        super().__init__(create_stub_app(config), host, port)
+
+    def stats(self) -> Dict[str, object]:
+        return {"stats": dict(self.app.state.stub.stats)}
+
+    def environment(self) -> Dict[str, str]:
+        """Backend settings that route its Adjust / AppTrove calls here"""
+        return {
+            "ADJUST_API_URL": self.url,
+            "ADJUST_REPORT_URL": f"{self.url}/reports-service/report",
+            "ADJUST_API_TOKEN": "stub-token",
+            "ADJUST_APP_TOKEN": "stubapp",
+            "APPTROVE_API_URL": self.url,
+        }
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--adjust-latency-ms", type=int, default=0)
+    parser.add_argument("--apptrove-latency-ms", type=int, default=0)
+    parser.add_argument("--upstream-fail-rate", type=float, default=0.0)
+
+
+def stub_config_from_args(args) -> UpstreamStubConfig:
+    return UpstreamStubConfig(
+        adjust_latency_ms=args.adjust_latency_ms,
+        apptrove_latency_ms=args.apptrove_latency_ms,
+        fail_rate=args.upstream_fail_rate,
+        seed=getattr(args, "seed", None),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline Adjust / AppTrove API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--seed", type=int, default=None)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    print(f"Upstream API stub on http://{args.host}:{args.port}")
+    uvicorn.run(create_stub_app(stub_config_from_args(args)), host=args.host, port=args.port, log_level="warning")
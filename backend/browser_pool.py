@@ -0,0 +1,402 @@
+"""
+Warm Chromium pool for AppTrove dashboard automation
+Keeps one long-lived browser with pre-authenticated contexts so link creation
+skips browser startup and login on the warm path.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from startup import timed_init
+
+
+# Pool configuration
+AUTOMATION_POOL_SIZE = int(os.getenv("AUTOMATION_POOL_SIZE", "2"))
+AUTOMATION_CONTEXT_MAX_JOBS = int(os.getenv("AUTOMATION_CONTEXT_MAX_JOBS", "50"))
+AUTOMATION_LEASE_TIMEOUT = float(os.getenv("AUTOMATION_LEASE_TIMEOUT", "60"))
+AUTOMATION_HEALTH_CHECK_INTERVAL = float(os.getenv("AUTOMATION_HEALTH_CHECK_INTERVAL", "60"))
+
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled'
+]
+
+
+class PoolAuthError(Exception):
+    """A fresh context could not be authenticated against the dashboard"""
+
+
+class PoolLeaseTimeout(Exception):
+    """No pooled context became free within the lease timeout"""
+
+
+async def _close_quietly(target):
+    try:
+        await target.close()
+    except Exception:
+        pass
+
+
+class PooledContext:
+    """A browser context plus its working page, owned by the pool"""
+
+    def __init__(self, context, page, generation: int):
+        self.context = context
+        self.page = page
+        self.generation = generation
+        self.jobs = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        # Set by jobs (or the pool) when the context must not be reused
+        self.broken = False
+
+
+class BrowserPool:
+    """
+    Long-lived browser with a fixed number of authenticated contexts.
+
+    `storage_state()`, if given, returns the Playwright storage_state new
+    contexts are created with. `prepare_context(context)`, if given, runs
+    before the context opens its page (e.g. to install request routing).
+    `authenticate(context, page)`, if given, runs
+    once per context. Either must raise PoolAuthError if the dashboard
+    session cannot be established. Contexts are recycled after `max_jobs`
+    leases, after a failed job, or when the browser crashes.
+    """
+
+    def __init__(
+        self,
+        authenticate: Optional[Callable[[Any, Any], Awaitable[None]]] = None,
+        size: int = AUTOMATION_POOL_SIZE,
+        max_jobs: int = AUTOMATION_CONTEXT_MAX_JOBS,
+        lease_timeout: float = AUTOMATION_LEASE_TIMEOUT,
+        health_check_interval: float = AUTOMATION_HEALTH_CHECK_INTERVAL,
+        context_options: Optional[Dict[str, Any]] = None,
+        launch_args: Optional[List[str]] = None,
+        storage_state: Optional[Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = None,
+        prepare_context: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ):
+        self.authenticate = authenticate
+        self.storage_state = storage_state
+        self.prepare_context = prepare_context
+        self.size = max(1, size)
+        self.max_jobs = max(1, max_jobs)
+        self.lease_timeout = lease_timeout
+        self.health_check_interval = health_check_interval
+        self.context_options = context_options or {}
+        self.launch_args = launch_args or BROWSER_ARGS
+
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._live = 0
+        self._creating = 0
+        # Creations scheduled but not started yet; counted so sizing never overshoots
+        self._pending = 0
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._browser_lock = asyncio.Lock()
+        self._health_task = None
+        self._background = set()
+        self.last_error: Optional[str] = None
+        self.stats = {
+            "leases": 0,
+            "coldStarts": 0,
+            "recycled": 0,
+            "leaseTimeouts": 0,
+            "browserLaunches": 0,
+            "authFailures": 0,
+        }
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        """Launch the browser and fill the pool. Safe to call repeatedly."""
+        async with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            try:
+                await self._ensure_browser()
+            except Exception as e:
+                self._started = False
+                self.last_error = str(e)
+                raise
+            results = await asyncio.gather(
+                *[self._add_idle_context() for _ in range(self.size)],
+                return_exceptions=True
+            )
+            warmed = len([r for r in results if not isinstance(r, Exception)])
+            print(f"✅ Automation pool warm: {warmed}/{self.size} contexts")
+            if self.health_check_interval > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        while not self._idle.empty():
+            slot = self._idle.get_nowait()
+            await self._retire(slot, count=False)
+        if self._browser:
+            await _close_quietly(self._browser)
+            self._browser = None
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+        self._started = False
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self._browser and self._browser.is_connected():
+                return self._browser
+            if self._playwright is None:
+                # Imported here so loading the engine doesn't pay for Playwright
+                with timed_init("playwright"):
+                    from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+            if self._browser:
+                print("⚠️ Automation browser disconnected, relaunching")
+                await _close_quietly(self._browser)
+            self._browser = await self._playwright.chromium.launch(headless=True, args=self.launch_args)
+            self._generation += 1
+            self.stats["browserLaunches"] += 1
+            return self._browser
+
+    # ---------- contexts ----------
+
+    async def _create_context(self) -> PooledContext:
+        self._creating += 1
+        try:
+            browser = await self._ensure_browser()
+            options = dict(self.context_options)
+            try:
+                if self.storage_state:
+                    state = await self.storage_state()
+                    if state:
+                        options["storage_state"] = state
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            context = await browser.new_context(**options)
+            try:
+                if self.prepare_context:
+                    await self.prepare_context(context)
+                page = await context.new_page()
+                if self.authenticate:
+                    await self.authenticate(context, page)
+            except Exception as e:
+                await _close_quietly(context)
+                if isinstance(e, PoolAuthError):
+                    self.stats["authFailures"] += 1
+                self.last_error = str(e)
+                raise
+            self._live += 1
+            return PooledContext(context, page, self._generation)
+        finally:
+            self._creating -= 1
+
+    async def _add_idle_context(self):
+        slot = await self._create_context()
+        self._idle.put_nowait(slot)
+        return slot
+
+    def _vacancies(self) -> int:
+        return self.size - self._live - self._creating - self._pending
+
+    def _start_creating(self) -> asyncio.Task:
+        """Create a context in a task, counted toward the pool size from this call on"""
+        self._pending += 1
+
+        async def create():
+            # _create_context counts itself in _creating before its first await
+            self._pending -= 1
+            return await self._create_context()
+        return asyncio.ensure_future(create())
+
+    def _adopt(self, task: asyncio.Task):
+        """Done callback: a context whose lease gave up waiting joins the idle pool"""
+        if not task.cancelled() and task.exception() is None:
+            self._idle.put_nowait(task.result())
+
+    def _spawn_replacement(self):
+        if self._vacancies() <= 0:
+            return
+        task = self._start_creating()
+
+        def refilled(task: asyncio.Task):
+            self._background.discard(task)
+            if task.cancelled():
+                return
+            if task.exception() is not None:
+                print(f"⚠️ Automation pool refill failed: {task.exception()}")
+                return
+            self._idle.put_nowait(task.result())
+
+        self._background.add(task)
+        task.add_done_callback(refilled)
+
+    async def new_scratch_context(self, storage_state: Optional[Dict[str, Any]] = None):
+        """An un-pooled context on the shared browser (caller closes it)"""
+        browser = await self._ensure_browser()
+        options = dict(self.context_options)
+        if storage_state:
+            options["storage_state"] = storage_state
+        return await browser.new_context(**options)
+
+    async def recycle_idle(self):
+        """Replace every idle context, e.g. after the session was renewed"""
+        for _ in range(self._idle.qsize()):
+            slot = self._take_idle()
+            if slot is None:
+                break
+            await self._retire(slot)
+            if self._started:
+                self._spawn_replacement()
+
+    def _take_idle(self) -> Optional[PooledContext]:
+        """An idle slot for a sweep, or None once leases have taken the rest during its awaits"""
+        try:
+            return self._idle.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    async def _retire(self, slot: PooledContext, count: bool = True):
+        self._live -= 1
+        if count:
+            self.stats["recycled"] += 1
+        await _close_quietly(slot.context)
+
+    def _usable(self, slot: PooledContext) -> bool:
+        return (
+            not slot.broken
+            and slot.generation == self._generation
+            and self._browser is not None
+            and self._browser.is_connected()
+            and not slot.page.is_closed()
+        )
+
+    # ---------- leasing ----------
+
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None):
+        """
+        Borrow an authenticated context for one job.
+        Raises PoolLeaseTimeout if none is free in time.
+        """
+        await self.start()
+        loop = asyncio.get_running_loop()
+        timeout = self.lease_timeout if timeout is None else timeout
+        deadline = loop.time() + timeout
+
+        while True:
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                if self._idle.empty() and self._vacancies() > 0:
+                    # Cold path: pay for a context (and login) inline, within the deadline
+                    self.stats["coldStarts"] += 1
+                    creating = self._start_creating()
+                    try:
+                        slot = await asyncio.wait_for(asyncio.shield(creating), remaining)
+                    except BaseException:
+                        # Don't waste the login: the context joins the idle pool once it's ready
+                        creating.add_done_callback(self._adopt)
+                        raise
+                else:
+                    slot = await asyncio.wait_for(self._idle.get(), remaining)
+            except asyncio.TimeoutError:
+                self.stats["leaseTimeouts"] += 1
+                raise PoolLeaseTimeout(
+                    f"No automation context free within {timeout}s"
+                    + (f" (last error: {self.last_error})" if self.last_error else "")
+                )
+            if self._usable(slot):
+                break
+            await self._retire(slot)
+
+        slot.jobs += 1
+        self.stats["leases"] += 1
+        try:
+            yield slot
+        except BaseException:
+            # Page state is unknown after a failed job - never hand it out again
+            slot.broken = True
+            raise
+        finally:
+            self._release(slot)
+
+    def _release(self, slot: PooledContext):
+        slot.last_used = time.time()
+        if self._usable(slot) and slot.jobs < self.max_jobs:
+            self._idle.put_nowait(slot)
+            return
+
+        async def recycle():
+            await self._retire(slot)
+            if self._started:
+                self._spawn_replacement()
+
+        task = asyncio.create_task(recycle())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    # ---------- health ----------
+
+    async def _probe(self, slot: PooledContext) -> bool:
+        if not self._usable(slot):
+            return False
+        try:
+            return await asyncio.wait_for(slot.page.evaluate("1"), 5) == 1
+        except Exception:
+            return False
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Probe idle contexts, recycle dead ones and top the pool back up"""
+        if self._browser is None or not self._browser.is_connected():
+            try:
+                await self._ensure_browser()
+            except Exception as e:
+                self.last_error = str(e)
+        for _ in range(self._idle.qsize()):
+            slot = self._take_idle()
+            if slot is None:
+                break
+            if await self._probe(slot):
+                self._idle.put_nowait(slot)
+            else:
+                await self._retire(slot)
+        for _ in range(self._vacancies()):
+            self._spawn_replacement()
+        return self.status()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                print(f"⚠️ Automation pool health check failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "started": self._started,
+            "size": self.size,
+            "live": self._live,
+            "idle": self._idle.qsize(),
+            "creating": self._creating,
+            "pending": self._pending,
+            "browserConnected": bool(self._browser and self._browser.is_connected()),
+            "lastError": self.last_error,
+            **self.stats,
+        }
@@ -0,0 +1,112 @@
+"""
+Cohort breakdowns for the dashboard stats
+One pass over the cached user list and each approved affiliate's (cached)
+Adjust stats fills the overall totals plus per-cohort totals by platform,
+approval status, signup week and follower band. Richer dashboards cost no
+extra scans or upstream calls.
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+from rollups import parse_day, period_start
+
+# Signup weeks older than this many weeks are folded into "earlier"
+STATS_COHORT_WEEKS = int(os.getenv("STATS_COHORT_WEEKS", "12"))
+
+DIMENSIONS = ("platform", "approvalStatus", "signupWeek", "followerBand")
+STAT_FIELDS = ("clicks", "installs", "purchases", "earnings", "revenue")
+
+
+def follower_band(count: Any) -> str:
+    try:
+        count = int(count or 0)
+    except (TypeError, ValueError):
+        count = 0
+    for limit, label in ((1_000, "<1K"), (10_000, "1K-10K"), (100_000, "10K-100K"), (1_000_000, "100K-1M")):
+        if count < limit:
+            return label
+    return "1M+"
+
+
+def platform_key(value: Optional[str]) -> str:
+    return (value or "").strip().lower() or "unknown"
+
+
+def signup_week(user: dict) -> Optional[str]:
+    try:
+        return period_start(parse_day(user.get("createdAt")), "week")
+    except (TypeError, ValueError):
+        return None
+
+
+def rates(totals: Dict[str, float]) -> Dict[str, float]:
+    """Percentages: clicks -> installs -> purchases"""
+    clicks, installs, purchases = totals["clicks"], totals["installs"], totals["purchases"]
+    return {
+        "installRate": installs / clicks * 100 if clicks else 0,
+        "purchaseRate": purchases / installs * 100 if installs else 0,
+        "conversionRate": installs / clicks * 100 if clicks else 0,
+    }
+
+
+def _empty() -> Dict[str, float]:
+    return {"affiliates": 0, "active": 0, "pending": 0, "approved": 0, **{f: 0 for f in STAT_FIELDS}}
+
+
+class CohortStats:
+    def __init__(self):
+        self.totals = _empty()
+        self.cohorts: Dict[str, Dict[str, Dict[str, float]]] = {d: {} for d in DIMENSIONS}
+
+    @staticmethod
+    def keys(user: dict) -> Dict[str, str]:
+        return {
+            "platform": platform_key(user.get("platform")),
+            "approvalStatus": user.get("approvalStatus") or "unknown",
+            "signupWeek": signup_week(user) or "unknown",
+            "followerBand": follower_band(user.get("followerCount")),
+        }
+
+    def add(self, user: dict, stats: Optional[Dict[str, Any]] = None):
+        """One affiliate, with their Adjust stats if they have any"""
+        buckets = [self.totals] + [
+            self.cohorts[dimension].setdefault(key, _empty()) for dimension, key in self.keys(user).items()
+        ]
+        values = {
+            "affiliates": 1,
+            "active": int(user.get("status") == "active"),
+            "pending": int(user.get("approvalStatus") == "pending"),
+            "approved": int(user.get("approvalStatus") == "approved"),
+        }
+        if stats:
+            values.update({
+                "clicks": stats.get("clicks", 0),
+                "installs": stats.get("installs", stats.get("conversions", 0)),
+                "purchases": stats.get("purchases", 0),
+                "earnings": stats.get("payout", 0),
+                "revenue": stats.get("revenue", 0),
+            })
+        for bucket in buckets:
+            for field, value in values.items():
+                bucket[field] += value
+
+    def _fold_old_weeks(self):
+        weeks = self.cohorts["signupWeek"]
+        dated = sorted((w for w in weeks if w not in ("unknown", "earlier")), reverse=True)
+        for week in dated[STATS_COHORT_WEEKS:]:
+            earlier = weeks.setdefault("earlier", _empty())
+            for field, value in weeks.pop(week).items():
+                earlier[field] += value
+
+    def breakdowns(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        self._fold_old_weeks()
+        ordered = {}
+        for dimension, cohorts in self.cohorts.items():
+            if dimension == "signupWeek":
+                # Newest week first, then "unknown"/"earlier"
+                items = sorted(cohorts.items(), key=lambda item: (item[0][:1].isdigit(), item[0]), reverse=True)
+            else:
+                items = sorted(cohorts.items(), key=lambda item: -item[1]["affiliates"])
+            ordered[dimension] = {key: {**bucket, **rates(bucket)} for key, bucket in items}
+        return ordered
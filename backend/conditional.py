@@ -0,0 +1,114 @@
+"""
+Conditional GET for polled resources
+Each resource has a version record in the shared cache: a counter that API
+writes bump, and that reloads bump when they observe a new high-water mark
+(row count + latest updatedAt, or a digest for computed payloads), plus when
+it last changed. ETags derive from the version and the request's query, so a
+matching If-None-Match is answered with 304 before any scan or upstream call.
+"""
+
+import hashlib
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional
+
+from starlette.responses import Response
+
+from responses import dumps
+from shared_cache import cache
+
+# Version records outlive every data cache; the epoch guards against a wiped store reusing old numbers
+VERSION_TTL = 30 * 24 * 3600
+
+
+def _key(resource: str) -> str:
+    return f"version:{resource}"
+
+
+def _new_record() -> Dict[str, Any]:
+    now = time.time()
+    return {"epoch": int(now), "version": 0, "modified": now, "mark": None, "observed": 0}
+
+
+def current(resource: str) -> Dict[str, Any]:
+    return cache.get(_key(resource)) or _new_record()
+
+
+def bump(resource: str) -> Dict[str, Any]:
+    """A write went through the API: the resource has changed"""
+    def apply(record):
+        record = record or _new_record()
+        return {**record, "version": record["version"] + 1, "modified": time.time()}
+    return cache.update(_key(resource), apply, VERSION_TTL)
+
+
+def observe(resource: str, mark: Any) -> Dict[str, Any]:
+    """A reload saw `mark`; bumps the version if it differs from the last one seen"""
+    mark = dumps(mark).decode()
+
+    def apply(record):
+        record = record or _new_record()
+        now = time.time()
+        if record["mark"] != mark:
+            record = {**record, "version": record["version"] + 1, "modified": now, "mark": mark}
+        return {**record, "observed": now}
+    return cache.update(_key(resource), apply, VERSION_TTL)
+
+
+def is_fresh(record: Dict[str, Any], max_age: float) -> bool:
+    """The record was checked against the source within `max_age` seconds"""
+    return time.time() - record["observed"] < max_age
+
+
+def high_water_mark(items: Iterable[dict], *fields: str) -> Dict[str, Any]:
+    """Row count plus the latest value of the timestamp fields (ISO strings compare in order)"""
+    count = 0
+    latest = ""
+    for item in items:
+        count += 1
+        for field in fields:
+            value = item.get(field)
+            if value and str(value) > latest:
+                latest = str(value)
+    return {"count": count, "latest": latest}
+
+
+def digest(content: Any) -> str:
+    return hashlib.sha1(dumps(content)).hexdigest()
+
+
+def etag(resource: str, record: Dict[str, Any], **query: Optional[str]) -> str:
+    variant = hashlib.sha1(repr(sorted(query.items())).encode()).hexdigest()[:8]
+    return f'W/"{resource}-{record["epoch"]:x}.{record["version"]}-{variant}"'
+
+
+def validators(tag: str, record: Dict[str, Any]) -> Dict[str, str]:
+    # no-cache: clients keep the body but revalidate on every poll
+    return {
+        "ETag": tag,
+        "Last-Modified": formatdate(record["modified"], usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def _strip_weak(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request, tag: str, record: Dict[str, Any]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        candidates = {_strip_weak(t.strip()) for t in if_none_match.split(",")}
+        return "*" in candidates or _strip_weak(tag) in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(record["modified"]) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified(tag: str, record: Dict[str, Any]) -> Response:
+    return Response(status_code=304, headers=validators(tag, record))
@@ -0,0 +1,85 @@
+"""
+Lazy DynamoDB tables
+boto3 and the DynamoDB resource are only imported and built on the first
+table call, so pods that never touch DynamoDB (or haven't yet) don't pay
+for them at startup.
+"""
+
+import functools
+import threading
+import time
+from typing import List, Optional
+
+from dynamo_accounting import accounted, record_operation
+from observability import track_upstream
+from startup import timed_init
+
+_resource = None
+_lock = threading.Lock()
+
+
+def get_resource(region_name: str, aws_access_key_id: str, aws_secret_access_key: str, endpoint_url: Optional[str] = None):
+    global _resource
+    if _resource is None:
+        with _lock:
+            if _resource is None:
+                with timed_init("dynamodb"):
+                    import boto3
+                    _resource = boto3.resource(
+                        'dynamodb',
+                        region_name=region_name,
+                        aws_access_key_id=aws_access_key_id,
+                        aws_secret_access_key=aws_secret_access_key,
+                        endpoint_url=endpoint_url
+                    )
+    return _resource
+
+
+def scan_all(table) -> List[dict]:
+    """
+    Every item in `table`. A single scan stops at 1 MB; this follows
+    LastEvaluatedKey until the table is exhausted, and raises rather than
+    returning a partial list.
+    """
+    page = table.scan()
+    items = page.get('Items', [])
+    while page.get('LastEvaluatedKey'):
+        page = table.scan(ExclusiveStartKey=page['LastEvaluatedKey'])
+        items.extend(page.get('Items', []))
+    return items
+
+
+class LazyTable:
+    """
+    Stands in for a boto3 Table; builds the real one on first attribute
+    access. Table operations are timed per operation name, and item and
+    scan/query calls report their consumed capacity (see dynamo_accounting).
+    """
+
+    def __init__(self, table_name: str, **credentials):
+        self.table_name = table_name
+        self._credentials = credentials
+        self._table = None
+
+    def load(self):
+        if self._table is None:
+            self._table = get_resource(**self._credentials).Table(self.table_name)
+        return self._table
+
+    def __getattr__(self, name):
+        attr = getattr(self.load(), name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        @functools.wraps(attr)
+        def timed(*args, **kwargs):
+            if not accounted(name):
+                with track_upstream("dynamodb", name):
+                    return attr(*args, **kwargs)
+            kwargs.setdefault("ReturnConsumedCapacity", "TOTAL")
+            started = time.perf_counter()
+            with track_upstream("dynamodb", name):
+                response = attr(*args, **kwargs)
+            record_operation(self.table_name, name, response, time.perf_counter() - started)
+            return response
+        return timed
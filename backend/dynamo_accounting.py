@@ -0,0 +1,143 @@
+"""
+DynamoDB capacity accounting
+Every item and scan/query call on the tables asks DynamoDB for its consumed
+capacity, and the read/write units, items returned and items scanned are
+counted per route, table and operation. A scan that reads 10,000 items to
+return 12 shows up as a poor returned/scanned ratio against the endpoint
+that issued it, which is the signal that it wants an index. Operations
+slower than DYNAMO_SLOW_OPERATION_MS also go to a bounded slow-operation
+log in the shared cache, so every worker's entries land in one place.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from metrics import Counter
+from observability import current_route, merged_snapshot
+from shared_cache import cache
+
+DYNAMO_ACCOUNTING_ENABLED = os.getenv("DYNAMO_ACCOUNTING_ENABLED", "true").lower() == "true"
+DYNAMO_SLOW_OPERATION_MS = float(os.getenv("DYNAMO_SLOW_OPERATION_MS", "500"))
+DYNAMO_SLOW_LOG_SIZE = int(os.getenv("DYNAMO_SLOW_LOG_SIZE", "200"))
+DYNAMO_SLOW_LOG_TTL = 7 * 24 * 3600
+SLOW_LOG_KEY = "dynamo:slow"
+
+READ_OPERATIONS = {"get_item", "scan", "query"}
+WRITE_OPERATIONS = {"put_item", "update_item", "delete_item"}
+
+_labels = ["table", "operation", "route"]
+operations_total = Counter("dynamodb_operations_total", "DynamoDB table calls", _labels)
+operation_seconds = Counter("dynamodb_operation_seconds_total", "Time spent in DynamoDB table calls", _labels)
+read_units = Counter("dynamodb_consumed_read_units_total", "Read capacity units consumed", _labels)
+write_units = Counter("dynamodb_consumed_write_units_total", "Write capacity units consumed", _labels)
+items_returned = Counter("dynamodb_items_returned_total", "Items returned (or written) by DynamoDB calls", _labels)
+items_scanned = Counter("dynamodb_items_scanned_total", "Items DynamoDB read to answer scans and queries", _labels)
+slow_operations = Counter("dynamodb_slow_operations_total", "DynamoDB calls over the slow threshold", _labels)
+
+_COUNTERS = {
+    "calls": operations_total,
+    "seconds": operation_seconds,
+    "readUnits": read_units,
+    "writeUnits": write_units,
+    "returned": items_returned,
+    "scanned": items_scanned,
+    "slow": slow_operations,
+}
+
+
+def accounted(operation: str) -> bool:
+    return DYNAMO_ACCOUNTING_ENABLED and operation in READ_OPERATIONS | WRITE_OPERATIONS
+
+
+def _capacity(response: Dict[str, Any]) -> float:
+    consumed = response.get("ConsumedCapacity") or {}
+    return float(consumed.get("CapacityUnits") or 0)
+
+
+def _item_counts(operation: str, response: Dict[str, Any]):
+    """(returned, scanned) for one call"""
+    if operation in ("scan", "query"):
+        return int(response.get("Count", 0)), int(response.get("ScannedCount", 0))
+    if operation == "get_item":
+        return int("Item" in response), 1
+    return 1, 0
+
+
+def record_operation(table: str, operation: str, response: Dict[str, Any], seconds: float):
+    """Called by LazyTable after each accounted call"""
+    labels = {"table": table, "operation": operation, "route": current_route()}
+    units = _capacity(response)
+    returned, scanned = _item_counts(operation, response)
+
+    operations_total.inc(**labels)
+    operation_seconds.inc(seconds, **labels)
+    (read_units if operation in READ_OPERATIONS else write_units).inc(units, **labels)
+    items_returned.inc(returned, **labels)
+    items_scanned.inc(scanned, **labels)
+
+    ms = seconds * 1000
+    if ms >= DYNAMO_SLOW_OPERATION_MS:
+        slow_operations.inc(**labels)
+        entry = {**labels, "at": time.time(), "ms": round(ms, 1), "capacityUnits": units,
+                 "returned": returned, "scanned": scanned, "pid": os.getpid()}
+        print(f"🐢 Slow DynamoDB {operation} on {table} from {labels['route']}: "
+              f"{ms:.0f}ms, {units:g} units, {returned}/{scanned} items")
+        log_slow_operation(entry)
+
+
+def log_slow_operation(entry: Dict[str, Any]):
+    try:
+        cache.update(SLOW_LOG_KEY, lambda log: ((log or []) + [entry])[-DYNAMO_SLOW_LOG_SIZE:],
+                     ttl=DYNAMO_SLOW_LOG_TTL)
+    except Exception as e:
+        print(f"⚠️ Could not record slow DynamoDB operation: {e}")
+
+
+def slow_log(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    entries = list(reversed(cache.get(SLOW_LOG_KEY) or []))
+    return entries[:limit] if limit else entries
+
+
+def report(slow_limit: int = 50) -> Dict[str, Any]:
+    """
+    Per route/table/operation totals across all workers, heaviest readers
+    first, plus the most recent slow operations.
+    """
+    snap = merged_snapshot(cache)
+    rows: Dict[tuple, Dict[str, Any]] = {}
+    for field, counter in _COUNTERS.items():
+        for labels, value in snap.get(counter.name, {}).get("series", []):
+            row = rows.setdefault(tuple(labels), dict(zip(_labels, labels)))
+            row[field] = row.get(field, 0) + value
+
+    result = []
+    for row in rows.values():
+        calls = row.get("calls", 0)
+        scanned = row.get("scanned", 0)
+        result.append({
+            **{k: row[k] for k in _labels},
+            "calls": int(calls),
+            "readUnits": round(row.get("readUnits", 0), 2),
+            "writeUnits": round(row.get("writeUnits", 0), 2),
+            "returned": int(row.get("returned", 0)),
+            "scanned": int(scanned),
+            # Share of read items actually returned; low values on scans point at missing indexes
+            "returnedRatio": round(row.get("returned", 0) / scanned, 4) if scanned else None,
+            "avgMs": round(row.get("seconds", 0) * 1000 / calls, 1) if calls else None,
+            "slow": int(row.get("slow", 0)),
+        })
+    result.sort(key=lambda r: (r["readUnits"] + r["writeUnits"], r["scanned"]), reverse=True)
+
+    return {
+        "enabled": DYNAMO_ACCOUNTING_ENABLED,
+        "slowThresholdMs": DYNAMO_SLOW_OPERATION_MS,
+        "totals": {
+            "readUnits": round(sum(r["readUnits"] for r in result), 2),
+            "writeUnits": round(sum(r["writeUnits"] for r in result), 2),
+            "scanned": sum(r["scanned"] for r in result),
+            "returned": sum(r["returned"] for r in result),
+        },
+        "operations": result,
+        "slowOperations": slow_log(slow_limit),
+    }
@@ -0,0 +1,120 @@
+"""
+Top-affiliate leaderboards
+Bounded top-N boards per metric (clicks, installs, earnings), per period and
+per platform, kept in the shared cache so a ranking is one read.
+
+Boards are fed from data the API already has; they never trigger requests
+to Adjust:
+- "30d": Adjust's rolling 30-day stats. Rebuilt whenever the dashboard stats
+  are computed, since that pass already holds every approved affiliate's
+  (cached) stats.
+- "day", "week", "month": the current calendar period from the analytics
+  rollups. Rebuilt with the rollups, and updated one affiliate at a time as
+  rows are folded in.
+
+Each board keeps some spare entries beyond the largest page. That way a
+leader whose numbers drop doesn't leave a gap before the next rebuild.
+"""
+
+import heapq
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from cohorts import platform_key
+from rollups import period_start
+from shared_cache import cache
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "50"))
+_CAPACITY = LEADERBOARD_SIZE * 2
+LEADERBOARD_TTL = 30 * 24 * 3600
+
+METRICS = ("clicks", "installs", "earnings")
+ROLLING_PERIOD = "30d"
+CALENDAR_PERIODS = ("day", "week", "month")
+PERIODS = (ROLLING_PERIOD,) + CALENDAR_PERIODS
+ALL_PLATFORMS = "all"
+
+
+def _key(period: str, metric: str, platform: str) -> str:
+    return f"leaderboard:{period}:{metric}:{platform}"
+
+
+def entry(user: dict, values: Dict[str, float]) -> Dict[str, Any]:
+    """One affiliate's numbers, with the fields a ranking displays"""
+    return {
+        "userId": user.get("id"),
+        "name": user.get("name"),
+        "platform": platform_key(user.get("platform")),
+        **{m: values.get(m, 0) for m in METRICS},
+    }
+
+
+def _current_start(period: str) -> Optional[str]:
+    return period_start(datetime.utcnow().date(), period) if period in CALENDAR_PERIODS else None
+
+
+def _rank(entries: Iterable[dict], metric: str) -> List[dict]:
+    ranked = (e for e in entries if e[metric] > 0)
+    return heapq.nlargest(_CAPACITY, ranked, key=lambda e: (e[metric], str(e["userId"])))
+
+
+def _board(period: str, entries: List[dict], start: Optional[str]) -> Dict[str, Any]:
+    return {"period": period, "start": start, "entries": entries, "updatedAt": time.time()}
+
+
+class Leaderboard:
+    def platforms(self) -> List[str]:
+        return sorted((cache.get("leaderboard:platforms") or {}).get("platforms", []))
+
+    def replace(self, period: str, entries: List[dict]):
+        """Rebuild every board for `period` from the full set of affiliates"""
+        start = _current_start(period)
+        by_platform: Dict[str, List[dict]] = {ALL_PLATFORMS: entries}
+        for e in entries:
+            by_platform.setdefault(e["platform"], []).append(e)
+        # Platforms that dropped out get empty boards rather than stale ones
+        for platform in self.platforms():
+            by_platform.setdefault(platform, [])
+
+        for metric in METRICS:
+            for platform, group in by_platform.items():
+                cache.set(_key(period, metric, platform), _board(period, _rank(group, metric), start), LEADERBOARD_TTL)
+        cache.set("leaderboard:platforms", {"platforms": [p for p in by_platform if p != ALL_PLATFORMS]}, LEADERBOARD_TTL)
+
+    def offer(self, period: str, new: dict):
+        """One affiliate's numbers changed; insert, move or drop them on each board"""
+        start = _current_start(period)
+        for metric in METRICS:
+            for platform in (ALL_PLATFORMS, new["platform"]):
+                def apply(board):
+                    if not board or board.get("start") != start:
+                        board = _board(period, [], start)
+                    entries = [e for e in board["entries"] if e["userId"] != new["userId"]] + [new]
+                    return {**board, "entries": _rank(entries, metric), "updatedAt": time.time()}
+                cache.update(_key(period, metric, platform), apply, LEADERBOARD_TTL)
+
+    def top(self, metric: str, period: str = ROLLING_PERIOD, platform: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+        board = cache.get(_key(period, metric, platform_key(platform) if platform else ALL_PLATFORMS))
+        if board and board.get("start") != _current_start(period):
+            # The calendar period rolled over since the board was built
+            board = None
+        entries = (board or {}).get("entries", [])[:max(1, min(limit, LEADERBOARD_SIZE))]
+        return {
+            "metric": metric,
+            "period": period,
+            "start": _current_start(period),
+            "platform": platform or ALL_PLATFORMS,
+            "updatedAt": (board or {}).get("updatedAt"),
+            "entries": [{"rank": i + 1, **e, "value": e[metric]} for i, e in enumerate(entries)],
+        }
+
+
+def rollup_values(record: dict, period: str) -> Dict[str, float]:
+    """An affiliate's numbers for the current `period` from their rollup record"""
+    point = record.get(period, {}).get(_current_start(period)) or {}
+    return {"clicks": point.get("clicks", 0), "installs": point.get("installs", 0), "earnings": point.get("payout", 0)}
+
+
+leaderboard = Leaderboard()
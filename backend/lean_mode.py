@@ -0,0 +1,128 @@
+"""
+Lean page mode for automation contexts
+Routes every request through an allow/block filter so the dashboard loads
+without images, fonts, media and third-party trackers, and keeps a tally of
+what was skipped.
+"""
+
+import os
+from typing import Any, Dict
+from urllib.parse import urlparse
+
+AUTOMATION_LEAN_MODE = os.getenv("AUTOMATION_LEAN_MODE", "true").lower() == "true"
+AUTOMATION_VIEWPORT_WIDTH = int(os.getenv("AUTOMATION_VIEWPORT_WIDTH", "1280"))
+AUTOMATION_VIEWPORT_HEIGHT = int(os.getenv("AUTOMATION_VIEWPORT_HEIGHT", "800"))
+
+# Resource types the wizard never needs
+BLOCKED_RESOURCE_TYPES = set(
+    t.strip() for t in os.getenv("AUTOMATION_BLOCKED_RESOURCE_TYPES", "image,media,font").split(",") if t.strip()
+)
+
+# Hosts the dashboard actually needs; everything else is treated as third-party
+ALLOWED_HOST_SUFFIXES = tuple(
+    h.strip() for h in os.getenv("AUTOMATION_ALLOWED_HOSTS", "apptrove.com,127.0.0.1,localhost").split(",") if h.strip()
+)
+
+# Known analytics / tracking hosts, blocked even if they slip past the allow-list
+TRACKER_HOST_SUFFIXES = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "sentry.io",
+    "newrelic.com",
+    "nr-data.net",
+    "fullstory.com",
+    "amplitude.com",
+)
+
+
+def _host_matches(host: str, suffixes) -> bool:
+    return any(host == s or host.endswith("." + s) for s in suffixes)
+
+
+def should_block(url: str, resource_type: str) -> bool:
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(url).hostname or ""
+    if not host:
+        return False
+    if _host_matches(host, TRACKER_HOST_SUFFIXES):
+        return True
+    return not _host_matches(host, ALLOWED_HOST_SUFFIXES)
+
+
+class LeanModeStats:
+    """Requests and (declared) bytes skipped vs. allowed, across all contexts"""
+
+    def __init__(self):
+        self.blocked_requests = 0
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+        self.blocked_by_type: Dict[str, int] = {}
+
+    def record_blocked(self, resource_type: str):
+        self.blocked_requests += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+
+    def average_bytes(self) -> int:
+        return int(self.allowed_bytes / self.allowed_requests) if self.allowed_requests else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.blocked_requests + self.allowed_requests
+        return {
+            "enabled": AUTOMATION_LEAN_MODE,
+            "blockedRequests": self.blocked_requests,
+            "allowedRequests": self.allowed_requests,
+            "blockedShare": round(self.blocked_requests / total, 3) if total else 0,
+            "allowedBytes": self.allowed_bytes,
+            # Blocked requests never download, so their size is estimated
+            # from the average of the requests that did
+            "estimatedBytesSaved": self.blocked_requests * self.average_bytes(),
+            "blockedByType": dict(self.blocked_by_type),
+        }
+
+
+lean_stats = LeanModeStats()
+
+
+def lean_context_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """Smaller viewport and no service workers (they would bypass routing)"""
+    if not AUTOMATION_LEAN_MODE:
+        return options
+    return {
+        **options,
+        "viewport": {"width": AUTOMATION_VIEWPORT_WIDTH, "height": AUTOMATION_VIEWPORT_HEIGHT},
+        "service_workers": "block",
+    }
+
+
+async def apply_lean_mode(context):
+    """Install request routing on a browser context (no-op when lean mode is off)"""
+    if not AUTOMATION_LEAN_MODE:
+        return
+
+    async def route_request(route):
+        request = route.request
+        if should_block(request.url, request.resource_type):
+            lean_stats.record_blocked(request.resource_type)
+            await route.abort()
+        else:
+            lean_stats.allowed_requests += 1
+            await route.continue_()
+
+    def on_response(response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            lean_stats.allowed_bytes += int(length)
+
+    await context.route("**/*", route_request)
+    context.on("response", on_response)
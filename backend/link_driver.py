@@ -0,0 +1,267 @@
+"""
+Page-level driver for the AppTrove "Add Link" wizard
+Shared by the backend and the automation service. Takes an already
+authenticated page; knows nothing about browsers, pools or login.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from automation_timing import step
+
+# Overridable so the flow can be pointed at benchmarks/apptrove_stub.py
+DASHBOARD_URL = os.getenv("APPTROVE_DASHBOARD_URL", "https://dashboard.apptrove.com").rstrip("/")
+
+# "fast" waits on selectors and the create-link response; "legacy" keeps the
+# original fixed sleeps plus reload-and-scan, for when the dashboard changes
+AUTOMATION_MODE = os.getenv("AUTOMATION_MODE", "fast").lower()
+AUTOMATION_STEP_TIMEOUT_MS = int(os.getenv("AUTOMATION_STEP_TIMEOUT_MS", "15000"))
+# Substring of the dashboard API call that creates the link
+APPTROVE_CREATE_LINK_URL_PATTERN = os.getenv("APPTROVE_CREATE_LINK_URL_PATTERN", "link")
+
+ADD_LINK_BUTTON = 'button:has-text("Add Link"), a:has-text("Add Link")'
+NEXT_BUTTON = 'button:has-text("Next")'
+SUBMIT_BUTTON = 'button:has-text("Create"), button:has-text("Submit")'
+TEXT_INPUTS = 'input[type="text"]'
+
+# Keys that usually hold the short link in the create-link response
+UNILINK_KEYS = ("unilink", "shortUrl", "short_url", "shortLink", "link", "url")
+
+
+class SessionExpired(Exception):
+    """The page was bounced to /login mid-job"""
+
+
+def template_url(template_id: str) -> str:
+    return f'{DASHBOARD_URL}/v2/app/{template_id}'
+
+
+def link_id_from_unilink(link_url: str) -> Optional[str]:
+    return link_url.split('/d/')[1].split('?')[0] if '/d/' in link_url else None
+
+
+def _looks_like_unilink(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith('http') and ('/d/' in value or 'applink' in value)
+
+
+def find_unilink(payload: Any, link_name: Optional[str] = None) -> Optional[str]:
+    """
+    Pull the created link out of a create-link API response.
+    Prefers well-known keys, then any URL that looks like a Unilink.
+    """
+    if isinstance(payload, dict):
+        if link_name and payload.get('name') not in (None, link_name):
+            nested = [v for v in payload.values() if isinstance(v, (dict, list))]
+            return next((u for u in (find_unilink(v, link_name) for v in nested) if u), None)
+        for key in UNILINK_KEYS:
+            if _looks_like_unilink(payload.get(key)):
+                return payload[key]
+        for value in payload.values():
+            found = find_unilink(value, link_name)
+            if found:
+                return found
+    elif isinstance(payload, list):
+        for value in payload:
+            found = find_unilink(value, link_name)
+            if found:
+                return found
+    elif _looks_like_unilink(payload):
+        return payload
+    return None
+
+
+def is_create_link_response(response) -> bool:
+    request = response.request
+    return (
+        request.method in ("POST", "PUT")
+        and request.resource_type in ("xhr", "fetch")
+        and APPTROVE_CREATE_LINK_URL_PATTERN in response.url
+    )
+
+
+async def open_template(page, template_id: str, wait_until: str = 'domcontentloaded'):
+    with step("navigate"):
+        await page.goto(template_url(template_id), wait_until=wait_until)
+    if '/login' in page.url:
+        raise SessionExpired("Dashboard session expired")
+
+
+async def fill_wizard(page, link_name: str, campaign: str):
+    """Open the Add Link wizard and get it to the submit step, waiting on the DOM instead of the clock"""
+    timeout = AUTOMATION_STEP_TIMEOUT_MS
+    with step("open_form"):
+        await page.locator(ADD_LINK_BUTTON).first.click(timeout=timeout)
+        inputs = page.locator(TEXT_INPUTS)
+        await inputs.nth(2).wait_for(state='visible', timeout=timeout)
+
+    with step("fill_form"):
+        await inputs.nth(0).fill(link_name)
+        await inputs.nth(1).fill(campaign)
+        await inputs.nth(2).fill(campaign)
+
+        # Step 1 -> 2: the basic-details inputs unmount (or hide) once the step changes
+        await page.locator(NEXT_BUTTON).first.click(timeout=timeout)
+        try:
+            await page.wait_for_function(
+                '''(name) => !Array.from(document.querySelectorAll('input[type="text"]'))
+                    .some(i => i.value === name && i.offsetParent !== null)''',
+                arg=link_name,
+                timeout=timeout
+            )
+        except Exception:
+            pass
+
+        # Step 2 -> 3: advanced settings are left as-is
+        await page.locator(NEXT_BUTTON).first.click(timeout=timeout)
+        await page.locator(SUBMIT_BUTTON).first.wait_for(state='visible', timeout=timeout)
+
+
+async def read_link_from_table(page, link_name: str, timeout: Optional[int] = None) -> Optional[str]:
+    """Wait for the link's row in the template table and return its Unilink"""
+    row_link = page.locator('tr', has_text=link_name).locator('a[href*="applink"]').first
+    with step("extract"):
+        try:
+            await row_link.wait_for(state='attached', timeout=timeout or AUTOMATION_STEP_TIMEOUT_MS)
+        except Exception:
+            return None
+        return await row_link.evaluate('a => a.href')
+
+
+async def read_links_from_table(page, link_names: List[str]) -> Dict[str, str]:
+    """One pass over the template table: link name -> Unilink for every name found"""
+    with step("extract"):
+        try:
+            await page.locator('tr a[href*="applink"]').first.wait_for(state='attached', timeout=AUTOMATION_STEP_TIMEOUT_MS)
+        except Exception:
+            return {}
+        return await page.evaluate('''(names) => {
+            const found = {};
+            for (const row of document.querySelectorAll('tr')) {
+                const link = row.querySelector('a[href*="applink"]');
+                if (!link) continue;
+                for (const name of names) {
+                    if (!(name in found) && row.textContent.includes(name)) found[name] = link.href;
+                }
+            }
+            return found;
+        }''', link_names)
+
+
+async def submit_and_capture(page, link_name: str) -> Optional[str]:
+    """Click Create and read the Unilink from the create-link response (None if not captured)"""
+    with step("submit"):
+        try:
+            async with page.expect_response(is_create_link_response, timeout=AUTOMATION_STEP_TIMEOUT_MS) as response_info:
+                await page.locator(SUBMIT_BUTTON).first.click()
+            response = await response_info.value
+            if response.ok:
+                return find_unilink(await response.json(), link_name)
+        except Exception as e:
+            print(f"   ⚠️ Create-link response not captured for {link_name} ({e})")
+        return None
+
+
+async def create_links_batch(page, template_id: str, items: List[Tuple[str, str]]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Create many (link_name, campaign) pairs on one template page.
+    The page is opened once; links not captured from their create responses
+    are resolved together by a single final table read.
+    Returns (unilink, error) per item, in order.
+    """
+    await open_template(page, template_id)
+    links: List[Optional[str]] = [None] * len(items)
+    errors: List[Optional[str]] = [None] * len(items)
+
+    for i, (link_name, campaign) in enumerate(items):
+        try:
+            await fill_wizard(page, link_name, campaign)
+            links[i] = await submit_and_capture(page, link_name)
+            # The wizard closes once the link exists; the next Add Link click needs the table view
+            await page.locator(SUBMIT_BUTTON).first.wait_for(state='hidden', timeout=AUTOMATION_STEP_TIMEOUT_MS)
+        except SessionExpired:
+            raise
+        except Exception as e:
+            print(f"   ⚠️ Batch item {link_name} failed: {e}")
+            errors[i] = str(e)
+            await open_template(page, template_id)
+
+    missing = [link_name for i, (link_name, _) in enumerate(items) if not links[i]]
+    if missing:
+        await open_template(page, template_id)
+        found = await read_links_from_table(page, missing)
+        for i, (link_name, _) in enumerate(items):
+            if not links[i] and link_name in found:
+                links[i] = found[link_name]
+                errors[i] = None
+
+    return [(links[i], None if links[i] else (errors[i] or "Link created but URL not found")) for i in range(len(items))]
+
+
+async def create_link_fast(page, template_id: str, link_name: str, campaign: str) -> Optional[str]:
+    """
+    Event-driven flow: no fixed sleeps. The Unilink is read straight from
+    the create-link response; the reload-and-read-table path only runs if
+    that response can't be matched or parsed.
+    """
+    await open_template(page, template_id)
+    await fill_wizard(page, link_name, campaign)
+
+    link_url = await submit_and_capture(page, link_name)
+    if not link_url:
+        await open_template(page, template_id)
+        link_url = await read_link_from_table(page, link_name)
+    return link_url
+
+
+async def create_link_legacy(page, template_id: str, link_name: str, campaign: str) -> Optional[str]:
+    """Original fixed-sleep flow with reload-and-scan extraction"""
+    print(f"→ Opening template {template_id}...")
+    await open_template(page, template_id, wait_until='load')
+    with step("navigate"):
+        await page.wait_for_load_state('networkidle', timeout=30000)
+
+    print("→ Opening form...")
+    with step("open_form"):
+        await page.click(ADD_LINK_BUTTON)
+        await page.wait_for_timeout(2000)
+
+    print("→ Filling form...")
+    with step("fill_form"):
+        inputs = await page.locator(TEXT_INPUTS).all()
+        if len(inputs) >= 3:
+            await inputs[0].fill(link_name)
+            await inputs[1].fill(campaign)
+            await inputs[2].fill(campaign)
+
+        await page.click(NEXT_BUTTON)
+        await page.wait_for_timeout(2000)
+        await page.click(NEXT_BUTTON)
+        await page.wait_for_timeout(2000)
+
+    with step("submit"):
+        await page.click(SUBMIT_BUTTON)
+        await page.wait_for_timeout(5000)
+
+    print("→ Extracting link...")
+    await open_template(page, template_id, wait_until='load')
+    with step("extract"):
+        await page.wait_for_load_state('networkidle', timeout=30000)
+        await page.wait_for_timeout(3000)
+
+        return await page.evaluate('''(linkName) => {
+            const rows = document.querySelectorAll('tr');
+            for (const row of rows) {
+                if (row.textContent.includes(linkName)) {
+                    const links = row.querySelectorAll('a[href*="applink"]');
+                    if (links.length > 0) return links[0].href;
+                }
+            }
+            return null;
+        }''', link_name)
+
+
+async def create_link(page, template_id: str, link_name: str, campaign: str) -> Optional[str]:
+    """Run the configured driver; returns the Unilink or None"""
+    if AUTOMATION_MODE == "legacy":
+        return await create_link_legacy(page, template_id, link_name, campaign)
+    return await create_link_fast(page, template_id, link_name, campaign)
@@ -0,0 +1,263 @@
+"""
+Link-creation job queue
+Approvals enqueue a job and return immediately; a fixed number of workers
+run the browser automation and write the Unilink back to the user record.
+With a shared store, job state is mirrored there so any API worker process
+can answer status polls and dedupe submissions. The owning process keeps
+its unfinished jobs' mirrors fresh, so a job orphaned by a dead worker is
+reported as failed and can be resubmitted.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+LINK_JOB_CONCURRENCY = int(os.getenv("LINK_JOB_CONCURRENCY", "2"))
+# Queued jobs for the same template are run together in one dashboard session
+LINK_JOB_BATCH_SIZE = int(os.getenv("LINK_JOB_BATCH_SIZE", "25"))
+# Finished jobs are kept this long for status polling
+LINK_JOB_RETENTION_SECONDS = int(os.getenv("LINK_JOB_RETENTION_SECONDS", "86400"))
+# Owners refresh their unfinished jobs in the shared store; a queued/running job
+# not refreshed for this long belonged to a process that died and counts as failed
+LINK_JOB_LEASE_SECONDS = int(os.getenv("LINK_JOB_LEASE_SECONDS", "60"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def idempotency_key(user_id: str, template_id: str) -> str:
+    """One live (or successful) link job per affiliate and template"""
+    return f"{user_id}:{template_id}"
+
+
+class LinkJobQueue:
+    """
+    In-process job store plus worker scheduler.
+
+    `runner(template_id, link_name, campaign)` performs the automation and
+    returns the usual {"success": ..., "unilink": ..., "linkId": ...} dict.
+    `on_success(job, result)` persists a successful result.
+    `batch_runner(template_id, [(link_name, campaign), ...])`, if given, lets
+    a worker drain every queued job for the same template in one session.
+    `store`, if given, is a shared_cache-style store that job state is
+    mirrored to; jobs still run in the process that accepted them.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str, str, str], Awaitable[Dict[str, Any]]],
+        on_success: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]] = None,
+        batch_runner: Optional[Callable[[str, List[Tuple[str, str]]], Awaitable[List[Dict[str, Any]]]]] = None,
+        concurrency: int = LINK_JOB_CONCURRENCY,
+        batch_size: int = LINK_JOB_BATCH_SIZE,
+        retention_seconds: int = LINK_JOB_RETENTION_SECONDS,
+        store=None,
+    ):
+        self.runner = runner
+        self.on_success = on_success
+        self.batch_runner = batch_runner
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.retention_seconds = retention_seconds
+        self.store = store
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._by_key: Dict[str, str] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    # ---------- submission ----------
+
+    def submit(self, user_id: str, template_id: str, link_name: str, campaign: str):
+        """
+        Enqueue a job, or return the existing one for the same affiliate/template.
+        Returns (job, created).
+        """
+        self._prune()
+        key = idempotency_key(user_id, template_id)
+        holder = self._by_key.get(key, "")
+        existing = self.jobs.get(holder)
+        if not existing and self.store:
+            holder = self.store.get(f"link-job-key:{key}", "")
+            existing = self.get(holder)
+        if existing and existing["status"] != FAILED:
+            return existing, False
+
+        now = datetime.utcnow().isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "idempotencyKey": key,
+            "userId": user_id,
+            "templateId": template_id,
+            "linkName": link_name,
+            "campaign": campaign,
+            "status": QUEUED,
+            "result": None,
+            "error": None,
+            "createdAt": now,
+            "startedAt": None,
+            "finishedAt": None,
+            "_finished": None,
+        }
+        if self.store:
+            # Mirror first, then claim the key: whoever loses the claim can read the winner's job
+            self._publish(job)
+            winner = self.store.update(
+                f"link-job-key:{key}",
+                lambda current: current if current and current != holder else job["id"],
+                self.retention_seconds
+            )
+            if winner != job["id"]:
+                # Another worker submitted the same job since we looked
+                self.store.delete(f"link-job:{job['id']}")
+                return self.get(winner) or job, False
+        self.jobs[job["id"]] = job
+        self._by_key[key] = job["id"]
+        self._ensure_workers()
+        self._queue.put_nowait(job["id"])
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        if job is None and job_id and self.store:
+            job = self._check_lease(self.store.get(f"link-job:{job_id}"))
+        return job
+
+    def list(self, status: Optional[str] = None, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        everywhere = self.store.items("link-job:") if self.store else {}
+        # Local copies are never staler than the mirror
+        candidates = {**{j["id"]: self._check_lease(j) for j in everywhere.values()}, **self.jobs}
+        jobs = [
+            j for j in candidates.values()
+            if (not status or j["status"] == status) and (not user_id or j["userId"] == user_id)
+        ]
+        jobs.sort(key=lambda j: j["createdAt"], reverse=True)
+        return jobs
+
+    def status(self) -> Dict[str, Any]:
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in self.jobs.values():
+            counts[job["status"]] += 1
+        return {"concurrency": self.concurrency, "workers": len(self._workers), **counts}
+
+    @staticmethod
+    def public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in job.items() if not k.startswith("_")}
+
+    @staticmethod
+    def _check_lease(job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """A mirrored job whose owner stopped refreshing it is reported as failed"""
+        if job and job["status"] in (QUEUED, RUNNING) and time.time() - job.get("heartbeatAt", 0) > LINK_JOB_LEASE_SECONDS:
+            return {**job, "status": FAILED, "error": "The worker running this job stopped"}
+        return job
+
+    def _publish(self, job: Dict[str, Any]):
+        if not self.store:
+            return
+        try:
+            self.store.set(f"link-job:{job['id']}", {**self.public(job), "heartbeatAt": time.time()}, self.retention_seconds)
+        except Exception as e:
+            print(f"⚠️ Could not mirror link job {job['id']}: {e}")
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [jid for jid, j in self.jobs.items() if j["_finished"] and j["_finished"] < cutoff]
+        for jid in expired:
+            job = self.jobs.pop(jid)
+            if self._by_key.get(job["idempotencyKey"]) == jid:
+                del self._by_key[job["idempotencyKey"]]
+
+    # ---------- workers ----------
+
+    def _ensure_workers(self):
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._worker()))
+        if self.store and (self._heartbeat_task is None or self._heartbeat_task.done()):
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(LINK_JOB_LEASE_SECONDS / 4)
+            for job in list(self.jobs.values()):
+                if job["status"] in (QUEUED, RUNNING):
+                    self._publish(job)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if not job or job["status"] != QUEUED:
+                # Already claimed by another worker's batch
+                continue
+            batch = self._claim_batch(job)
+            if len(batch) == 1:
+                await self._run(job)
+            else:
+                await self._run_batch(batch)
+
+    def _claim_batch(self, job: Dict[str, Any]) -> List[Dict[str, Any]]:
+        batch = [job]
+        if self.batch_runner:
+            for other in self.jobs.values():
+                if len(batch) >= self.batch_size:
+                    break
+                if other is not job and other["status"] == QUEUED and other["templateId"] == job["templateId"]:
+                    batch.append(other)
+        now = datetime.utcnow().isoformat()
+        for claimed in batch:
+            claimed["status"] = RUNNING
+            claimed["startedAt"] = now
+            self._publish(claimed)
+        return batch
+
+    async def _run(self, job: Dict[str, Any]):
+        try:
+            result = await self.runner(job["templateId"], job["linkName"], job["campaign"])
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        await self._finish(job, result)
+
+    async def _run_batch(self, batch: List[Dict[str, Any]]):
+        print(f"→ Running {len(batch)} link jobs as one batch on template {batch[0]['templateId']}")
+        try:
+            results = await self.batch_runner(batch[0]["templateId"], [(j["linkName"], j["campaign"]) for j in batch])
+        except Exception as e:
+            results = [{"success": False, "error": str(e)}] * len(batch)
+        results = list(results or [])
+        for i, job in enumerate(batch):
+            # A short result list must not leave the remaining jobs running forever
+            result = results[i] if i < len(results) else {"success": False, "error": "Batch returned no result for this job"}
+            await self._finish(job, result)
+
+    async def _finish(self, job: Dict[str, Any], result: Dict[str, Any]):
+        try:
+            if result.get("success"):
+                if self.on_success:
+                    await self.on_success(job, result)
+                job["status"] = SUCCEEDED
+            else:
+                job["status"] = FAILED
+                job["error"] = result.get("error")
+            job["result"] = result
+        except Exception as e:
+            print(f"❌ Link job {job['id']} failed: {e}")
+            job["status"] = FAILED
+            job["error"] = str(e)
+        finally:
+            job["finishedAt"] = datetime.utcnow().isoformat()
+            job["_finished"] = time.time()
+            self._publish(job)
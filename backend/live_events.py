@@ -0,0 +1,200 @@
+"""
+Live dashboard updates over Server-Sent Events
+Writes and background refreshes publish small change events (the new
+affiliate counts, the dashboard stats fields that changed, an analytics
+version) to one bounded log in the shared cache. Each update is computed
+once, by whichever worker made the change.
+
+Every worker runs a single poller that reads new log entries and fans
+them out to its own SSE subscribers. The cost is one cache read per
+worker per tick, however many dashboards are open, instead of each tab
+re-running the stats on its own polling interval.
+
+Event ids are "{epoch}-{seq}". A reconnecting browser sends Last-Event-ID
+and gets the events it missed replayed. When those events have aged out of
+the log, or the log was reset, it gets a fresh snapshot instead.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from metrics import Counter, Gauge
+from responses import dumps
+from shared_cache import cache
+
+EVENTS_LOG_SIZE = int(os.getenv("EVENTS_LOG_SIZE", "500"))
+EVENTS_RETENTION_SECONDS = float(os.getenv("EVENTS_RETENTION_SECONDS", "3600"))
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "0.5"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "200"))
+# Browser reconnect delay after a dropped stream
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
+# A subscriber this far behind is disconnected; it resumes from its Last-Event-ID
+_QUEUE_SIZE = 100
+LOG_KEY = "events:log"
+
+events_published = Counter("live_events_published_total", "Events written to the live event log", ["type"])
+
+
+def diff(old: Any, new: Any) -> Any:
+    """Nested dict of the leaves in `new` that differ from `old`; None if nothing changed"""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return None if old == new else new
+    changes = {}
+    for key, value in new.items():
+        changed = diff(old.get(key), value) if key in old else value
+        if changed is not None:
+            changes[key] = changed
+    return changes or None
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {dumps(event['data']).decode()}\n\n"
+
+
+class EventHub:
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.last_seq = 0
+        self.epoch: Optional[int] = None
+        self._poller: Optional[asyncio.Task] = None
+        Gauge("live_event_subscribers", "Open SSE streams on this worker", function=lambda: len(self.subscribers))
+
+    # -- publishing (any thread, any worker) --
+
+    def publish(self, type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        def append(log):
+            if log is None:
+                log = {"epoch": int(time.time() * 1000), "seq": 0, "events": []}
+            seq = log["seq"] + 1
+            event = {"id": f"{log['epoch']}-{seq}", "seq": seq, "type": type, "data": data, "at": time.time()}
+            return {**log, "seq": seq, "events": (log["events"] + [event])[-EVENTS_LOG_SIZE:]}
+        try:
+            log = cache.update(LOG_KEY, append, EVENTS_RETENTION_SECONDS)
+            events_published.inc(type=type)
+            return log["events"][-1]
+        except Exception as e:
+            print(f"⚠️ Could not publish {type} event: {e}")
+            return {}
+
+    def publish_changes(self, type: str, current: Dict[str, Any]):
+        """Publish only what changed in `current` since the last `type` event built this way"""
+        key = f"events:last:{type}"
+        previous = cache.get(key)
+        cache.set(key, current, EVENTS_RETENTION_SECONDS)
+        changes = diff(previous, current) if previous is not None else current
+        if changes:
+            self.publish(type, {"changed": changes})
+
+    # -- fan-out (per worker) --
+
+    def start(self):
+        if self._poller is None:
+            self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        for queue in list(self.subscribers):
+            self._close(queue)
+
+    def _close(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def _read_log(self) -> Optional[Dict[str, Any]]:
+        return cache.get(LOG_KEY)
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(EVENTS_POLL_SECONDS)
+            if not self.subscribers:
+                continue
+            try:
+                log = await asyncio.to_thread(self._read_log)
+            except Exception as e:
+                print(f"⚠️ Could not read live event log: {e}")
+                continue
+            self.deliver(log)
+
+    def deliver(self, log: Optional[Dict[str, Any]]):
+        """Push log entries this worker hasn't seen yet to its subscribers"""
+        if log is None:
+            return
+        if log["epoch"] != self.epoch:
+            # First sight of the log, or it was lost and restarted: everything in it is new
+            self.epoch, self.last_seq = log["epoch"], 0
+        fresh = [e for e in log["events"] if e["seq"] > self.last_seq]
+        self.last_seq = log["seq"]
+        if not fresh:
+            return
+        for queue in list(self.subscribers):
+            if queue.qsize() + len(fresh) > _QUEUE_SIZE - 1:
+                self._close(queue)
+                continue
+            for event in fresh:
+                queue.put_nowait(event)
+
+    def _replay(self, log: Optional[Dict[str, Any]], last_event_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Events after `last_event_id`, or None if they are no longer all in the log"""
+        if log is None or not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != str(log["epoch"]) or not seq.isdigit() or int(seq) > log["seq"]:
+            return None
+        oldest = log["events"][0]["seq"] if log["events"] else log["seq"] + 1
+        if int(seq) < oldest - 1:
+            return None
+        return [e for e in log["events"] if e["seq"] > int(seq)]
+
+    def subscribe(self, last_event_id: Optional[str], snapshot: Dict[str, Any]):
+        """
+        Register a subscriber; returns (queue, events to send first), or
+        (None, []) when this worker is full. `snapshot` maps event type to
+        data for a client that can't resume.
+        """
+        if len(self.subscribers) >= EVENTS_MAX_SUBSCRIBERS:
+            return None, []
+        log = self._read_log()
+        # Catch everyone else up to the same log first; with no await until the
+        # queue is added, the poller can't deliver anything twice or skip it
+        self.deliver(log)
+        initial = self._replay(log, last_event_id)
+        if initial is None:
+            position = f"{log['epoch']}-{log['seq']}" if log else "0-0"
+            reason = "resume" if last_event_id else "connect"
+            initial = [{"id": position, "type": type, "data": data}
+                       for type, data in {"reset": {"reason": reason}, **snapshot}.items()]
+        queue: asyncio.Queue = asyncio.Queue(_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue, initial
+
+    def last(self, type: str) -> Optional[Dict[str, Any]]:
+        """The full value behind the most recent publish_changes(type, ...)"""
+        return cache.get(f"events:last:{type}")
+
+    async def stream(self, queue: asyncio.Queue, initial: List[Dict[str, Any]]):
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            for event in initial:
+                yield format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from timing out an idle stream
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    return
+                yield format_event(event)
+        finally:
+            self.subscribers.discard(queue)
+
+
+event_hub = EventHub()
@@ -3,27 +3,60 @@ Complete Backend for AWS Deployment
 Includes: FastAPI, DynamoDB, AppTrove API, Playwright Automation
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+# First, so the startup report covers every import below
+from startup import startup_report
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-import boto3
-from boto3.dynamodb.conditions import Key, Attr
-import requests
+import json
 import os
 from datetime import datetime
+from decimal import Decimal
 import uuid
-from playwright.async_api import async_playwright
+import asyncio
 import time
 from dotenv import load_dotenv
 
+startup_report.mark("framework imports")
+
 # Load environment variables from .env file
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 
+# Local modules read their settings from the environment, so import after .env is loaded
+# boto3, requests and Playwright are imported on first use (see dynamo.py, upstream.py)
+from automation_workers import AUTOMATION_WORKERS, AutomationWorkerPool
+from link_jobs import LinkJobQueue
+from shared_cache import cache, cache_status, cached
+from dynamo import LazyTable, scan_all
+from metrics import Gauge
+from observability import metrics_middleware, publish_loop, render_all, track_upstream
+from responses import CompressionMiddleware, FastJSONResponse, json_response
+import conditional
+import dynamo_accounting
+from analytics_snapshot import AnalyticsSnapshots
+from readiness import readiness
+from affiliate_counters import AffiliateCounters
+from live_events import event_hub
+from rollups import GLOBAL_SCOPE, MARK_FIELDS as ROLLUP_MARK_FIELDS, Rollups, parse_range
+from cohorts import CohortStats, rates
+from leaderboard import (
+    CALENDAR_PERIODS, METRICS as LEADERBOARD_METRICS, PERIODS as LEADERBOARD_PERIODS, ROLLING_PERIOD,
+    entry as leaderboard_entry, leaderboard, rollup_values
+)
+from rate_limit import admission_status, concurrency_limit, concurrency_slot, rate_limit
+from admin_auth import require_admin
+from profiling import get_report, list_reports, profiling_middleware, profiling_status
+import upstream
+
+startup_report.mark("dotenv + local modules")
+
 # Track startup time for health checks
 STARTUP_TIME = time.time()
 
-app = FastAPI(title="Millionaires Adda API")
+app = FastAPI(title="Millionaires Adda API", default_response_class=FastJSONResponse)
 
 # CORS Configuration
 app.add_middleware(
@@ -40,11 +73,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+app.middleware("http")(metrics_middleware)
+app.middleware("http")(profiling_middleware)
 
 # Environment Variables
 AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+# Points boto3 at DynamoDB Local or the benchmark stand-in instead of AWS
+DYNAMODB_ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL")
 
 APPTROVE_API_URL = os.getenv("APPTROVE_API_URL", "https://api.apptrove.com")
 APPTROVE_API_KEY = os.getenv("APPTROVE_S2S_API_KEY") or os.getenv("APPTROVE_API_KEY")
@@ -55,37 +93,45 @@ APPTROVE_REPORTING_API_KEY = os.getenv("APPTROVE_REPORTING_API_KEY")
 # Link domain (NOT API domain). Used only to construct/validate Unilinks when needed.
 APPTROVE_DOMAIN = os.getenv("APPTROVE_DOMAIN", "applink.learnr.co.in")
 
-# AppTrove Dashboard Credentials (for automation)
-APPTROVE_DASHBOARD_EMAIL = os.getenv("APPTROVE_DASHBOARD_EMAIL")
-APPTROVE_DASHBOARD_PASSWORD = os.getenv("APPTROVE_DASHBOARD_PASSWORD")
-APPTROVE_COOKIES_FILE = os.getenv("APPTROVE_COOKIES_FILE", "apptrove_cookies.json")
+# AppTrove Dashboard Credentials (for automation) are read in apptrove_automation.py
+# Template used when an automation job doesn't name one
+APPTROVE_DEFAULT_TEMPLATE_ID = os.getenv("APPTROVE_DEFAULT_TEMPLATE_ID", "wBehUW")
 
 # Adjust Configuration
 ADJUST_API_TOKEN = os.getenv("ADJUST_API_TOKEN") or "8zTxM99vLdeeZ_kPAc3b-ykVL1QMPJvhfYSyC79cMq7evzxyeA"
 ADJUST_APP_TOKEN = os.getenv("ADJUST_APP_TOKEN") or "5chd8nwq2pkw"
 ADJUST_API_URL = os.getenv("ADJUST_API_URL", "https://api.adjust.com")
+ADJUST_REPORT_URL = os.getenv("ADJUST_REPORT_URL", "https://automate.adjust.com/reports-service/report")
+
+# Shared cache TTLs (seconds); entries are shared by every worker process
+USERS_CACHE_TTL = int(os.getenv("USERS_CACHE_TTL", "30"))
+TEMPLATES_CACHE_TTL = int(os.getenv("TEMPLATES_CACHE_TTL", "300"))
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "60"))
+ADJUST_STATS_CACHE_TTL = int(os.getenv("ADJUST_STATS_CACHE_TTL", "300"))
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "60"))
 
 # DynamoDB Tables
 USERS_TABLE = os.getenv("DYNAMODB_USERS_TABLE", "edurise-users")
 LINKS_TABLE = os.getenv("DYNAMODB_LINKS_TABLE", "edurise-links")
 ANALYTICS_TABLE = os.getenv("DYNAMODB_ANALYTICS_TABLE", "edurise-analytics")
 
-# Initialize DynamoDB
-dynamodb = None
+# Initialize DynamoDB (tables connect on first use)
+DYNAMODB_CONFIGURED = bool(AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY)
 users_table = None
 links_table = None
 analytics_table = None
 
-if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY:
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-    users_table = dynamodb.Table(USERS_TABLE)
-    links_table = dynamodb.Table(LINKS_TABLE)
-    analytics_table = dynamodb.Table(ANALYTICS_TABLE)
+if DYNAMODB_CONFIGURED:
+    aws_credentials = {
+        "region_name": AWS_REGION,
+        "aws_access_key_id": AWS_ACCESS_KEY_ID,
+        "aws_secret_access_key": AWS_SECRET_ACCESS_KEY,
+        "endpoint_url": DYNAMODB_ENDPOINT_URL,
+    }
+    users_table = LazyTable(USERS_TABLE, **aws_credentials)
+    links_table = LazyTable(LINKS_TABLE, **aws_credentials)
+    analytics_table = LazyTable(ANALYTICS_TABLE, **aws_credentials)
+    startup_report.register_prewarm("dynamodb", lambda: [t.load() for t in (users_table, links_table, analytics_table)])
     print(f"✅ DynamoDB configured: {USERS_TABLE}, {LINKS_TABLE}, {ANALYTICS_TABLE}")
 else:
     print("⚠️ DynamoDB not configured - Falling back to local JSON database")
@@ -110,6 +156,9 @@ else:
     links_table = JsonTable(LINKS_TABLE, db_path)
     analytics_table = JsonTable(ANALYTICS_TABLE, db_path)
 
+startup_report.register_prewarm("upstream", upstream.session)
+startup_report.mark("config + storage")
+
 # Pydantic Models
 class UserUpdate(BaseModel):
     name: Optional[str] = None
@@ -127,6 +176,8 @@ class UserUpdate(BaseModel):
 class ApproveRequest(BaseModel):
     adminNotes: Optional[str] = None
     approvedBy: Optional[str] = "admin"
+    createLink: Optional[bool] = False
+    templateId: Optional[str] = None
 
 class RejectRequest(BaseModel):
     adminNotes: Optional[str] = None
@@ -137,9 +188,19 @@ class CreateLinkRequest(BaseModel):
     affiliateData: Dict[str, Any]
     linkData: Dict[str, Any]
 
+class LinkJobRequest(BaseModel):
+    userId: str
+    templateId: Optional[str] = None
+    linkName: Optional[str] = None
+    campaign: Optional[str] = None
+
+class LinkJobBatchRequest(BaseModel):
+    userIds: List[str]
+    templateId: Optional[str] = None
+
 # Helper Functions
 def check_dynamodb():
-    if not dynamodb or not users_table:
+    if not DYNAMODB_CONFIGURED or not users_table:
         raise HTTPException(status_code=500, detail="DynamoDB not configured")
 
 def apptrove_headers(auth_type="api-key"):
@@ -162,173 +223,161 @@ def apptrove_headers(auth_type="api-key"):
     
     return headers
 
+def load_users():
+    users = scan_all(users_table)
+    # Catches writes that bypass this API (console, scripts) once the cache expires
+    conditional.observe("users", conditional.high_water_mark(users, "updatedAt", "createdAt"))
+    return users
+
+def scan_users():
+    """Every user record, shared across workers for USERS_CACHE_TTL seconds"""
+    return cached("users:all", USERS_CACHE_TTL, load_users)
+
+def users_by_id() -> Dict[str, dict]:
+    """scan_users keyed by id, cached alongside it"""
+    return cached("users:by-id", USERS_CACHE_TTL, lambda: {u.get('id'): u for u in scan_users()})
+
+def invalidate_user_caches():
+    """Call after any write to the users table"""
+    cache.delete_prefix("users:")
+    cache.delete("stats:dashboard")
+    conditional.bump("users")
+
+def publish_counters(counts: Dict[str, int], delta: Dict[str, int]):
+    event_hub.publish("counters", {"counts": counts, "delta": delta})
+
+# Headline counts, kept up to date by the write endpoints and reconciled against a fresh scan
+affiliate_counters = AffiliateCounters(load_users, on_change=publish_counters)
+
+def record_user_change(user_id: str, before: Optional[dict], changes: dict) -> dict:
+    """Apply one user write to the affiliate counters; returns the item as written"""
+    after = {'id': user_id, **(before or {}), **changes}
+    affiliate_counters.record(before, after)
+    return after
+
+@app.on_event("startup")
+async def start_counter_reconciliation():
+    asyncio.create_task(affiliate_counters.reconcile_loop())
+
+def load_analytics():
+    items = scan_all(analytics_table)
+    mark = conditional.high_water_mark(items, *ROLLUP_MARK_FIELDS)
+    conditional.observe("analytics", mark)
+    # Rows from other writers show up here first; rebuild the rollups when the table moved
+    analytics_rollups.refresh(items, mark)
+    return items
+
+def scan_analytics():
+    """Every analytics record, shared across workers for ANALYTICS_CACHE_TTL seconds"""
+    return cached("analytics:all", ANALYTICS_CACHE_TTL, load_analytics)
+
+def rank_rollups(records: Dict[str, dict]):
+    """Rebuild the calendar-period leaderboards from freshly built rollups"""
+    users = users_by_id()
+    for period in CALENDAR_PERIODS:
+        leaderboard.replace(period, [
+            leaderboard_entry(users.get(scope, {'id': scope}), rollup_values(record, period))
+            for scope, record in records.items() if scope != GLOBAL_SCOPE
+        ])
+
+def rank_rollup_change(user_id: str, record: dict):
+    # Only reads the users cache: recording a row never scans DynamoDB, and a
+    # cold cache just ranks the bare id until the next rebuild fills in names
+    user = (cache.get("users:by-id") or {}).get(user_id) or {'id': user_id}
+    for period in CALENDAR_PERIODS:
+        leaderboard.offer(period, leaderboard_entry(user, rollup_values(record, period)))
+
+def rollups_rebuilt(records: Dict[str, dict]):
+    rank_rollups(records)
+    # Rows arrived from outside the API; open dashboards refetch their series
+    event_hub.publish("analytics", {"rebuilt": True, "version": conditional.current("analytics")["version"]})
+
+# Daily/weekly/monthly totals per affiliate and overall (see rollups.py)
+analytics_rollups = Rollups(scan_analytics, on_rebuild=rollups_rebuilt, on_record=rank_rollup_change)
+
+@app.on_event("startup")
+async def start_rollup_refresh():
+    asyncio.create_task(analytics_rollups.refresh_loop())
+
+def rollup_range(granularity: str, start: Optional[str], end: Optional[str]):
+    try:
+        return parse_range(granularity, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # ============ BROWSER AUTOMATION ============
 
-async def create_link_via_automation(template_id: str, link_name: str, campaign: str):
-    """
-    Create AppTrove link via Playwright browser automation
-    Priority: Cookie-based auth > Gmail OAuth
-    """
-    import json
-    from pathlib import Path
-    
-    async with async_playwright() as p:
-        browser = None
-        try:
-            print(f"[Automation] Creating link: {link_name}")
-            
-            # Launch browser
-            browser = await p.chromium.launch(headless=True, args=[
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-blink-features=AutomationControlled'
-            ])
-            
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            )
-            
-            # Try cookie-based authentication first
-            cookies_loaded = False
-            if Path(APPTROVE_COOKIES_FILE).exists():
-                try:
-                    with open(APPTROVE_COOKIES_FILE, 'r') as f:
-                        cookies = json.load(f)
-                    await context.add_cookies(cookies)
-                    cookies_loaded = True
-                    print("→ Using saved session cookies")
-                except Exception as e:
-                    print(f"   ⚠️ Cookie load failed: {e}")
-            
-            page = await context.new_page()
-            
-            # If using cookies, skip login
-            if cookies_loaded:
-                print("→ Skipping login (using cookies)")
-                # Go directly to template to verify cookies work
-                await page.goto(f'https://dashboard.apptrove.com/v2/app/{template_id}', timeout=30000)
-                
-                # Check if we're redirected to login (cookies expired)
-                if '/login' in page.url:
-                    print("   ⚠️ Cookies expired, falling back to login")
-                    cookies_loaded = False
-            
-            # Fallback to login if no cookies or cookies expired
-            if not cookies_loaded:
-                if not APPTROVE_DASHBOARD_EMAIL:
-                    await browser.close()
-                    return {
-                        "success": False,
-                        "error": "No cookies found and no login credentials configured. Run generate-cookies.py"
-                    }
-                
-                print("→ Logging in with credentials...")
-                await page.goto('https://dashboard.apptrove.com/login', timeout=30000)
-                
-                # Try Gmail OAuth
-                try:
-                    await page.click('button:has-text("Google"), button:has-text("Continue with Google"), a:has-text("Sign in with Google")', timeout=5000)
-                    await page.wait_for_timeout(2000)
-                    
-                    await page.wait_for_url('**/accounts.google.com/**', timeout=10000)
-                    await page.fill('input[type="email"]', APPTROVE_DASHBOARD_EMAIL)
-                    await page.click('button:has-text("Next"), #identifierNext')
-                    await page.wait_for_timeout(2000)
-                    
-                    if APPTROVE_DASHBOARD_PASSWORD:
-                        await page.fill('input[type="password"]', APPTROVE_DASHBOARD_PASSWORD)
-                        await page.click('button:has-text("Next"), #passwordNext')
-                        await page.wait_for_timeout(3000)
-                except:
-                    # Fallback to direct login
-                    print("   → Gmail OAuth failed, trying direct login")
-                    await page.goto('https://dashboard.apptrove.com/login')
-                    await page.fill('input[type="email"]', APPTROVE_DASHBOARD_EMAIL)
-                    if APPTROVE_DASHBOARD_PASSWORD:
-                        await page.fill('input[type="password"]', APPTROVE_DASHBOARD_PASSWORD)
-                        await page.click('button[type="submit"]')
-                
-                # Wait for successful login
-                try:
-                    await page.wait_for_url('**/dashboard', timeout=30000)
-                    print("   ✅ Login successful")
-                except:
-                    await browser.close()
-                    return {
-                        "success": False,
-                        "error": "Login failed. Use generate-cookies.py for reliable auth"
-                    }
-            
-            # Navigate to template
-            print(f"→ Opening template {template_id}...")
-            await page.goto(f'https://dashboard.apptrove.com/v2/app/{template_id}')
-            await page.wait_for_load_state('networkidle', timeout=30000)
-            
-            # Click Add Link
-            print("→ Opening form...")
-            await page.click('button:has-text("Add Link"), a:has-text("Add Link")')
-            await page.wait_for_timeout(2000)
-            
-            # Fill form
-            print("→ Filling form...")
-            inputs = await page.locator('input[type="text"]').all()
-            if len(inputs) >= 3:
-                await inputs[0].fill(link_name)
-                await inputs[1].fill(campaign)
-                await inputs[2].fill(campaign)
-            
-            # Submit through steps
-            await page.click('button:has-text("Next")')
-            await page.wait_for_timeout(2000)
-            await page.click('button:has-text("Next")')
-            await page.wait_for_timeout(2000)
-            await page.click('button:has-text("Create"), button:has-text("Submit")')
-            await page.wait_for_timeout(5000)
-            
-            # Extract created link
-            print("→ Extracting link...")
-            await page.goto(f'https://dashboard.apptrove.com/v2/app/{template_id}')
-            await page.wait_for_load_state('networkidle', timeout=30000)
-            await page.wait_for_timeout(3000)
-            
-            link_url = await page.evaluate(f'''() => {{
-                const rows = document.querySelectorAll('tr');
-                for (const row of rows) {{
-                    if (row.textContent.includes('{link_name}')) {{
-                        const links = row.querySelectorAll('a[href*="applink"]');
-                        if (links.length > 0) return links[0].href;
-                    }}
-                }}
-                return null;
-            }}''')
-            
-            await browser.close()
-            
-            if link_url:
-                link_id = link_url.split('/d/')[1].split('?')[0] if '/d/' in link_url else None
-                print(f"✅ Link created: {link_url}")
-                return {
-                    "success": True,
-                    "unilink": link_url,
-                    "linkId": link_id,
-                    "createdVia": "automation"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "Link created but URL not found"
-                }
-                
-        except Exception as e:
-            print(f"❌ Automation error: {e}")
-            if browser:
-                await browser.close()
-            return {
-                "success": False,
-                "error": f"Automation failed: {str(e)}"
+# Link creation runs on a warm pool of pre-authenticated Chromium contexts
+# (see apptrove_automation.py), by default inside dedicated worker processes
+# so browsers never share this event loop. AUTOMATION_WORKERS=0 runs the
+# engine in-process instead. Warming on startup is opt-in because not
+# every image ships a browser.
+AUTOMATION_POOL_WARM_ON_STARTUP = os.getenv("AUTOMATION_POOL_WARM_ON_STARTUP", "false").lower() == "true"
+
+if AUTOMATION_WORKERS > 0:
+    automation = AutomationWorkerPool(AUTOMATION_WORKERS)
+else:
+    import apptrove_automation as automation
+
+@app.on_event("startup")
+async def warm_automation_pool():
+    if AUTOMATION_POOL_WARM_ON_STARTUP:
+        asyncio.create_task(automation.start())
+
+@app.on_event("shutdown")
+async def stop_automation_pool():
+    await link_jobs.stop()
+    await automation.stop()
+
+@app.get("/api/automation/pool")
+async def get_automation_pool_status():
+    return {"success": True, **(await automation.status()), "jobs": link_jobs.status()}
+
+async def save_job_link(job: dict, result: dict):
+    """Write a finished automation job's Unilink back to the affiliate's record"""
+    def update():
+        users_table.update_item(
+            Key={'id': job['userId']},
+            UpdateExpression='SET unilink = :unilink, linkId = :linkId, templateId = :templateId, updatedAt = :updatedAt',
+            ExpressionAttributeValues={
+                ':unilink': result.get('unilink'),
+                ':linkId': result.get('linkId'),
+                ':templateId': job['templateId'],
+                ':updatedAt': datetime.utcnow().isoformat()
             }
+        )
+    await asyncio.to_thread(update)
+    invalidate_user_caches()
+    print(f"✅ Link saved for user {job['userId']}: {result.get('unilink')}")
+
+async def run_link_automation(template_id: str, link_name: str, campaign: str):
+    with track_upstream("automation", "create_link") as call:
+        result = await automation.create_link_via_automation(template_id, link_name, campaign)
+        if not result.get("success"):
+            call["outcome"] = "error"
+    return result
+
+async def run_link_automation_batch(template_id: str, items):
+    with track_upstream("automation", "create_links_batch") as call:
+        results = await automation.create_links_batch_via_automation(template_id, items)
+        if not all(r.get("success") for r in results):
+            call["outcome"] = "error"
+    return results
+
+link_jobs = LinkJobQueue(
+    run_link_automation,
+    on_success=save_job_link,
+    batch_runner=run_link_automation_batch,
+    store=cache
+)
+Gauge("link_jobs_queued", "Link jobs waiting in this process", function=lambda: link_jobs.status()["queued"])
+Gauge("link_jobs_running", "Link jobs running in this process", function=lambda: link_jobs.status()["running"])
+
+def enqueue_link_job(user: dict, template_id: Optional[str] = None, link_name: Optional[str] = None, campaign: Optional[str] = None):
+    """Queue link creation for an affiliate; returns (job, created)"""
+    link_name = link_name or user.get('name') or f"User {user['id'][:8]}"
+    campaign = campaign or link_name.replace(" ", "-").lower()
+    return link_jobs.submit(user['id'], template_id or APPTROVE_DEFAULT_TEMPLATE_ID, link_name, campaign)
 
 # ============ API ENDPOINTS ============
 
@@ -352,9 +401,120 @@ async def health():
         "service": "Partners Portal Backend",
         "timestamp": datetime.utcnow().isoformat(),
         "uptime": uptime,
-        "ready": uptime > 5  # Ready after 5 seconds
+        "ready": readiness.ready,  # Warm-state details at /ready
+        "pid": os.getpid()
     }
 
+@app.on_event("startup")
+async def report_startup():
+    startup_report.ready()
+    asyncio.create_task(asyncio.to_thread(startup_report.prewarm))
+
+@app.get("/api/startup")
+async def get_startup_report():
+    """Cold-start breakdown: import phases, time to ready and lazy init costs"""
+    return {"success": True, "startup": startup_report.to_dict()}
+
+@app.on_event("startup")
+async def start_readiness_checks():
+    readiness.start()
+
+@app.on_event("shutdown")
+async def stop_readiness_checks():
+    readiness.stop()
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 200 once every required warm-up check has passed, else 503.
+    Serves the background checks' last results, so probing costs nothing.
+    """
+    state = readiness.to_dict()
+    return json_response(state, status_code=200 if state["ready"] else 503)
+
+@app.on_event("startup")
+async def start_metrics_publisher():
+    asyncio.create_task(publish_loop(cache))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint; merges the latest snapshot of every worker"""
+    body = await asyncio.to_thread(render_all, cache)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache/status")
+async def get_cache_status():
+    return {"success": True, "cache": cache_status()}
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def get_profiles():
+    """Stored request profiles, newest first (profile a request with X-Profile: 1)"""
+    return {"success": True, "profiling": profiling_status(), "profiles": list_reports()}
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str, format: str = "json"):
+    """format: json (everything), text (call tree), collapsed (flame graph input) or html (pyinstrument only)"""
+    report = get_report(profile_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(report["callTree"])
+    if format == "collapsed" and "collapsed" in report:
+        return PlainTextResponse(report["collapsed"])
+    if format == "html" and "html" in report:
+        return HTMLResponse(report["html"])
+    if format != "json":
+        raise HTTPException(status_code=400, detail=f"Format {format!r} not available for this profile")
+    return json_response({"success": True, "profile": report})
+
+@app.get("/api/admission/status")
+async def get_admission_status():
+    """Rate limits and how many upstream slots are in use host-wide"""
+    return {"success": True, "admission": admission_status()}
+
+# ============ READINESS CHECKS ============
+
+def warm_dynamodb():
+    # A real round trip, so a connection is open in the pool before traffic arrives
+    users_table.get_item(Key={'id': '__readiness__'})
+    return {"table": USERS_TABLE}
+
+def warm_upstream_pool():
+    # Any response means the keep-alive connection is up; bypasses upstream.request so probes aren't counted as errors
+    hosts = {}
+    for url in (ADJUST_API_URL, APPTROVE_API_URL):
+        hosts[url] = upstream.session().head(url, timeout=5).status_code
+    return hosts
+
+def prime_users():
+    return {"users": len(scan_users())}
+
+def prime_stats():
+    # Fans out to Adjust per affiliate, so it runs once at startup and never gates readiness
+    stats = cached("stats:dashboard", STATS_CACHE_TTL, load_dashboard_stats)
+    return {"affiliates": stats["totalAffiliates"]}
+
+def prime_templates():
+    templates = cached("templates:active", TEMPLATES_CACHE_TTL, fetch_templates)
+    return False if templates is None else {"templates": len(templates)}
+
+async def automation_pool_ready():
+    status = await automation.status()
+    pools = [e.get("pool", {}) for e in status["engines"]] if "engines" in status else [status["pool"]]
+    if not pools or not all(p.get("started") and p.get("browserConnected") for p in pools):
+        return False
+    return {"pools": len(pools), "live": sum(p.get("live", 0) for p in pools)}
+
+if DYNAMODB_CONFIGURED:
+    readiness.register("dynamodb", warm_dynamodb)
+readiness.register("caches", prime_users)
+# Upstream outages shouldn't take every pod out of rotation; these only report
+readiness.register("upstream", warm_upstream_pool, required=False)
+readiness.register("templates", prime_templates, required=False)
+readiness.register("stats", prime_stats, required=False, once=True)
+# The browser pool only gates readiness when it is meant to be warm at startup
+readiness.register("automation", automation_pool_ready, required=AUTOMATION_POOL_WARM_ON_STARTUP)
+
 # ============ ADJUST HELPERS ============
 
 def create_adjust_tracker(name: str, label: str) -> Optional[str]:
@@ -374,7 +534,7 @@ def create_adjust_tracker(name: str, label: str) -> Optional[str]:
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=15)
+        response = upstream.post(url, json=payload, headers=headers, timeout=15)
         if response.ok:
             data = response.json()
             items = data.get('data', {}).get('items', [])
@@ -390,6 +550,57 @@ def create_adjust_tracker(name: str, label: str) -> Optional[str]:
 
 # ============ USER ENDPOINTS ============
 
+@app.get("/api/admin/dynamodb", dependencies=[Depends(require_admin)])
+async def get_dynamodb_report(slow: int = 50):
+    """Consumed capacity and scanned/returned items per route, table and operation, plus slow operations"""
+    report = await asyncio.to_thread(dynamo_accounting.report, slow)
+    return json_response({"success": True, "dynamodb": report})
+
+# Parquet copies of the users and analytics tables for ad-hoc reports (see analytics_snapshot.py)
+analytics_snapshots = AnalyticsSnapshots(users_table, analytics_table)
+
+@app.on_event("startup")
+async def start_analytics_snapshots():
+    if DYNAMODB_CONFIGURED:
+        asyncio.create_task(analytics_snapshots.snapshot_loop())
+
+@app.get("/api/admin/analytics/snapshot", dependencies=[Depends(require_admin)])
+async def get_analytics_snapshot():
+    """Current snapshot, build state and the columns each query dataset offers"""
+    return json_response({"success": True, "snapshot": analytics_snapshots.status()})
+
+@app.post("/api/admin/analytics/snapshot", dependencies=[Depends(require_admin)])
+async def build_analytics_snapshot():
+    """Take a snapshot now instead of waiting for the next scheduled one"""
+    check_dynamodb()
+    if not analytics_snapshots.enabled:
+        raise HTTPException(status_code=503, detail="Analytics snapshots need pyarrow and duckdb installed")
+    try:
+        manifest = await asyncio.to_thread(analytics_snapshots.build)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if manifest is None:
+        raise HTTPException(status_code=409, detail="A snapshot is already being built")
+    return {"success": True, "snapshot": manifest}
+
+@app.post("/api/admin/analytics/query", dependencies=[Depends(require_admin)])
+async def query_analytics_snapshot(spec: dict):
+    """
+    Grouped aggregation over the latest snapshot, e.g.
+    {"dataset": "joined", "groupBy": ["platform"], "metrics": [{"fn": "sum", "column": "payout"}]}
+    """
+    if not analytics_snapshots.enabled:
+        raise HTTPException(status_code=503, detail="Analytics snapshots need pyarrow and duckdb installed")
+    try:
+        result = await asyncio.to_thread(analytics_snapshots.query, spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return json_response({"success": True, "result": result})
+
 @app.post("/api/users/register")
 @app.post("/api/users")
 async def create_user(user_data: dict):
@@ -399,6 +610,8 @@ async def create_user(user_data: dict):
         # Check if user already exists
         email = user_data.get("email", "").strip().lower()
         if email:
+            from boto3.dynamodb.conditions import Attr
+            # Uncached: a stale list could let a duplicate through
             response = users_table.scan(
                 FilterExpression=Attr('email').eq(email)
             )
@@ -430,6 +643,8 @@ async def create_user(user_data: dict):
         }
         
         users_table.put_item(Item=user)
+        affiliate_counters.record(None, user)
+        invalidate_user_caches()
         return {
             "success": True, 
             "user": user, 
@@ -442,6 +657,7 @@ async def create_user(user_data: dict):
 
 @app.get("/api/users")
 async def get_users(
+    request: Request,
     search: Optional[str] = None,
     platform: Optional[str] = None,
     status: Optional[str] = None,
@@ -450,22 +666,30 @@ async def get_users(
     try:
         check_dynamodb()
         
-        scan_kwargs = {}
-        filter_expressions = []
+        query = {"search": search, "platform": platform, "status": status, "approvalStatus": approvalStatus}
+        version = conditional.current("users")
+        # Polls answer 304 from the version record alone until it's due for a re-check against the table
+        if conditional.is_fresh(version, USERS_CACHE_TTL):
+            tag = conditional.etag("users", version, **query)
+            if conditional.is_not_modified(request, tag, version):
+                return conditional.not_modified(tag, version)
         
-        if approvalStatus and approvalStatus != "all":
-            filter_expressions.append(Attr('approvalStatus').eq(approvalStatus))
-        if status and status != "all":
-            filter_expressions.append(Attr('status').eq(status))
-        if platform and platform != "all":
-            filter_expressions.append(Attr('platform').eq(platform))
+        all_users = scan_users()
+        version = conditional.current("users")
+        tag = conditional.etag("users", version, **query)
+        if conditional.is_not_modified(request, tag, version):
+            return conditional.not_modified(tag, version)
         
-        if filter_expressions:
-            from functools import reduce
-            scan_kwargs['FilterExpression'] = reduce(lambda a, b: a & b, filter_expressions)
-        
-        response = users_table.scan(**scan_kwargs)
-        users = response.get('Items', [])
+        # Filter the shared cached scan instead of issuing a filtered scan per request
+        filters = {
+            'approvalStatus': approvalStatus,
+            'status': status,
+            'platform': platform,
+        }
+        users = [
+            u for u in all_users
+            if all(u.get(field) == value for field, value in filters.items() if value and value != "all")
+        ]
         
         if search:
             search_lower = search.lower()
@@ -477,7 +701,10 @@ async def get_users(
                 search_lower in u.get('phone', '').lower()
             ]
         
-        return {"success": True, "users": users, "count": len(users)}
+        return json_response(
+            {"success": True, "users": users, "count": len(users)},
+            headers=conditional.validators(tag, version)
+        )
     except HTTPException:
         return {"success": True, "users": [], "count": 0}
     except Exception as e:
@@ -505,7 +732,7 @@ async def get_user_links(user_id: str):
         response = links_table.scan(
             FilterExpression=Attr('userId').eq(user_id)
         )
-        return {"success": True, "links": response.get('Items', [])}
+        return json_response({"success": True, "links": response.get('Items', [])})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -518,7 +745,8 @@ async def update_user(user_id: str, user_data: UserUpdate):
         expr_attr_names = {}
         updates = []
         
-        for field, value in user_data.dict(exclude_none=True).items():
+        fields = user_data.dict(exclude_none=True)
+        for field, value in fields.items():
             if field == "status":
                 expr_attr_names["#status"] = "status"
                 updates.append("#status = :status")
@@ -532,18 +760,21 @@ async def update_user(user_id: str, user_data: UserUpdate):
             update_expr += ", updatedAt = :updatedAt"
             expr_attr_values[":updatedAt"] = datetime.utcnow().isoformat()
             
+            # The old item feeds the counters; the new one is the old plus these fields
             kwargs = {
                 'Key': {'id': user_id},
                 'UpdateExpression': update_expr,
                 'ExpressionAttributeValues': expr_attr_values,
-                'ReturnValues': 'ALL_NEW'
+                'ReturnValues': 'ALL_OLD'
             }
             
             if expr_attr_names:
                 kwargs['ExpressionAttributeNames'] = expr_attr_names
             
             response = users_table.update_item(**kwargs)
-            return {"success": True, "user": response['Attributes']}
+            user = record_user_change(user_id, response.get('Attributes'), {**fields, 'updatedAt': expr_attr_values[':updatedAt']})
+            invalidate_user_caches()
+            return {"success": True, "user": user}
         
         return {"success": True, "message": "No updates"}
     except Exception as e:
@@ -570,12 +801,22 @@ async def approve_user(user_id: str, request: ApproveRequest):
         if request.adminNotes:
             update_data["adminNotes"] = request.adminNotes
         
-        users_table.update_item(
+        response = users_table.update_item(
             Key={'id': user_id},
             UpdateExpression='SET ' + ', '.join([f'{k} = :{k}' for k in update_data.keys()]) + ', updatedAt = :updatedAt',
             ExpressionAttributeValues={f':{k}': v for k, v in update_data.items()} | {':updatedAt': datetime.utcnow().isoformat()},
-            ReturnValues='ALL_NEW'
+            ReturnValues='ALL_OLD'
         )
+        record_user_change(user_id, response.get('Attributes'), update_data)
+        invalidate_user_caches()
+        
+        if request.createLink:
+            job, _ = enqueue_link_job(user, request.templateId)
+            return {
+                "success": True,
+                "message": "User approved. Link creation queued.",
+                "job": LinkJobQueue.public(job)
+            }
         
         return {
             "success": True,
@@ -604,7 +845,7 @@ async def assign_link(user_id: str, link_data: dict):
             "templateId": link_data.get('templateId', 'wBehUW')
         }
         
-        users_table.update_item(
+        response = users_table.update_item(
             Key={'id': user_id},
             UpdateExpression='SET unilink = :unilink, linkId = :linkId, templateId = :templateId, approvalStatus = :approvalStatus, updatedAt = :updatedAt',
             ExpressionAttributeValues={
@@ -614,8 +855,10 @@ async def assign_link(user_id: str, link_data: dict):
                 ':approvalStatus': 'approved',  # Auto-approve when link is assigned
                 ':updatedAt': datetime.utcnow().isoformat()
             },
-            ReturnValues='ALL_NEW'
+            ReturnValues='ALL_OLD'
         )
+        record_user_change(user_id, response.get('Attributes'), {**update_data, 'approvalStatus': 'approved'})
+        invalidate_user_caches()
         
         return {"success": True, "message": "Link assigned successfully"}
     except Exception as e:
@@ -634,12 +877,14 @@ async def reject_user(user_id: str, request: RejectRequest):
         if request.adminNotes:
             update_data["adminNotes"] = request.adminNotes
         
-        users_table.update_item(
+        response = users_table.update_item(
             Key={'id': user_id},
             UpdateExpression='SET ' + ', '.join([f'{k} = :{k}' for k in update_data.keys()]) + ', updatedAt = :updatedAt',
             ExpressionAttributeValues={f':{k}': v for k, v in update_data.items()} | {':updatedAt': datetime.utcnow().isoformat()},
-            ReturnValues='ALL_NEW'
+            ReturnValues='ALL_OLD'
         )
+        record_user_change(user_id, response.get('Attributes'), update_data)
+        invalidate_user_caches()
         
         return {"success": True, "message": "User rejected"}
     except Exception as e:
@@ -649,7 +894,7 @@ async def reject_user(user_id: str, request: RejectRequest):
 async def delete_user(user_id: str):
     check_dynamodb()
     try:
-        users_table.update_item(
+        response = users_table.update_item(
             Key={'id': user_id},
             UpdateExpression='SET #status = :status, deletedAt = :deletedAt, updatedAt = :updatedAt',
             ExpressionAttributeNames={'#status': 'status'},
@@ -657,15 +902,32 @@ async def delete_user(user_id: str):
                 ':status': 'deleted',
                 ':deletedAt': datetime.utcnow().isoformat(),
                 ':updatedAt': datetime.utcnow().isoformat()
-            }
+            },
+            ReturnValues='ALL_OLD'
         )
+        record_user_change(user_id, response.get('Attributes'), {'status': 'deleted'})
+        invalidate_user_caches()
         return {"success": True, "message": "User deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/users/{user_id}/analytics")
-async def get_user_analytics(user_id: str):
+async def get_user_analytics(
+    user_id: str,
+    granularity: Optional[str] = None,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to")
+):
+    """Raw rows, or with granularity=day|week|month the affiliate's rollup series"""
     check_dynamodb()
+    if granularity:
+        first, last = rollup_range(granularity, start, end)
+        try:
+            series = analytics_rollups.series(user_id, granularity, first, last)
+            return {"success": True, "granularity": granularity, "series": series}
+        except Exception as e:
+            print(f"Error reading analytics rollups: {e}")
+            return {"success": False, "error": str(e), "series": []}
     try:
         # User ID is not partition key, so we must scan with filter
         # In production, a GSI on userId should be added
@@ -675,6 +937,10 @@ async def get_user_analytics(user_id: str):
             Limit=100
         )
         items = response.get('Items', [])
+        if start:
+            items = [i for i in items if str(i.get('date', '')) >= start]
+        if end:
+            items = [i for i in items if str(i.get('date', ''))[:len(end)] <= end]
         # Sort manually since we can't usage ScanIndexForward
         items.sort(key=lambda x: x.get('date', ''), reverse=True)
         return {"success": True, "analytics": items}
@@ -682,39 +948,92 @@ async def get_user_analytics(user_id: str):
         print(f"Error fetching analytics: {e}")
         return {"success": False, "error": str(e), "analytics": []}
 
+# ============ LINK JOB ENDPOINTS ============
+
+@app.post("/api/link-jobs", status_code=202)
+async def submit_link_job(request: LinkJobRequest):
+    """Queue AppTrove link creation; poll GET /api/link-jobs/{id} for the result"""
+    check_dynamodb()
+    try:
+        user = users_table.get_item(Key={'id': request.userId}).get('Item')
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        job, created = enqueue_link_job(user, request.templateId, request.linkName, request.campaign)
+        return {"success": True, "created": created, "job": LinkJobQueue.public(job)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/link-jobs/batch", status_code=202)
+async def submit_link_job_batch(request: LinkJobBatchRequest):
+    """
+    Queue links for many affiliates on one template. Workers pick up queued
+    jobs for the same template together and create them in a single session.
+    """
+    check_dynamodb()
+    try:
+        jobs = []
+        missing = []
+        for user_id in request.userIds:
+            user = users_table.get_item(Key={'id': user_id}).get('Item')
+            if not user:
+                missing.append(user_id)
+                continue
+            job, _ = enqueue_link_job(user, request.templateId)
+            jobs.append(LinkJobQueue.public(job))
+        return {"success": True, "jobs": jobs, "count": len(jobs), "missingUserIds": missing}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/link-jobs")
+async def get_link_jobs(status: Optional[str] = None, userId: Optional[str] = None):
+    jobs = [LinkJobQueue.public(j) for j in link_jobs.list(status, userId)]
+    return {"success": True, "jobs": jobs, "count": len(jobs)}
+
+@app.get("/api/link-jobs/{job_id}")
+async def get_link_job(job_id: str):
+    job = link_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": LinkJobQueue.public(job)}
+
 # ============ APPTROVE ENDPOINTS ============
 
+def fetch_templates():
+    """Active link templates from AppTrove, or None if every auth type failed"""
+    url = f"{APPTROVE_API_URL}/internal/link-template"
+    params = {"status": "active", "limit": 100}
+    
+    for auth_type in ["reporting", "api-key", "sdk"]:
+        try:
+            response = upstream.get(
+                url,
+                headers=apptrove_headers(auth_type),
+                params=params,
+                timeout=10
+            )
+            
+            if response.ok:
+                data = response.json()
+                return data.get('data', {}).get('linkTemplateList', []) or []
+        except:
+            continue
+    return None
+
 @app.get("/api/apptrove/templates")
 async def get_templates():
     try:
-        url = f"{APPTROVE_API_URL}/internal/link-template"
-        params = {"status": "active", "limit": 100}
-        
-        for auth_type in ["reporting", "api-key", "sdk"]:
-            try:
-                response = requests.get(
-                    url,
-                    headers=apptrove_headers(auth_type),
-                    params=params,
-                    timeout=10
-                )
-                
-                if response.ok:
-                    data = response.json()
-                    templates = data.get('data', {}).get('linkTemplateList', []) or []
-                    return {"success": True, "templates": templates}
-            except:
-                continue
-        
-        return {"success": True, "templates": []}
+        templates = cached("templates:active", TEMPLATES_CACHE_TTL, fetch_templates)
+        return {"success": True, "templates": templates or []}
     except:
         return {"success": True, "templates": []}
 
-@app.get("/api/apptrove/stats")
+@app.get("/api/apptrove/stats", dependencies=[Depends(rate_limit("stats")), Depends(concurrency_limit("upstream"))])
 async def get_link_stats(linkId: str):
     try:
         url = f"{APPTROVE_API_URL}/internal/unilink/{linkId}/stats"
-        response = requests.get(
+        response = upstream.get(
             url,
             headers=apptrove_headers("reporting"),
             timeout=10
@@ -728,6 +1047,17 @@ async def get_link_stats(linkId: str):
 
 # ============ ADJUST ENDPOINTS ============
 
+def get_adjust_stats(identifier: str):
+    """get_adjust_stats_direct, shared across workers for ADJUST_STATS_CACHE_TTL seconds"""
+    return cached(f"adjust:{identifier}", ADJUST_STATS_CACHE_TTL, lambda: get_adjust_stats_direct(identifier))
+
+def get_adjust_stats_admitted(identifier: str):
+    """get_adjust_stats for callers not holding an upstream slot: only a cache miss takes one, for the fetch"""
+    def fetch():
+        with concurrency_slot("upstream"):
+            return get_adjust_stats_direct(identifier)
+    return cached(f"adjust:{identifier}", ADJUST_STATS_CACHE_TTL, fetch)
+
 def get_adjust_stats_direct(identifier: str):
     """
     Fetch stats from Adjust Report Service API.
@@ -755,24 +1085,25 @@ def get_adjust_stats_direct(identifier: str):
         start_date = (datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d')
         
         # Adjust Report Service API endpoint
-        url = "https://automate.adjust.com/reports-service/report"
+        url = ADJUST_REPORT_URL
         
         # we filter by tracker token (network) to get stats only for this specific affiliate
         params = {
             "date_period": f"{start_date}:{end_date}",
             "dimensions": "network",
-            "metrics": "clicks,installs,revenue,network_cost", 
+            # revenue_events counts purchases; asked for in the same report, so no extra calls
+            "metrics": "clicks,installs,revenue_events,revenue,network_cost", 
             "tracker_filter": tracker_token,
             "app_token__in": ADJUST_APP_TOKEN
         }
         
-        aggregated = {"clicks": 0, "conversions": 0, "payout": 0, "revenue": 0, "installs": 0}
+        aggregated = {"clicks": 0, "conversions": 0, "payout": 0, "revenue": 0, "installs": 0, "purchases": 0}
         
         with open("adjust_debug.log", "a") as log:
             log.write(f"\n--- Requesting Adjust stats for {identifier} ---\n")
             log.write(f"Url: {url}\n")
             try:
-                response = requests.get(
+                response = upstream.get(
                     url, 
                     headers={"Authorization": f"Bearer {ADJUST_API_TOKEN}", "Accept": "application/json"},
                     params=params,
@@ -793,6 +1124,7 @@ def get_adjust_stats_direct(identifier: str):
                         # Treat installs as conversions
                         aggregated["conversions"] += int(item.get("installs", 0))
                         aggregated["installs"] += int(item.get("installs", 0))
+                        aggregated["purchases"] += int(item.get("revenue_events", 0))
                         aggregated["payout"] += float(item.get("network_cost", 0))
                         aggregated["revenue"] += float(item.get("revenue", 0))
                 else:
@@ -807,7 +1139,7 @@ def get_adjust_stats_direct(identifier: str):
         return None
 
 # Kept the same endpoint path `/api/trackier/stats` for frontend backward compatibility
-@app.get("/api/trackier/stats")
+@app.get("/api/trackier/stats", dependencies=[Depends(rate_limit("stats")), Depends(concurrency_limit("upstream"))])
 async def get_trackier_stats_api(
     affiliateId: str = None, 
     linkId: str = None, 
@@ -819,73 +1151,103 @@ async def get_trackier_stats_api(
     if not identifier:
         return {"success": False, "error": "Missing identifier (affiliateId, linkId, or unilink required)"}
         
-    stats = get_adjust_stats_direct(identifier)
+    stats = get_adjust_stats(identifier)
     if stats:
         return {"success": True, "stats": stats}
     return {"success": False, "error": "Failed to fetch Adjust stats"}
 
 # ============ DASHBOARD ENDPOINTS ============
 
-@app.get("/api/dashboard/stats")
-async def get_dashboard_stats():
-    try:
-        # No longer raising error if DynamoDB missing, we use mock
-        users_response = users_table.scan()
-        users = users_response.get('Items', [])
-        
-        total_affiliates = len(users)
-        active_affiliates = len([u for u in users if u.get('status') == 'active'])
-        pending_approval = len([u for u in users if u.get('approvalStatus') == 'pending'])
-        
-        # Aggregate stats from APIs for all approved affiliates
-        total_clicks = 0
-        total_conversions = 0
-        total_earnings = 0
-        
-        for user in users:
-            if user.get('approvalStatus') == 'approved':
-                link_id = user.get('linkId')
-                if link_id:
-                    # Skip AppTrove Stats to prevent timeouts (Mock Mode)
-                    '''
-                    try:
-                        apptrove_res = requests.get(
-                            f"{APPTROVE_API_URL}/internal/unilink/{link_id}/stats",
-                            headers=apptrove_headers("reporting"),
-                            timeout=2
-                        )
-                        if apptrove_res.ok:
-                            st = apptrove_res.json()
-                            total_clicks += st.get('clicks', 0)
-                            total_conversions += st.get('conversions', 0)
-                            total_earnings += st.get('revenue', 0)
-                    except: pass
-                    '''
-                    
-                    # Try Adjust Stats
-                    adjust_st = get_adjust_stats_direct(link_id)
-                    if adjust_st:
-                        total_clicks += adjust_st.get('clicks', 0)
-                        total_conversions += adjust_st.get('conversions', 0)
-                        total_earnings += adjust_st.get('payout', 0)
+def compute_dashboard_stats():
+    """
+    Affiliate counts plus Adjust totals across approved affiliates, broken
+    down by platform, approval status, signup week and follower band in the
+    same pass
+    """
+    # No longer raising error if DynamoDB missing, we use mock
+    users = scan_users()
+    
+    counts = affiliate_counters.snapshot()
+    total_affiliates = counts['totalAffiliates']
+    active_affiliates = counts['activeAffiliates']
+    pending_approval = counts['pendingApproval']
+    
+    # Aggregate stats from APIs for all approved affiliates
+    cohorts = CohortStats()
+    ranked = []
+    
+    for user in users:
+        adjust_st = None
+        if user.get('approvalStatus') == 'approved':
+            link_id = user.get('linkId')
+            if link_id:
+                # Skip AppTrove Stats to prevent timeouts (Mock Mode)
+                '''
+                try:
+                    apptrove_res = upstream.get(
+                        f"{APPTROVE_API_URL}/internal/unilink/{link_id}/stats",
+                        headers=apptrove_headers("reporting"),
+                        timeout=2
+                    )
+                    if apptrove_res.ok:
+                        st = apptrove_res.json()
+                        total_clicks += st.get('clicks', 0)
+                        total_conversions += st.get('conversions', 0)
+                        total_earnings += st.get('revenue', 0)
+                except: pass
+                '''
+                
+                # Try Adjust Stats
+                adjust_st = get_adjust_stats_admitted(link_id)
+                if adjust_st:
+                    ranked.append(leaderboard_entry(user, {
+                        "clicks": adjust_st.get('clicks', 0),
+                        "installs": adjust_st.get('installs', 0),
+                        "earnings": adjust_st.get('payout', 0),
+                    }))
+        cohorts.add(user, adjust_st)
 
-        return {
-            "success": True,
-            "stats": {
-                "totalAffiliates": total_affiliates,
-                "activeAffiliates": active_affiliates,
-                "pendingApproval": pending_approval,
-                "totalClicks": total_clicks,
-                "totalConversions": total_conversions,
-                "totalEarnings": total_earnings,
-                "conversionRate": (total_conversions / total_clicks * 100) if total_clicks > 0 else 0,
-                "totalInstalls": total_conversions, # Assuming conversion = install for now
-                "totalPurchases": 0,
-                "installRate": 0,
-                "purchaseRate": 0,
-                "averageEarningsPerAffiliate": (total_earnings / active_affiliates) if active_affiliates > 0 else 0
-            }
-        }
+    # Every approved affiliate's stats are in hand here, so refresh the rankings too
+    leaderboard.replace(ROLLING_PERIOD, ranked)
+
+    totals = cohorts.totals
+    total_earnings = totals['earnings']
+    return {
+        "totalAffiliates": total_affiliates,
+        "activeAffiliates": active_affiliates,
+        "pendingApproval": pending_approval,
+        "totalClicks": totals['clicks'],
+        "totalConversions": totals['installs'], # Assuming conversion = install for now
+        "totalEarnings": total_earnings,
+        "totalRevenue": totals['revenue'],
+        "totalInstalls": totals['installs'],
+        "totalPurchases": totals['purchases'],
+        **rates(totals),
+        "averageEarningsPerAffiliate": (total_earnings / active_affiliates) if active_affiliates > 0 else 0,
+        "breakdowns": cohorts.breakdowns()
+    }
+
+def load_dashboard_stats():
+    stats = compute_dashboard_stats()
+    # Adjust totals change upstream without any write here, so version on the content itself
+    conditional.observe("stats", conditional.digest(stats))
+    # Only the fields that moved go out to open dashboards
+    event_hub.publish_changes("stats", stats)
+    return stats
+
+@app.get("/api/dashboard/stats", dependencies=[Depends(rate_limit("dashboard"))])
+async def get_dashboard_stats(request: Request):
+    try:
+        # A miss recomputes, and its Adjust fetches may wait for upstream slots; keep that off the event loop
+        stats = await asyncio.to_thread(cached, "stats:dashboard", STATS_CACHE_TTL, load_dashboard_stats)
+        version = conditional.current("stats")
+        tag = conditional.etag("stats", version)
+        if conditional.is_not_modified(request, tag, version):
+            return conditional.not_modified(tag, version)
+        return json_response({"success": True, "stats": stats}, headers=conditional.validators(tag, version))
+    except HTTPException:
+        # Shed for lack of an upstream slot: a 429 the client retries, not zeroed stats
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -900,16 +1262,155 @@ async def get_dashboard_stats():
             }
         }
 
+# ============ LIVE UPDATES ============
+
+# While streams are open, stats changes are pushed as the cached stats expire or are invalidated by writes
+LIVE_STATS_REFRESH_SECONDS = float(os.getenv("LIVE_STATS_REFRESH_SECONDS", "15"))
+
+async def refresh_live_stats():
+    while True:
+        await asyncio.sleep(LIVE_STATS_REFRESH_SECONDS)
+        if not event_hub.subscribers:
+            continue
+        try:
+            # A cache hit unless the stats expired; whichever worker gets there first recomputes and publishes
+            await asyncio.to_thread(cached, "stats:dashboard", STATS_CACHE_TTL, load_dashboard_stats)
+        except Exception as e:
+            print(f"⚠️ Live stats refresh failed: {e}")
+
+@app.on_event("startup")
+async def start_live_events():
+    event_hub.start()
+    asyncio.create_task(refresh_live_stats())
+
+@app.on_event("shutdown")
+async def stop_live_events():
+    await event_hub.stop()
+
+def live_snapshot() -> Dict[str, Any]:
+    """What a new stream starts from: current counters and the last computed stats, never a fresh computation"""
+    snapshot = {"counters": {"counts": affiliate_counters.snapshot(), "delta": {}}}
+    stats = cache.get("stats:dashboard") or event_hub.last("stats")
+    if stats:
+        snapshot["stats"] = {"changed": stats}
+    return snapshot
+
+@app.get("/api/dashboard/events", dependencies=[Depends(rate_limit("dashboard"))])
+async def get_dashboard_events(request: Request, last_event_id: Optional[str] = Query(None, alias="lastEventId")):
+    """
+    Server-Sent Events: "counters" (counts and delta), "stats" (changed
+    fields) and "analytics" (new rollup points, or a rebuild). A new stream
+    starts with "reset" and a snapshot; reconnecting with Last-Event-ID
+    (header, or lastEventId) replays what was missed instead.
+    """
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    snapshot = await asyncio.to_thread(live_snapshot)
+    queue, initial = event_hub.subscribe(last_event_id, snapshot)
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Too many open event streams", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        event_hub.stream(queue, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/dashboard/counters")
+async def get_dashboard_counters():
+    """Headline affiliate counts straight from the counters: no scan, no upstream calls"""
+    try:
+        return {"success": True, "counters": affiliate_counters.snapshot()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/leaderboard")
+async def get_leaderboard(
+    metric: str = "clicks",
+    period: str = ROLLING_PERIOD,
+    platform: Optional[str] = None,
+    limit: int = 10
+):
+    """
+    Top affiliates by clicks, installs or earnings. period=30d ranks Adjust's
+    rolling 30 days; day/week/month rank the current period from analytics.
+    """
+    if metric not in LEADERBOARD_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(LEADERBOARD_METRICS)}")
+    if period not in LEADERBOARD_PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(LEADERBOARD_PERIODS)}")
+    return {
+        "success": True,
+        "leaderboard": leaderboard.top(metric, period, platform, limit),
+        "platforms": leaderboard.platforms(),
+    }
+
 @app.get("/api/dashboard/analytics")
-async def get_dashboard_analytics():
+async def get_dashboard_analytics(
+    request: Request,
+    granularity: Optional[str] = None,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to")
+):
+    """Every raw row, or with granularity=day|week|month the rollup series across all affiliates"""
+    if granularity:
+        first, last = rollup_range(granularity, start, end)
+    query = {"granularity": granularity, "from": start, "to": end}
     try:
         check_dynamodb()
-        response = analytics_table.scan()
-        return {"success": True, "analytics": response.get('Items', [])}
+        version = conditional.current("analytics")
+        if conditional.is_fresh(version, ANALYTICS_CACHE_TTL):
+            tag = conditional.etag("analytics", version, **query)
+            if conditional.is_not_modified(request, tag, version):
+                return conditional.not_modified(tag, version)
+        
+        if granularity:
+            payload = {"success": True, "granularity": granularity,
+                       "series": analytics_rollups.series(GLOBAL_SCOPE, granularity, first, last)}
+        else:
+            payload = {"success": True, "analytics": scan_analytics()}
+        version = conditional.current("analytics")
+        tag = conditional.etag("analytics", version, **query)
+        if conditional.is_not_modified(request, tag, version):
+            return conditional.not_modified(tag, version)
+        return json_response(payload, headers=conditional.validators(tag, version))
     except:
-        return {"success": True, "analytics": []}
+        return {"success": True, "analytics": [], "series": []} if granularity else {"success": True, "analytics": []}
+
+def publish_analytics_row(item: dict, version: int):
+    """Push the overall rollup points the new row landed in"""
+    points = {}
+    try:
+        for granularity in ("day", "week", "month"):
+            first, last = parse_range(granularity, item["date"], item["date"])
+            points[granularity] = (analytics_rollups.series(GLOBAL_SCOPE, granularity, first, last) or [None])[0]
+    except ValueError:
+        # Undated for the rollups; subscribers still learn the version moved
+        pass
+    event_hub.publish("analytics", {"userId": item["userId"], "date": item["date"], "points": points, "version": version})
+
+@app.post("/api/analytics", dependencies=[Depends(require_admin)])
+async def record_analytics(row: dict):
+    """Store one analytics row (same shape the Node service writes) and fold it into the rollups"""
+    check_dynamodb()
+    if not row.get("userId") or not row.get("date"):
+        raise HTTPException(status_code=400, detail="userId and date are required")
+    try:
+        now = datetime.utcnow().isoformat()
+        # boto3 only takes Decimal for numbers
+        item = json.loads(json.dumps(row), parse_float=Decimal)
+        item = {**item, "id": item.get("id") or str(uuid.uuid4()), "createdAt": item.get("createdAt") or now, "updatedAt": now}
+        response = analytics_table.put_item(Item=item, ReturnValues='ALL_OLD')
+        analytics_rollups.record(response.get('Attributes'), item)
+        cache.delete("analytics:all")
+        version = conditional.bump("analytics")
+        publish_analytics_row(item, version["version"])
+        return json_response({"success": True, "analytics": item})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+startup_report.mark("routes")
 
 if __name__ == "__main__":
+    # Single process for development; production runs serve.py
     import uvicorn
     port = int(os.getenv("PORT", "8000"))
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,248 @@
+"""
+Minimal in-process metrics
+Labelled counters, gauges and histograms with quantile estimates, plus
+snapshots that can be merged across processes and rendered in the
+Prometheus text format. Kept dependency-free so both the API process and
+the automation workers can record into it.
+"""
+
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Seconds; spans everything from a cache hit to a full browser run
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+REGISTRY: List["Metric"] = []
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(_label_key(self.labelnames, labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self.values.clear()
+
+    def collect(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self.values.items())
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down. With `function`, the value is read at
+    collection time instead (unlabelled gauges only).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames=(), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self.values[key] = value
+
+    def collect(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        if self.function is not None:
+            try:
+                return [((), float(self.function()))]
+            except Exception:
+                return []
+        return super().collect()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count], sum, count
+        self.series: Dict[Tuple[str, ...], Dict[str, object]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self.series[key] = series
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def reset(self):
+        with self._lock:
+            self.series.clear()
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by interpolating inside the bucket that holds it"""
+        series = self.series.get(_label_key(self.labelnames, labels))
+        if not series or not series["count"]:
+            return None
+        return _bucket_quantile(self.buckets, series["counts"], series["count"], q)
+
+    def collect(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return [
+                (key, {"counts": list(series["counts"]), "sum": series["sum"], "count": series["count"]})
+                for key, series in self.series.items()
+            ]
+
+    def summary(self) -> List[Dict[str, object]]:
+        """count / mean / p50 / p95 per label set"""
+        rows = []
+        for key, series in sorted(self.series.items()):
+            count = series["count"]
+            rows.append({
+                **dict(zip(self.labelnames, key)),
+                "count": count,
+                "mean": round(series["sum"] / count, 4) if count else None,
+                "p50": _round(_bucket_quantile(self.buckets, series["counts"], count, 0.5)),
+                "p95": _round(_bucket_quantile(self.buckets, series["counts"], count, 0.95)),
+            })
+        return rows
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 4) if value is not None else None
+
+
+def _bucket_quantile(buckets, counts, total, q: float) -> Optional[float]:
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for i, count in enumerate(counts):
+        upper = buckets[i] if i < len(buckets) else buckets[-1]
+        if count and cumulative + count >= rank:
+            if i >= len(buckets):
+                return buckets[-1]
+            return lower + (upper - lower) * ((rank - cumulative) / count)
+        cumulative += count
+        lower = upper
+    return buckets[-1]
+
+
+# ---------- snapshots / exposition ----------
+
+def snapshot() -> Dict[str, Any]:
+    """JSON-safe copy of every registered metric, for merging across processes"""
+    result = {}
+    for metric in REGISTRY:
+        entry = {
+            "kind": metric.kind,
+            "help": metric.help,
+            "labelnames": list(metric.labelnames),
+            "series": [[list(key), value] for key, value in metric.collect()],
+        }
+        if isinstance(metric, Histogram):
+            entry["buckets"] = list(metric.buckets)
+        result[metric.name] = entry
+    return result
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum counters, gauges and histograms series-by-series"""
+    merged: Dict[str, Any] = {}
+    for snap in snapshots:
+        for name, entry in snap.items():
+            target = merged.setdefault(name, {**entry, "series": []})
+            index = {tuple(labels): i for i, (labels, _) in enumerate(target["series"])}
+            for labels, value in entry["series"]:
+                i = index.get(tuple(labels))
+                if i is None:
+                    index[tuple(labels)] = len(target["series"])
+                    target["series"].append([labels, value if not isinstance(value, dict) else {
+                        "counts": list(value["counts"]), "sum": value["sum"], "count": value["count"]
+                    }])
+                elif isinstance(value, dict):
+                    current = target["series"][i][1]
+                    if len(current["counts"]) != len(value["counts"]):
+                        continue
+                    current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                    current["sum"] += value["sum"]
+                    current["count"] += value["count"]
+                else:
+                    target["series"][i][1] += value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus(snap: Dict[str, Any]) -> str:
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name in sorted(snap):
+        entry = snap[name]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['kind']}")
+        names = entry["labelnames"]
+        for labels, value in sorted(entry["series"], key=lambda s: s[0]):
+            if entry["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            bounds = [_number(b) for b in entry["buckets"]] + ["+Inf"]
+            for bound, count in zip(bounds, value["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, labels, ('le', bound))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels(names, labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,138 @@
+"""
+Request and upstream metrics for the API
+Per-route latency, per-upstream (DynamoDB, Adjust, AppTrove, automation)
+latency and errors, and in-flight gauges. Each worker process publishes a
+snapshot of its registry to the shared cache, so /metrics on any worker
+reports the whole host.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from metrics import Counter, Gauge, Histogram, merge_snapshots, render_prometheus, snapshot
+
+METRICS_PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "5"))
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "API request latency by route", ["method", "route", "status"]
+)
+http_in_flight = Gauge("http_requests_in_flight", "API requests being served")
+upstream_request_seconds = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to upstream services", ["upstream", "operation", "outcome"]
+)
+upstream_errors = Counter(
+    "upstream_errors_total", "Failed upstream calls (exceptions and 4xx/5xx)", ["upstream", "operation"]
+)
+upstream_in_flight = Gauge("upstream_requests_in_flight", "Upstream calls in progress", ["upstream"])
+
+# Set to a list to have this request's upstream calls appended to it (see profiling.py).
+# asyncio.to_thread copies the context, so calls made from worker threads land in it too.
+upstream_calls: ContextVar[Optional[List[dict]]] = ContextVar("upstream_calls", default=None)
+# The request being served, so code far from the endpoint can attribute work to its route
+current_request: ContextVar[Optional[object]] = ContextVar("current_request", default=None)
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Time one upstream call. The yielded dict's "outcome" may be set to
+    "error" by the caller for calls that return rather than raise on failure.
+    """
+    call = {"outcome": "ok"}
+    started = time.perf_counter()
+    upstream_in_flight.inc(upstream=upstream)
+    try:
+        yield call
+    except BaseException:
+        call["outcome"] = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        upstream_in_flight.dec(upstream=upstream)
+        upstream_request_seconds.observe(elapsed, upstream=upstream, operation=operation, outcome=call["outcome"])
+        collector = upstream_calls.get()
+        if collector is not None:
+            collector.append({
+                "upstream": upstream,
+                "operation": operation,
+                "outcome": call["outcome"],
+                "startedAt": started,
+                "ms": round(elapsed * 1000, 2),
+            })
+        if call["outcome"] != "ok":
+            upstream_errors.inc(upstream=upstream, operation=operation)
+
+
+def upstream_name(url: str) -> str:
+    host = urlparse(url).hostname or "unknown"
+    for name in ("adjust", "apptrove"):
+        if name in host:
+            return name
+    return host
+
+
+def route_label(request) -> str:
+    """The route template (e.g. /api/users/{user_id}), so IDs don't explode the label set"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def current_route() -> str:
+    """Route label of the request in progress, or "background" outside one"""
+    request = current_request.get()
+    return route_label(request) if request is not None else "background"
+
+
+async def metrics_middleware(request, call_next):
+    started = time.perf_counter()
+    http_in_flight.inc()
+    token = current_request.set(request)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        current_request.reset(token)
+        http_in_flight.dec()
+        http_request_seconds.observe(
+            time.perf_counter() - started,
+            method=request.method, route=route_label(request), status=str(status)
+        )
+
+
+# ---------- cross-process aggregation ----------
+
+def _snapshot_key() -> str:
+    return f"metrics:{os.getpid()}"
+
+
+def publish_snapshot(store):
+    store.set(_snapshot_key(), snapshot(), ttl=max(METRICS_PUBLISH_INTERVAL * 3, 15))
+
+
+async def publish_loop(store):
+    while True:
+        try:
+            await asyncio.to_thread(publish_snapshot, store)
+        except Exception as e:
+            print(f"⚠️ Could not publish metrics snapshot: {e}")
+        await asyncio.sleep(METRICS_PUBLISH_INTERVAL)
+
+
+def merged_snapshot(store: Optional[object] = None) -> Dict[str, Any]:
+    """This process's live registry merged with every other worker's latest snapshot"""
+    snapshots = [snapshot()]
+    if store is not None:
+        own = _snapshot_key()
+        snapshots += [snap for key, snap in store.items("metrics:").items() if key != own]
+    return merge_snapshots(snapshots)
+
+
+def render_all(store: Optional[object] = None) -> str:
+    return render_prometheus(merged_snapshot(store))
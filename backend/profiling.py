@@ -0,0 +1,285 @@
+"""
+On-demand request profiling
+An admin adds `X-Profile: 1` (or `?__profile=1`) plus the X-Admin-Key
+header to any request. That one request runs under a sampling profiler and
+its DynamoDB/upstream calls are recorded. The response comes back as usual
+with an X-Profile-Id header and a Server-Timing breakdown. The report (call
+tree, collapsed stacks for flame graphs, upstream timings) is kept in the
+shared cache for GET /api/admin/profiles/{id}.
+
+Uses pyinstrument when installed (async-aware, HTML flame view). Otherwise
+a built-in sampler walks the event-loop thread's stack, which can also
+catch other requests running on the same worker at the time.
+
+Safety limits: one profile at a time per worker, a floor on the sampling
+interval, a maximum profiled duration, and a bounded number and size of
+stored reports.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as Tally
+from typing import Any, Dict, List, Optional
+
+from admin_auth import ADMIN_API_KEY, is_admin
+from observability import upstream_calls
+from responses import dumps
+from shared_cache import cache
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - optional, the built-in sampler is used instead
+    pyinstrument = None
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+# Never sample more often than every 1 ms; 5 ms keeps the overhead low
+PROFILING_INTERVAL_MS = max(1.0, float(os.getenv("PROFILING_INTERVAL_MS", "5")))
+# Profiling stops after this long even if the request hasn't finished
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", "30"))
+PROFILING_MAX_REPORTS = int(os.getenv("PROFILING_MAX_REPORTS", "20"))
+PROFILING_MAX_REPORT_BYTES = int(os.getenv("PROFILING_MAX_REPORT_BYTES", str(2 * 1024 * 1024)))
+PROFILING_REPORT_TTL = int(os.getenv("PROFILING_REPORT_TTL", "86400"))
+# Stacks kept in the collapsed (flame graph) output, heaviest first
+PROFILING_MAX_STACKS = int(os.getenv("PROFILING_MAX_STACKS", "500"))
+
+PROFILE_QUERY_PARAM = "__profile"
+PROFILE_HEADER = "x-profile"
+# Metadata of every stored report, so listing and eviction never load the reports
+INDEX_KEY = "profiles:index"
+SUMMARY_FIELDS = ("id", "method", "path", "query", "status", "startedAt", "durationMs", "pid", "profiler", "upstream")
+
+_busy = threading.Lock()
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _short_path(path: str) -> str:
+    if path.startswith(_BACKEND_DIR):
+        return os.path.relpath(path, _BACKEND_DIR)
+    marker = "site-packages" + os.sep
+    return path.split(marker, 1)[1] if marker in path else os.path.basename(path)
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread"""
+
+    def __init__(self, thread_id: int, interval: float, max_seconds: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Tally = Tally()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def _run(self):
+        deadline = time.perf_counter() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format: `root;child;leaf count`, one stack per line"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common(PROFILING_MAX_STACKS))
+
+    def call_tree(self, min_percent: float = 1.0) -> str:
+        tree: Dict[str, Any] = {}
+        for stack, count in self.stacks.items():
+            node = tree
+            for frame in stack:
+                entry = node.setdefault(frame, {"count": 0, "children": {}})
+                entry["count"] += count
+                node = entry["children"]
+
+        total = max(self.samples, 1)
+        lines: List[str] = []
+
+        def walk(children, depth):
+            for frame, entry in sorted(children.items(), key=lambda item: -item[1]["count"]):
+                percent = entry["count"] * 100 / total
+                if percent < min_percent:
+                    continue
+                ms = entry["count"] * self.interval * 1000
+                lines.append(f"{'  ' * depth}{percent:5.1f}% {ms:8.1f}ms  {frame}")
+                walk(entry["children"], depth + 1)
+
+        walk(tree, 0)
+        return "\n".join(lines)
+
+
+class RequestProfile:
+    """One profiled request: the sampler plus the upstream calls it made"""
+
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex[:12]
+        self.request = request
+        self.calls: List[dict] = []
+        self.interval = PROFILING_INTERVAL_MS / 1000
+        self.profiler = None
+        self.sampler = None
+        self._guard = None
+
+    def __enter__(self):
+        self._token = upstream_calls.set(self.calls)
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        if pyinstrument is not None:
+            self.profiler = pyinstrument.Profiler(interval=self.interval, async_mode="enabled")
+            self.profiler.start()
+            # pyinstrument has no time limit of its own; stop it from the loop it profiles
+            self._guard = asyncio.get_running_loop().call_later(PROFILING_MAX_SECONDS, self._stop_profiler)
+        else:
+            self.sampler = StackSampler(threading.get_ident(), self.interval, PROFILING_MAX_SECONDS)
+            self.sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.duration = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self._guard.cancel()
+            self._stop_profiler()
+        else:
+            self.sampler.stop()
+        upstream_calls.reset(self._token)
+        return False
+
+    def _stop_profiler(self):
+        if self.profiler.is_running:
+            self.profiler.stop()
+
+    def upstream_summary(self) -> Dict[str, Dict[str, float]]:
+        summary: Dict[str, Dict[str, float]] = {}
+        for call in self.calls:
+            entry = summary.setdefault(call["upstream"], {"calls": 0, "ms": 0.0, "errors": 0})
+            entry["calls"] += 1
+            entry["ms"] = round(entry["ms"] + call["ms"], 2)
+            entry["errors"] += call["outcome"] != "ok"
+        return summary
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, so browser devtools show the breakdown"""
+        parts = [f'app;dur={self.duration * 1000:.1f};desc="total"']
+        for upstream, entry in self.upstream_summary().items():
+            name = "".join(c if c.isalnum() else "-" for c in upstream)
+            parts.append(f'{name};dur={entry["ms"]:.1f};desc="{entry["calls"]} calls"')
+        return ", ".join(parts)
+
+    def report(self, status_code: int) -> Dict[str, Any]:
+        calls = [
+            {**{k: v for k, v in call.items() if k != "startedAt"},
+             "atMs": round((call["startedAt"] - self.started) * 1000, 2)}
+            for call in self.calls
+        ]
+        report = {
+            "id": self.id,
+            "method": self.request.method,
+            "path": self.request.url.path,
+            "query": str(self.request.query_params),
+            "status": status_code,
+            "startedAt": self.started_at,
+            "durationMs": round(self.duration * 1000, 2),
+            "pid": os.getpid(),
+            "intervalMs": PROFILING_INTERVAL_MS,
+            "upstream": self.upstream_summary(),
+            "upstreamCalls": calls,
+        }
+        if self.profiler is not None:
+            report["profiler"] = "pyinstrument"
+            report["callTree"] = self.profiler.output_text(unicode=True, color=False)
+            report["html"] = self.profiler.output_html()
+        else:
+            report["profiler"] = "sampler"
+            report["samples"] = self.sampler.samples
+            report["callTree"] = self.sampler.call_tree()
+            report["collapsed"] = self.sampler.collapsed()
+        return report
+
+
+def wants_profile(request) -> bool:
+    if not (PROFILING_ENABLED and ADMIN_API_KEY):
+        return False
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_QUERY_PARAM)
+    return flag not in (None, "", "0", "false") and is_admin(request)
+
+
+def store_report(report: Dict[str, Any]):
+    # Drop the heaviest optional parts until the report fits
+    size = len(dumps(report))
+    for part in ("html", "collapsed"):
+        if size <= PROFILING_MAX_REPORT_BYTES:
+            break
+        report.pop(part, None)
+        report.setdefault("truncated", []).append(part)
+        size = len(dumps(report))
+    cache.set(f"profile:{report['id']}", report, PROFILING_REPORT_TTL)
+
+    summary = {**{f: report.get(f) for f in SUMMARY_FIELDS}, "bytes": size}
+    evicted = []
+
+    def add(index):
+        entries = sorted(_live((index or {}).get("reports", [])) + [summary], key=lambda r: r.get("startedAt") or 0)
+        evicted.extend(entries[:max(0, len(entries) - PROFILING_MAX_REPORTS)])
+        return {"reports": entries[len(evicted):]}
+    cache.update(INDEX_KEY, add, PROFILING_REPORT_TTL)
+    for entry in evicted:
+        cache.delete(f"profile:{entry['id']}")
+
+
+def _live(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cutoff = time.time() - PROFILING_REPORT_TTL
+    return [e for e in entries if (e.get("startedAt") or 0) > cutoff]
+
+
+def list_reports() -> List[Dict[str, Any]]:
+    reports = _live((cache.get(INDEX_KEY) or {}).get("reports", []))
+    return sorted(reports, key=lambda r: r.get("startedAt") or 0, reverse=True)
+
+
+def get_report(profile_id: str) -> Optional[Dict[str, Any]]:
+    return cache.get(f"profile:{profile_id}")
+
+
+async def profiling_middleware(request, call_next):
+    if not wants_profile(request):
+        return await call_next(request)
+    if not _busy.acquire(blocking=False):
+        # Another request on this worker is being profiled; serve this one normally
+        response = await call_next(request)
+        response.headers["X-Profile-Skipped"] = "busy"
+        return response
+    try:
+        with RequestProfile(request) as profile:
+            response = await call_next(request)
+        store_report(profile.report(response.status_code))
+    finally:
+        _busy.release()
+    response.headers["X-Profile-Id"] = profile.id
+    response.headers["Server-Timing"] = profile.server_timing()
+    return response
+
+
+def profiling_status() -> Dict[str, Any]:
+    return {
+        "enabled": PROFILING_ENABLED and bool(ADMIN_API_KEY),
+        "profiler": "pyinstrument" if pyinstrument is not None else "sampler",
+        "intervalMs": PROFILING_INTERVAL_MS,
+        "maxSeconds": PROFILING_MAX_SECONDS,
+        "maxReports": PROFILING_MAX_REPORTS,
+        "busy": _busy.locked(),
+    }
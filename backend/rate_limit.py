@@ -0,0 +1,205 @@
+"""
+Admission control for the endpoints that spend Adjust/AppTrove quota
+Per-client, per-route token buckets, plus global concurrency caps. Both are
+kept in the shared cache, so the limits hold across every worker on the
+host. A client over its rate gets 429 straight away. A request over the
+global cap waits briefly for a slot and is shed with 429 if none frees up,
+so one client's burst can't queue everyone else behind it. Clients are
+identified by IP; uvicorn resolves X-Forwarded-For (see serve.py).
+"""
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict
+
+from fastapi import HTTPException, Request
+
+from metrics import Counter
+from observability import route_label
+from shared_cache import cache
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Comma-separated client IPs that bypass the limits (internal jobs, health checkers)
+RATE_LIMIT_EXEMPT = {ip.strip() for ip in os.getenv("RATE_LIMIT_EXEMPT", "").split(",") if ip.strip()}
+# How long a request may wait for a concurrency slot before it is shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+# A slot held this long is assumed leaked (e.g. the worker died) and reclaimed
+ADMISSION_LEASE_SECONDS = float(os.getenv("ADMISSION_LEASE_SECONDS", "60"))
+_POLL_SECONDS = 0.025
+
+
+@dataclass
+class Bucket:
+    per_minute: float
+    burst: int
+
+
+RATE_LIMITS: Dict[str, Bucket] = {
+    # Adjust/AppTrove stats lookups, per client and per route
+    "stats": Bucket(
+        float(os.getenv("RATE_LIMIT_STATS_PER_MINUTE", "30")),
+        int(os.getenv("RATE_LIMIT_STATS_BURST", "10")),
+    ),
+    # Dashboard polling; conditional GETs make the steady state cheap, this caps runaway tabs
+    "dashboard": Bucket(
+        float(os.getenv("RATE_LIMIT_DASHBOARD_PER_MINUTE", "60")),
+        int(os.getenv("RATE_LIMIT_DASHBOARD_BURST", "20")),
+    ),
+}
+
+CONCURRENCY_LIMITS: Dict[str, int] = {
+    # Requests across all workers that may be talking to Adjust/AppTrove at once
+    "upstream": int(os.getenv("UPSTREAM_CONCURRENCY_LIMIT", "8")),
+}
+
+rejected_requests = Counter(
+    "admission_rejected_total", "Requests refused with 429", ["limit", "reason"]
+)
+admission_wait_seconds = Counter(
+    "admission_wait_seconds_total", "Time spent queued for a concurrency slot", ["limit"]
+)
+
+_waiting: Dict[str, int] = {}
+
+
+def client_id(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _exempt(request: Request) -> bool:
+    return not RATE_LIMIT_ENABLED or client_id(request) in RATE_LIMIT_EXEMPT
+
+
+def too_many(limit: str, reason: str, retry_after: float, detail: str, headers=None) -> HTTPException:
+    rejected_requests.inc(limit=limit, reason=reason)
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after))), **(headers or {})}
+    )
+
+
+def take_token(key: str, bucket: Bucket) -> Dict[str, float]:
+    """Refill then take one token, atomically across workers; returns the bucket state"""
+    rate = bucket.per_minute / 60
+
+    def apply(state):
+        now = time.time()
+        tokens = bucket.burst if state is None else min(bucket.burst, state["tokens"] + (now - state["at"]) * rate)
+        allowed = tokens >= 1
+        return {
+            "tokens": tokens - 1 if allowed else tokens,
+            "at": now,
+            "allowed": allowed,
+            "retryAfter": 0 if allowed else (1 - tokens) / rate,
+        }
+    # An idle bucket is full again after burst / rate seconds; it can be forgotten then
+    return cache.update(key, apply, ttl=bucket.burst / rate + 1)
+
+
+def rate_limit(name: str):
+    """Dependency: token bucket `name`, kept per client and per route"""
+    bucket = RATE_LIMITS[name]
+
+    async def check(request: Request):
+        if _exempt(request):
+            return
+        # Each check is a SQLite write transaction; keep it off the event loop
+        state = await asyncio.to_thread(take_token, f"ratelimit:{name}:{route_label(request)}:{client_id(request)}", bucket)
+        if not state["allowed"]:
+            headers = {"RateLimit-Limit": str(bucket.burst), "RateLimit-Remaining": "0"}
+            raise too_many(name, "rate", state["retryAfter"], "Too many requests, slow down", headers)
+    return check
+
+
+def _try_acquire(key: str, lease: str, limit: int) -> bool:
+    def apply(leases):
+        now = time.time()
+        live = {k: expires for k, expires in (leases or {}).items() if expires > now}
+        if len(live) < limit:
+            live[lease] = now + ADMISSION_LEASE_SECONDS
+        return live
+    return lease in cache.update(key, apply, ttl=ADMISSION_LEASE_SECONDS)
+
+
+def _release(key: str, lease: str):
+    cache.update(key, lambda leases: {k: v for k, v in (leases or {}).items() if k != lease},
+                 ttl=ADMISSION_LEASE_SECONDS)
+
+
+def concurrency_limit(name: str):
+    """Dependency: hold one of the global `name` slots for the whole request"""
+    limit = CONCURRENCY_LIMITS[name]
+    key = f"admission:{name}"
+
+    async def slot(request: Request):
+        if _exempt(request):
+            yield
+            return
+        lease = uuid.uuid4().hex
+        if not await asyncio.to_thread(_try_acquire, key, lease, limit):
+            # Bound this process's queue too, so waiting requests can't pile up unchecked
+            if _waiting.get(name, 0) >= limit:
+                raise too_many(name, "overload", ADMISSION_QUEUE_TIMEOUT, "Server busy, retry shortly")
+            _waiting[name] = _waiting.get(name, 0) + 1
+            started = time.perf_counter()
+            try:
+                deadline = started + ADMISSION_QUEUE_TIMEOUT
+                while not await asyncio.to_thread(_try_acquire, key, lease, limit):
+                    if time.perf_counter() >= deadline:
+                        raise too_many(name, "overload", ADMISSION_QUEUE_TIMEOUT, "Server busy, retry shortly")
+                    await asyncio.sleep(_POLL_SECONDS)
+            finally:
+                _waiting[name] -= 1
+                admission_wait_seconds.inc(time.perf_counter() - started, limit=name)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(_release, key, lease)
+    return slot
+
+
+@contextmanager
+def concurrency_slot(name: str):
+    """
+    Hold one of the global `name` slots around blocking code only, e.g. the
+    upstream fetches behind a cache miss. Waits like concurrency_limit, by
+    sleeping, so call it from a worker thread.
+    """
+    limit = CONCURRENCY_LIMITS[name]
+    key = f"admission:{name}"
+    lease = uuid.uuid4().hex
+    if not _try_acquire(key, lease, limit):
+        started = time.perf_counter()
+        try:
+            while not _try_acquire(key, lease, limit):
+                if time.perf_counter() - started >= ADMISSION_QUEUE_TIMEOUT:
+                    raise too_many(name, "overload", ADMISSION_QUEUE_TIMEOUT, "Server busy, retry shortly")
+                time.sleep(_POLL_SECONDS)
+        finally:
+            admission_wait_seconds.inc(time.perf_counter() - started, limit=name)
+    try:
+        yield
+    finally:
+        _release(key, lease)
+
+
+def admission_status() -> Dict[str, object]:
+    now = time.time()
+    return {
+        "enabled": RATE_LIMIT_ENABLED,
+        "rateLimits": {name: vars(bucket) for name, bucket in RATE_LIMITS.items()},
+        "concurrency": {
+            name: {
+                "limit": limit,
+                "inUse": sum(1 for expires in (cache.get(f"admission:{name}") or {}).values() if expires > now),
+                "waitingHere": _waiting.get(name, 0),
+            }
+            for name, limit in CONCURRENCY_LIMITS.items()
+        },
+    }
@@ -0,0 +1,145 @@
+"""
+Readiness probe
+Liveness (/health) only says the process is up. Readiness says it can serve
+at normal latency: each registered check warms something the first request
+would otherwise pay for (a DynamoDB connection, upstream keep-alive pools,
+primed caches, the browser pool) and reports whether it succeeded.
+Checks run in the background, retried until they pass and re-run
+periodically after that, except one-shot warm-ups that stop once they pass. The probe endpoint only reads their last results,
+so probing is cheap however often Kubernetes asks.
+"""
+
+import asyncio
+import inspect
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# Seconds between attempts while a check is failing
+READINESS_RETRY_SECONDS = float(os.getenv("READINESS_RETRY_SECONDS", "2"))
+# Seconds between re-runs once a check has passed
+READINESS_RECHECK_SECONDS = float(os.getenv("READINESS_RECHECK_SECONDS", "30"))
+# Per-attempt limit, so a hung upstream can't stall the loop
+READINESS_CHECK_TIMEOUT = float(os.getenv("READINESS_CHECK_TIMEOUT", "60"))
+
+
+def enabled_checks() -> Optional[List[str]]:
+    """READINESS_CHECKS: comma-separated subset of checks to run; unset runs all registered"""
+    value = os.getenv("READINESS_CHECKS")
+    if value is None:
+        return None
+    return [c.strip() for c in value.split(",") if c.strip()]
+
+
+@dataclass
+class Check:
+    name: str
+    run: Callable[[], Any]
+    # Optional checks are reported but never hold the pod out of rotation
+    required: bool = True
+    # One-shot warm-ups stop once they pass instead of re-running forever
+    once: bool = False
+    ok: bool = False
+    detail: Any = None
+    error: Optional[str] = None
+    seconds: Optional[float] = None
+    attempts: int = 0
+    checked_at: Optional[float] = None
+    passed_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "ok": self.ok,
+            "required": self.required,
+            "attempts": self.attempts,
+            "seconds": self.seconds,
+            "checkedAgo": round(time.time() - self.checked_at, 1) if self.checked_at else None,
+        }
+        if self.detail is not None:
+            result["detail"] = self.detail
+        if self.error:
+            result["error"] = self.error
+        return result
+
+
+class Readiness:
+    def __init__(self):
+        self.checks: Dict[str, Check] = {}
+        self.ready_at: Optional[float] = None
+        self._tasks: List[asyncio.Task] = []
+        self._started = time.time()
+
+    def register(self, name: str, run: Callable[[], Any], required: bool = True, once: bool = False):
+        """
+        `run` (sync or async) warms its component and returns optional detail;
+        raising or returning False marks the check as failing.
+        """
+        self.checks[name] = Check(name, run, required, once)
+
+    def active(self) -> List[Check]:
+        selected = enabled_checks()
+        return [c for c in self.checks.values() if selected is None or c.name in selected]
+
+    @property
+    def ready(self) -> bool:
+        return all(c.ok for c in self.active() if c.required)
+
+    async def run_check(self, check: Check):
+        started = time.perf_counter()
+        check.attempts += 1
+        try:
+            if inspect.iscoroutinefunction(check.run):
+                result = await asyncio.wait_for(check.run(), READINESS_CHECK_TIMEOUT)
+            else:
+                result = await asyncio.wait_for(asyncio.to_thread(check.run), READINESS_CHECK_TIMEOUT)
+            check.ok = result is not False
+            check.detail = None if isinstance(result, bool) else result
+            check.error = None if check.ok else "check returned False"
+        except asyncio.TimeoutError:
+            check.ok, check.error = False, f"timed out after {READINESS_CHECK_TIMEOUT:.0f}s"
+        except Exception as e:
+            check.ok, check.error = False, f"{type(e).__name__}: {e}"
+        check.seconds = round(time.perf_counter() - started, 3)
+        check.checked_at = time.time()
+        if check.ok and check.passed_at is None:
+            check.passed_at = check.checked_at
+            print(f"✅ Readiness check {check.name} passed in {check.seconds:.2f}s")
+        elif not check.ok and check.attempts == 1:
+            print(f"⚠️ Readiness check {check.name} failing: {check.error}")
+        if self.ready and self.ready_at is None:
+            self.ready_at = time.time()
+            print(f"🚀 Ready for traffic {self.ready_at - self._started:.1f}s after start")
+
+    async def _check_loop(self, check: Check):
+        # One loop per check, so a slow cache prime doesn't delay retries of the others.
+        # Only required checks retry quickly; optional ones just report.
+        while True:
+            await self.run_check(check)
+            if check.once and check.ok:
+                return
+            retry = check.required and not check.ok
+            await asyncio.sleep(READINESS_RETRY_SECONDS if retry else READINESS_RECHECK_SECONDS)
+
+    def start(self):
+        """Begin warming; call from the app's startup hook"""
+        if not self._tasks:
+            self._started = time.time()
+            self._tasks = [asyncio.create_task(self._check_loop(c)) for c in self.active()]
+            if not self._tasks:
+                self.ready_at = time.time()
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "readyAt": self.ready_at,
+            "checks": {c.name: c.to_dict() for c in self.active()},
+        }
+
+
+readiness = Readiness()
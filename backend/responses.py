@@ -0,0 +1,133 @@
+"""
+Fast JSON responses and compression
+orjson (when installed) with Decimal support for DynamoDB items, and an
+ASGI middleware that brotli- or gzip-compresses JSON/text bodies above a
+size threshold. Endpoints returning large lists should return
+json_response(...) directly: that skips FastAPI's jsonable_encoder pass.
+"""
+
+import gzip
+import json
+import os
+from decimal import Decimal
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is used instead
+    brotli = None
+
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+# Brotli quality 4-5 compresses better than gzip -6 at similar CPU cost
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/csv")
+
+
+def json_default(value: Any):
+    # DynamoDB returns every number as Decimal; match jsonable_encoder (int if integral)
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; handles Decimal/set without jsonable_encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200, headers=None) -> FastJSONResponse:
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def _choose_encoding(accept_encoding: str):
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=RESPONSE_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Buffers compressible responses and encodes them with br or gzip when
+    they reach `minimum_size`. Streams (e.g. text/event-stream) and bodies
+    that already carry a Content-Encoding pass straight through.
+    """
+
+    def __init__(self, app, minimum_size: int = RESPONSE_COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+        chunks = []
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start_message["headers"])
+            if len(body) >= self.minimum_size:
+                body = _compress(body, encoding)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+            headers["content-length"] = str(len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
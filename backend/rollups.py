@@ -0,0 +1,243 @@
+"""
+Time-series rollups for affiliate analytics
+Daily, weekly (Monday-start) and monthly totals of clicks, installs, revenue
+and payout, per affiliate and across all of them. A chart over several
+months reads a few dozen pre-aggregated points instead of every row.
+
+Rollups are rebuilt in one pass whenever a scan of the analytics table sees
+its high-water mark (row count + latest timestamp) move, which catches rows
+written by other services. Rows written through this API are folded in
+straight away and advance the mark, so they don't trigger a rebuild. Each rebuild writes a new generation of records and then
+switches the pointer to it, so readers never see a half-built set.
+
+Records live in the shared cache, one per scope ("all" or an affiliate id)
+holding all three granularities: rollup:{generation}:{scope}.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from conditional import high_water_mark
+from shared_cache import cache
+
+ROLLUP_REFRESH_SECONDS = float(os.getenv("ROLLUP_REFRESH_SECONDS", "300"))
+ROLLUP_TTL = 30 * 24 * 3600
+META_KEY = "rollup:meta"
+GLOBAL_SCOPE = "all"
+# Row timestamps the high-water mark tracks
+MARK_FIELDS = ("updatedAt", "date")
+
+GRANULARITIES = ("day", "week", "month")
+METRICS = ("clicks", "installs", "revenue", "payout")
+
+
+def period_start(day: date, granularity: str) -> str:
+    if granularity == "week":
+        day = day - timedelta(days=day.weekday())
+    elif granularity == "month":
+        day = day.replace(day=1)
+    return day.isoformat()
+
+
+def parse_day(value: str) -> date:
+    """YYYY-MM-DD (time part ignored) or YYYY-MM"""
+    value = str(value)[:10]
+    return date.fromisoformat(value + "-01" if len(value) == 7 else value)
+
+
+def parse_range(granularity: str, start: Optional[str], end: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Validated (first, last) period starts for a from/to range; raises ValueError"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    try:
+        first = period_start(parse_day(start), granularity) if start else None
+        last = period_start(parse_day(end), granularity) if end else None
+    except ValueError:
+        raise ValueError("from/to must be dates (YYYY-MM-DD or YYYY-MM)")
+    return first, last
+
+
+def row_day(row: dict) -> Optional[date]:
+    try:
+        return parse_day(row.get("date") or row.get("createdAt"))
+    except (TypeError, ValueError):
+        return None
+
+
+def row_metrics(row: dict) -> Dict[str, float]:
+    # Writers disagree on names: installs/conversions, payout/earnings/network_cost
+    return {
+        "clicks": int(row.get("clicks") or 0),
+        "installs": int(row.get("installs") or row.get("conversions") or 0),
+        "revenue": float(row.get("revenue") or 0),
+        "payout": float(row.get("payout") or row.get("earnings") or row.get("network_cost") or 0),
+    }
+
+
+def _empty_record() -> Dict[str, Dict[str, Dict[str, float]]]:
+    return {g: {} for g in GRANULARITIES}
+
+
+def _fold(record: dict, day: date, metrics: Dict[str, float], sign: int = 1):
+    for granularity in GRANULARITIES:
+        period = period_start(day, granularity)
+        point = record[granularity].setdefault(period, {**{m: 0 for m in METRICS}, "rows": 0})
+        for m in METRICS:
+            point[m] += sign * metrics[m]
+        point["rows"] += sign
+        if point["rows"] <= 0:
+            del record[granularity][period]
+
+
+class Rollups:
+    def __init__(
+        self,
+        load_rows: Callable[[], List[dict]],
+        on_rebuild: Optional[Callable[[Dict[str, dict]], None]] = None,
+        on_record: Optional[Callable[[str, dict], None]] = None
+    ):
+        # Every analytics row (the shared cached scan)
+        self.load_rows = load_rows
+        # Listeners get every scope's record after a rebuild, or one affiliate's after a fold
+        self.on_rebuild = on_rebuild
+        self.on_record = on_record
+
+    @staticmethod
+    def _notify(listener, *args):
+        if listener is None:
+            return
+        try:
+            listener(*args)
+        except Exception as e:
+            print(f"⚠️ Rollup listener failed: {e}")
+
+    @staticmethod
+    def _key(generation: str, scope: str) -> str:
+        return f"rollup:{generation}:{scope}"
+
+    def meta(self) -> Optional[Dict[str, Any]]:
+        return cache.get(META_KEY)
+
+    def rebuild(self, rows: List[dict], mark: Optional[dict] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        records: Dict[str, dict] = {GLOBAL_SCOPE: _empty_record()}
+        skipped = 0
+        for row in rows:
+            day = row_day(row)
+            if day is None:
+                skipped += 1
+                continue
+            metrics = row_metrics(row)
+            _fold(records[GLOBAL_SCOPE], day, metrics)
+            if row.get("userId"):
+                _fold(records.setdefault(str(row["userId"]), _empty_record()), day, metrics)
+
+        generation = uuid.uuid4().hex[:8]
+        for scope, record in records.items():
+            cache.set(self._key(generation, scope), record, ROLLUP_TTL)
+
+        meta = {
+            "generation": generation,
+            "mark": mark if mark is not None else high_water_mark(rows, *MARK_FIELDS),
+            "builtAt": time.time(),
+            "rows": len(rows) - skipped,
+            "skippedRows": skipped,
+            "scopes": len(records),
+            "buildSeconds": round(time.perf_counter() - started, 3),
+        }
+        replaced = {}
+
+        def swap(previous):
+            replaced["generation"] = (previous or {}).get("generation")
+            return meta
+        cache.update(META_KEY, swap, ROLLUP_TTL)
+        if replaced["generation"] and replaced["generation"] != generation:
+            cache.delete_prefix(f"rollup:{replaced['generation']}:")
+        self._notify(self.on_rebuild, records)
+        print(f"📈 Analytics rollups rebuilt: {meta['rows']} rows, {meta['scopes']} scopes in {meta['buildSeconds']:.2f}s")
+        return meta
+
+    def refresh(self, rows: List[dict], mark: Optional[dict] = None) -> Dict[str, Any]:
+        """Rebuild if `rows` differ from what the current rollups were built from"""
+        mark = mark if mark is not None else high_water_mark(rows, *MARK_FIELDS)
+        meta = self.meta()
+        if meta is None or meta["mark"] != mark:
+            meta = self.rebuild(rows, mark)
+        return meta
+
+    def ensure(self) -> Dict[str, Any]:
+        return self.meta() or self.refresh(self.load_rows())
+
+    def record(self, before: Optional[dict], after: Optional[dict]):
+        """An analytics row changed from `before` to `after` (None for missing)"""
+        meta = self.meta()
+        if meta is None:
+            # Not built yet; the first build will include the row
+            return
+        changes = []
+        for row, sign in ((before, -1), (after, 1)):
+            day = row_day(row) if row else None
+            if day is not None:
+                changes.append((row.get("userId"), day, row_metrics(row), sign))
+
+        for scope in {GLOBAL_SCOPE} | {str(user_id) for user_id, *_ in changes if user_id}:
+            def apply(record, scope=scope):
+                record = record or _empty_record()
+                for user_id, day, metrics, sign in changes:
+                    if scope == GLOBAL_SCOPE or str(user_id) == scope:
+                        _fold(record, day, metrics, sign)
+                return record
+            record = cache.update(self._key(meta["generation"], scope), apply, ROLLUP_TTL)
+            if scope != GLOBAL_SCOPE:
+                self._notify(self.on_record, scope, record)
+        self._advance_mark(meta["generation"], before, after)
+
+    def _advance_mark(self, generation: str, before: Optional[dict], after: Optional[dict]):
+        """Move the mark as the table moved, so the next scan doesn't look like an outside write"""
+        def apply(meta):
+            if meta is None or meta["generation"] != generation:
+                # Rebuilt in the meantime, from a scan that may include the row
+                return meta
+            mark = dict(meta["mark"])
+            mark["count"] += (after is not None) - (before is not None)
+            latest = high_water_mark([after] if after else [], *MARK_FIELDS)["latest"]
+            mark["latest"] = max(mark["latest"], latest)
+            return {**meta, "mark": mark}
+        cache.update(META_KEY, apply, ROLLUP_TTL)
+
+    def series(self, scope: str, granularity: str, first: Optional[str] = None, last: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Points for one scope, oldest first; `first`/`last` are period starts from parse_range"""
+        meta = self.ensure()
+        record = cache.get(self._key(meta["generation"], scope))
+        if record is None:
+            if scope == GLOBAL_SCOPE:
+                # The generation's records expired or were evicted; start over
+                cache.delete(META_KEY)
+                record = cache.get(self._key(self.ensure()["generation"], scope)) or _empty_record()
+            else:
+                record = _empty_record()
+        points = []
+        for period, point in sorted(record[granularity].items()):
+            if (first and period < first) or (last and period > last):
+                continue
+            points.append({
+                "period": period,
+                "clicks": int(point["clicks"]),
+                "installs": int(point["installs"]),
+                "revenue": round(point["revenue"], 2),
+                "payout": round(point["payout"], 2),
+                "rows": point["rows"],
+            })
+        return points
+
+    async def refresh_loop(self):
+        while True:
+            await asyncio.sleep(ROLLUP_REFRESH_SECONDS)
+            try:
+                await asyncio.to_thread(lambda: self.refresh(self.load_rows()))
+            except Exception as e:
+                print(f"⚠️ Analytics rollup refresh failed: {e}")
@@ -0,0 +1,104 @@
+"""
+Production entry point
+Runs the API under uvicorn's process manager with preforked workers, so
+throughput scales with cores. Workers share cached data through
+shared_cache.py rather than each warming their own.
+
+    python serve.py                      # WEB_CONCURRENCY workers (default: see below)
+    python serve.py --workers 4 --port 3001
+    FORWARDED_ALLOW_IPS=10.0.0.5 python serve.py   # behind a load balancer at 10.0.0.5
+
+Send SIGHUP to the parent for a graceful reload (workers are replaced one
+by one after finishing in-flight requests); SIGTTIN / SIGTTOU add or remove
+a worker. `python main.py` still runs a single process for development.
+
+WEB_CONCURRENCY sets the worker count. Without it, the count is the CPUs
+this container may actually use (cgroup quota and affinity, not the host's
+core count), capped at DEFAULT_MAX_WORKERS (2). The cap is there because
+every worker starts AUTOMATION_WORKERS automation processes, each with its
+own Chromium. Raise WEB_CONCURRENCY once the pod has the memory for them.
+"""
+
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+
+
+# Proxies whose X-Forwarded-For is trusted (comma-separated IPs). Rate
+# limits key on the client address, so trusting any peer would let a client
+# pick a fresh address per request.
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+DEFAULT_MAX_WORKERS = 2
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: the cgroup CPU quota if there is one, else its affinity mask"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as q, open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as p:
+                limit, period = int(q.read()), int(p.read())
+                if limit > 0:
+                    quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota)))
+    return max(1, cpus)
+
+
+def default_workers() -> int:
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return int(configured)
+    return min(available_cpus(), DEFAULT_MAX_WORKERS)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the Millionaires Adda API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        help="Seconds a worker may spend finishing requests on shutdown/reload"
+    )
+    args = parser.parse_args()
+
+    # Drop expired entries left over from a previous run before workers start
+    from shared_cache import cache
+    cache.purge_expired()
+
+    print(f"🚀 Serving on {args.host}:{args.port} with {args.workers} worker(s)")
+    uvicorn.run(
+        "main:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+    )
+
+
+if __name__ == "__main__":
+    main()
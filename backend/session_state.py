@@ -0,0 +1,251 @@
+"""
+In-memory AppTrove dashboard session
+Holds the Playwright storage_state in memory, tracks cookie expiry and
+refreshes / re-persists the session in the background, so automation jobs
+never pay for a login or a validation navigation on the request path.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import requests
+
+# Refresh this long before the tracked cookie expires
+APPTROVE_SESSION_REFRESH_MARGIN = int(os.getenv("APPTROVE_SESSION_REFRESH_MARGIN", "3600"))
+# Re-validate at least this often, even when cookies have no expiry
+APPTROVE_SESSION_VALIDATE_INTERVAL = int(os.getenv("APPTROVE_SESSION_VALIDATE_INTERVAL", "900"))
+APPTROVE_SESSION_CHECK_INTERVAL = int(os.getenv("APPTROVE_SESSION_CHECK_INTERVAL", "60"))
+# After a failed refresh, automatic refreshes are skipped for this long
+APPTROVE_SESSION_RETRY_BACKOFF = int(os.getenv("APPTROVE_SESSION_RETRY_BACKOFF", "30"))
+# Optional: a dashboard API URL that answers 401/403 (or redirects to /login)
+# when logged out. Enables validation without a browser.
+APPTROVE_SESSION_CHECK_URL = os.getenv("APPTROVE_SESSION_CHECK_URL")
+# Optional: name of the cookie that carries the session; otherwise the
+# earliest-expiring dashboard cookie is tracked
+APPTROVE_SESSION_COOKIE = os.getenv("APPTROVE_SESSION_COOKIE")
+
+
+def load_state_file(path: str) -> Optional[Dict[str, Any]]:
+    """Read either a storage_state dict or the cookie list written by generate-cookies.py"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {"cookies": data, "origins": []}
+    return data
+
+
+def save_state_file(path: str, state: Dict[str, Any]):
+    """Persist as a plain cookie list so generate-cookies.py output stays interchangeable"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state.get("cookies", []), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class SessionStateManager:
+    """
+    `open_page(storage_state)` must return (context, page) on a scratch
+    browser context. `login(page)` performs a full dashboard login.
+    `is_logged_in(page)` navigates and reports whether the session holds.
+    All three only ever run from refresh(), never on the job path.
+    """
+
+    def __init__(
+        self,
+        state_file: str,
+        open_page: Callable[[Optional[Dict[str, Any]]], Awaitable[Any]],
+        login: Callable[[Any], Awaitable[None]],
+        is_logged_in: Callable[[Any], Awaitable[bool]],
+        domain: str = "apptrove.com",
+        refresh_margin: int = APPTROVE_SESSION_REFRESH_MARGIN,
+        validate_interval: int = APPTROVE_SESSION_VALIDATE_INTERVAL,
+        check_interval: int = APPTROVE_SESSION_CHECK_INTERVAL,
+    ):
+        self.state_file = state_file
+        self.open_page = open_page
+        self.login = login
+        self.is_logged_in = is_logged_in
+        self.domain = domain
+        self.refresh_margin = refresh_margin
+        self.validate_interval = validate_interval
+        self.check_interval = check_interval
+
+        self.state: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self.validated_at = 0.0
+        self.failed_at = 0.0
+        self.last_error: Optional[str] = None
+        self._invalid_version = None
+        self._loaded = False
+        self._refresh_lock = asyncio.Lock()
+        self._loop_task = None
+        self._listeners: List[Callable[[], Awaitable[None]]] = []
+
+    # ---------- state ----------
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            self._set_state(load_state_file(self.state_file), persist=False)
+        except Exception as e:
+            self.last_error = f"Could not read {self.state_file}: {e}"
+            print(f"   ⚠️ {self.last_error}")
+
+    def _set_state(self, state: Optional[Dict[str, Any]], persist: bool = True):
+        self.state = state
+        self.version += 1
+        if state and persist:
+            try:
+                save_state_file(self.state_file, state)
+            except Exception as e:
+                print(f"   ⚠️ Could not persist session cookies: {e}")
+
+    def on_refresh(self, listener: Callable[[], Awaitable[None]]):
+        """Called after a refresh replaces the session (e.g. to recycle idle contexts)"""
+        self._listeners.append(listener)
+
+    def expires_at(self) -> Optional[float]:
+        """Expiry of the session cookie, or None for session cookies / no state"""
+        if not self.state:
+            return None
+        expiries = [
+            c["expires"] for c in self.state.get("cookies", [])
+            if self.domain in c.get("domain", "")
+            and (not APPTROVE_SESSION_COOKIE or c.get("name") == APPTROVE_SESSION_COOKIE)
+            and c.get("expires", -1) > 0
+        ]
+        return min(expiries) if expiries else None
+
+    def is_usable(self) -> bool:
+        """Cheap in-memory check: we hold state and its cookie hasn't expired"""
+        self._load()
+        if not self.state or self._invalid_version == self.version:
+            return False
+        expires = self.expires_at()
+        return expires is None or expires > time.time()
+
+    def needs_refresh(self) -> bool:
+        if not self.is_usable():
+            return True
+        expires = self.expires_at()
+        if expires is not None and expires - time.time() < self.refresh_margin:
+            return True
+        return time.time() - self.validated_at > self.validate_interval
+
+    def get_state(self) -> Optional[Dict[str, Any]]:
+        """Storage state for a new context, straight from memory"""
+        self._load()
+        self.ensure_started()
+        return self.state if self.is_usable() else None
+
+    def invalidate(self, since: float = 0.0):
+        """
+        A job that started at `since` was bounced to /login: stop handing this
+        state to new contexts, unless it was already renewed after that job began.
+        """
+        if self.validated_at <= since:
+            self._invalid_version = self.version
+
+    # ---------- validation / refresh ----------
+
+    def _validate_http(self) -> bool:
+        jar = {c["name"]: c["value"] for c in self.state.get("cookies", []) if self.domain in c.get("domain", "")}
+        response = requests.get(APPTROVE_SESSION_CHECK_URL, cookies=jar, allow_redirects=False, timeout=10)
+        if response.status_code in (401, 403):
+            return False
+        if response.is_redirect and '/login' in response.headers.get('location', ''):
+            return False
+        return response.ok
+
+    async def refresh(self, force: bool = False) -> bool:
+        """
+        Validate the session and renew it if needed. Runs a browser only when
+        no HTTP check URL is configured or the session has to be rebuilt.
+        """
+        async with self._refresh_lock:
+            self._load()
+            if not force and not self.needs_refresh():
+                return True
+            if not force and time.time() - self.failed_at < APPTROVE_SESSION_RETRY_BACKOFF:
+                return self.is_usable()
+
+            if self.is_usable() and APPTROVE_SESSION_CHECK_URL:
+                expires = self.expires_at()
+                near_expiry = expires is not None and expires - time.time() < self.refresh_margin
+                try:
+                    if not near_expiry and await asyncio.to_thread(self._validate_http):
+                        self.validated_at = time.time()
+                        return True
+                except Exception as e:
+                    print(f"   ⚠️ Session check request failed: {e}")
+
+            context = None
+            try:
+                context, page = await self.open_page(self.state if self.is_usable() else None)
+                if not (self.is_usable() and await self.is_logged_in(page)):
+                    print("→ Dashboard session expired, logging in in the background")
+                    await self.login(page)
+                # Re-read cookies so server-side rotation extends our expiry
+                self._set_state(await context.storage_state())
+                self.validated_at = time.time()
+                self.last_error = None
+                print("✅ Dashboard session refreshed")
+            except Exception as e:
+                self.failed_at = time.time()
+                self.last_error = str(e)
+                print(f"❌ Dashboard session refresh failed: {e}")
+                return False
+            finally:
+                if context:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+
+        for listener in self._listeners:
+            try:
+                await listener()
+            except Exception as e:
+                print(f"   ⚠️ Session refresh listener failed: {e}")
+        return True
+
+    def ensure_started(self):
+        """Start the background refresh loop (needs a running event loop)"""
+        if self._loop_task or self.check_interval <= 0:
+            return
+        try:
+            self._loop_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+        except RuntimeError:
+            pass
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                if self.needs_refresh():
+                    await self.refresh()
+            except Exception as e:
+                print(f"⚠️ Session refresh loop error: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+
+    def status(self) -> Dict[str, Any]:
+        expires = self.expires_at()
+        return {
+            "hasState": bool(self.state),
+            "usable": self.is_usable(),
+            "version": self.version,
+            "expiresAt": expires,
+            "validatedAt": self.validated_at or None,
+            "lastError": self.last_error,
+        }
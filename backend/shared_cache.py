@@ -0,0 +1,224 @@
+"""
+Cross-process shared cache
+A small TTL key/value store on a local SQLite file (WAL mode), so every
+uvicorn worker on the host reads the same cached users, templates and
+stats instead of warming its own copy. Falls back to a per-process dict
+when SHARED_CACHE_BACKEND=memory or the file can't be opened.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from metrics import Counter
+from responses import dumps, loads
+
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "sqlite").lower()
+SHARED_CACHE_PATH = os.getenv(
+    "SHARED_CACHE_PATH", os.path.join(tempfile.gettempdir(), "millionaires-adda-cache.sqlite3")
+)
+
+_MISSING = object()
+
+cache_requests = Counter("shared_cache_requests_total", "Shared cache lookups", ["result"])
+
+
+def encode(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+def _like_prefix(prefix: str) -> str:
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class MemoryCache:
+    """Per-process fallback with the same interface"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.time():
+                self._data.pop(key, None)
+                self._count(hit=False)
+                return default
+            self._count(hit=True)
+            return loads(entry[0])
+
+    def _count(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        cache_requests.inc(result="hit" if hit else "miss")
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (encode(value), time.time() + ttl)
+
+    def update(self, key: str, fn: Callable[[Any], Any], ttl: float) -> Any:
+        """Atomically replace the value with fn(current or None); returns the new value"""
+        with self._lock:
+            entry = self._data.get(key)
+            current = loads(entry[0]) if entry and entry[1] >= time.time() else None
+            value = fn(current)
+            self._data[key] = (encode(value), time.time() + ttl)
+            return value
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def items(self, prefix: str) -> Dict[str, Any]:
+        """Every live entry whose key starts with `prefix`"""
+        now = time.time()
+        with self._lock:
+            return {
+                k: loads(v) for k, (v, expires) in self._data.items()
+                if k.startswith(prefix) and expires >= now
+            }
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires) in self._data.items() if expires < now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(MemoryCache):
+    """
+    One table, one row per key. Each thread gets its own connection;
+    WAL lets readers in every worker proceed while one writes.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            self._count(hit=False)
+            return default
+        self._count(hit=True)
+        return loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, encode(value), time.time() + ttl)
+        )
+
+    def update(self, key: str, fn: Callable[[Any], Any], ttl: float) -> Any:
+        db = self._connection()
+        # IMMEDIATE takes the write lock up front, so concurrent updates from other workers serialize
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            current = loads(row[0]) if row and row[1] >= time.time() else None
+            value = fn(current)
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encode(value), time.time() + ttl)
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return value
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str):
+        self._connection().execute("DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (_like_prefix(prefix),))
+
+    def items(self, prefix: str) -> Dict[str, Any]:
+        rows = self._connection().execute(
+            "SELECT key, value FROM cache WHERE key LIKE ? ESCAPE '\\' AND expires_at >= ?",
+            (_like_prefix(prefix), time.time())
+        ).fetchall()
+        return {key: loads(value) for key, value in rows}
+
+    def purge_expired(self) -> int:
+        return self._connection().execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+def _open_cache():
+    if SHARED_CACHE_BACKEND == "sqlite":
+        try:
+            return SQLiteCache(SHARED_CACHE_PATH)
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache unavailable at {SHARED_CACHE_PATH} ({e}), using per-process cache")
+    return MemoryCache()
+
+
+cache = _open_cache()
+
+
+def cached(key: str, ttl: float, loader: Callable[[], Any], cache_if: Callable[[Any], bool] = lambda v: v is not None) -> Any:
+    """Return the cached value for `key`, or call `loader` and cache its result"""
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    value = loader()
+    if cache_if(value):
+        cache.set(key, value, ttl)
+    return value
+
+
+def cache_status() -> Dict[str, Any]:
+    status = {
+        "backend": cache.backend,
+        "entries": cache.size(),
+        "hits": cache.hits,
+        "misses": cache.misses,
+        "pid": os.getpid(),
+    }
+    if cache.backend == "sqlite":
+        status["path"] = cache.path
+    return status
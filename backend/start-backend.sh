@@ -17,4 +17,4 @@ export APPTROVE_DOMAIN=${APPTROVE_DOMAIN:-"applink.reevo.in"}
 # AWS credentials should be set via environment variables or .env file
 # DO NOT hardcode credentials in this file
 
-python3 main.py
+python3 serve.py
@@ -6,5 +6,5 @@ source venv/bin/activate
 # Load environment variables
 export $(cat .env | grep -v '^#' | xargs)
 
-# Start the server
-python main.py
+# Start the server (preforked workers; WEB_CONCURRENCY sets the count, see serve.py)
+python serve.py
@@ -0,0 +1,112 @@
+"""
+Startup-time report
+Breaks cold start down by component: import phases marked by main.py plus
+whatever lazily-initialised clients (DynamoDB, upstream HTTP, Playwright)
+cost on first use. Also runs the optional STARTUP_PREWARM hooks.
+Imports only the standard library so it can be the first thing main.py loads.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+def prewarm_components() -> List[str]:
+    """
+    STARTUP_PREWARM: comma-separated components to initialise in the background
+    once serving, e.g. "dynamodb,upstream"; empty keeps everything lazy.
+    Read on use, because this module loads before .env does.
+    """
+    return [c.strip() for c in os.getenv("STARTUP_PREWARM", "").split(",") if c.strip()]
+
+
+def process_age() -> float:
+    """Seconds since this process was exec'd (Linux), else since this module loaded"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) counts clock ticks since boot; skip past the "(comm)" field
+            fields = f.read().rsplit(")", 1)[1].split()
+        started_ticks = int(fields[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _LOADED
+
+
+_LOADED = time.perf_counter()
+
+
+class StartupReport:
+    def __init__(self):
+        self.boot_seconds = process_age()
+        self.phases: List[Dict[str, Any]] = []
+        self.lazy: List[Dict[str, Any]] = []
+        self.ready_seconds = None
+        self._last = time.perf_counter()
+        self._prewarm: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str):
+        """Close a startup phase: time since the previous mark (or the report's creation)"""
+        now = time.perf_counter()
+        self.phases.append({"component": phase, "seconds": round(now - self._last, 4)})
+        self._last = now
+
+    def record_lazy(self, component: str, seconds: float):
+        """A lazily-initialised component paid its setup cost (on first use or pre-warm)"""
+        with self._lock:
+            self.lazy.append({"component": component, "seconds": round(seconds, 4), "atUptime": round(self.uptime(), 3)})
+
+    def uptime(self) -> float:
+        return self.boot_seconds + (time.perf_counter() - _LOADED)
+
+    def register_prewarm(self, component: str, hook: Callable[[], Any]):
+        self._prewarm[component] = hook
+
+    def prewarm(self):
+        """Run the configured pre-warm hooks (blocking; call from a thread)"""
+        for component in prewarm_components():
+            hook = self._prewarm.get(component)
+            if not hook:
+                print(f"⚠️ Unknown STARTUP_PREWARM component: {component}")
+                continue
+            try:
+                hook()
+            except Exception as e:
+                print(f"⚠️ Pre-warm of {component} failed: {e}")
+
+    def ready(self):
+        """The app is about to serve: freeze the time-to-ready and log it"""
+        if self.ready_seconds is None:
+            self.ready_seconds = round(self.uptime(), 3)
+            phases = ", ".join(f"{p['component']} {p['seconds']:.2f}s" for p in self.phases)
+            print(f"🚀 Ready in {self.ready_seconds:.2f}s (interpreter {self.boot_seconds:.2f}s, {phases})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "readySeconds": self.ready_seconds,
+            "interpreterSeconds": round(self.boot_seconds, 4),
+            "phases": self.phases,
+            "lazy": list(self.lazy),
+            "prewarm": prewarm_components(),
+        }
+
+
+startup_report = StartupReport()
+
+
+class timed_init:
+    """Context manager recording a lazy component's init cost on the report"""
+
+    def __init__(self, component: str):
+        self.component = component
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        startup_report.record_lazy(self.component, time.perf_counter() - self.started)
+        return False
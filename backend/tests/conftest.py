@@ -0,0 +1,17 @@
+import os
+import sys
+
+# Per-process cache for tests, so they never touch a real shared cache file
+os.environ.setdefault("SHARED_CACHE_BACKEND", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from shared_cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.delete_prefix("")
+    yield
+    cache.delete_prefix("")
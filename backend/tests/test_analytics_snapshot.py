@@ -0,0 +1,59 @@
+import pytest
+
+from analytics_snapshot import ANALYTICS_QUERY_MAX_ROWS, build_query
+
+
+def test_default_query_counts_joined_rows():
+    sql, params, names = build_query({})
+    assert sql == 'SELECT COUNT(*) AS "count" FROM joined ORDER BY "count" DESC NULLS LAST LIMIT ?'
+    assert params == [100]
+    assert names == ["count"]
+
+
+def test_group_metrics_and_filters_use_bound_parameters():
+    sql, params, names = build_query({
+        "dataset": "analytics",
+        "groupBy": ["userId"],
+        "metrics": [{"fn": "sum", "column": "clicks"}, {"fn": "ratio", "numerator": "installs", "denominator": "clicks", "as": "cr"}],
+        "filters": [{"column": "date", "op": ">=", "value": "2024-01-01"}, {"column": "userId", "op": "in", "value": ["a", "b"]}],
+        "orderBy": "cr",
+        "desc": False,
+        "limit": 5,
+    })
+    assert sql == (
+        'SELECT "userId", SUM("clicks") AS "sum_clicks", SUM("installs") / NULLIF(SUM("clicks"), 0) AS "cr" '
+        'FROM analytics WHERE "date" >= ? AND "userId" IN (?, ?) GROUP BY "userId" ORDER BY "cr" ASC NULLS LAST LIMIT ?'
+    )
+    assert params == ["2024-01-01", "a", "b", 5]
+    assert names == ["userId", "sum_clicks", "cr"]
+
+
+def test_limit_is_clamped():
+    assert build_query({"limit": 10 ** 9})[1][-1] == ANALYTICS_QUERY_MAX_ROWS
+    assert build_query({"limit": -3})[1][-1] == 1
+
+
+@pytest.mark.parametrize("spec", [
+    [1],
+    {"dataset": "secrets"},
+    {"dataset": ["joined"]},
+    {"groupBy": ["platform; DROP TABLE users"]},
+    {"groupBy": [["platform"]]},
+    {"groupBy": ["a", "b", "c", "d", "e"]},
+    {"metrics": ["count"]},
+    {"metrics": [{"fn": "median", "column": "clicks"}]},
+    {"metrics": [{"fn": "sum", "column": "platform"}]},
+    {"metrics": [{"fn": "sum", "column": ["clicks"]}]},
+    {"metrics": [{"fn": "count", "as": 'x" --'}]},
+    {"metrics": [{"fn": "count", "as": 5}]},
+    {"filters": [["platform", "=", "x"]]},
+    {"filters": [{"column": "platform", "op": "LIKE", "value": "%"}]},
+    {"filters": [{"column": "platform", "op": "in", "value": []}]},
+    {"filters": [{"column": "platform", "value": {"nested": 1}}]},
+    {"orderBy": "platform"},
+    {"orderBy": ["count"]},
+    {"limit": "lots"},
+])
+def test_malformed_specs_raise_value_error(spec):
+    with pytest.raises(ValueError):
+        build_query(spec)
@@ -0,0 +1,83 @@
+import asyncio
+
+from live_events import EventHub, diff
+
+
+def make_log(epoch, seqs, last=None):
+    events = [{"id": f"{epoch}-{s}", "seq": s, "type": "counters", "data": {"n": s}} for s in seqs]
+    return {"epoch": epoch, "seq": last if last is not None else (seqs[-1] if seqs else 0), "events": events}
+
+
+def test_diff_keeps_only_changed_leaves():
+    old = {"total": 1, "same": 2, "nested": {"a": 1, "b": 2}}
+    new = {"total": 3, "same": 2, "nested": {"a": 1, "b": 5}, "added": 7}
+    assert diff(old, new) == {"total": 3, "nested": {"b": 5}, "added": 7}
+
+
+def test_diff_of_equal_values_is_none():
+    assert diff({"a": {"b": [1, 2]}}, {"a": {"b": [1, 2]}}) is None
+    assert diff(1, 1) is None
+
+
+def test_diff_replaces_non_dict_values_whole():
+    assert diff({"a": [1]}, {"a": [1, 2]}) == {"a": [1, 2]}
+    assert diff(None, {"a": 1}) == {"a": 1}
+
+
+def test_replay_returns_events_after_last_id():
+    log = make_log(100, [3, 4, 5, 6])
+    assert [e["seq"] for e in EventHub()._replay(log, "100-4")] == [5, 6]
+    # Caught up: nothing to replay, but no reset either
+    assert EventHub()._replay(log, "100-6") == []
+    # The oldest kept event is the next one the client needs
+    assert [e["seq"] for e in EventHub()._replay(log, "100-2")] == [3, 4, 5, 6]
+
+
+def test_replay_gives_up_when_events_were_dropped():
+    log = make_log(100, [3, 4, 5, 6])
+    assert EventHub()._replay(log, "100-1") is None
+
+
+def test_replay_rejects_other_epochs_and_bad_ids():
+    log = make_log(100, [1, 2])
+    hub = EventHub()
+    for last_id in ("99-1", "100-x", "garbage", "100-7", None, ""):
+        assert hub._replay(log, last_id) is None
+    assert hub._replay(None, "100-1") is None
+
+
+def test_deliver_fans_out_only_unseen_events():
+    hub = EventHub()
+    queue = asyncio.Queue(10)
+    hub.subscribers.add(queue)
+    hub.deliver(make_log(100, [1, 2]))
+    hub.deliver(make_log(100, [1, 2, 3]))
+    assert [queue.get_nowait()["seq"] for _ in range(queue.qsize())] == [1, 2, 3]
+
+
+def test_deliver_restarts_on_a_new_epoch():
+    hub = EventHub()
+    queue = asyncio.Queue(10)
+    hub.subscribers.add(queue)
+    hub.deliver(make_log(100, [1, 2, 3]))
+    hub.deliver(make_log(200, [1]))
+    assert [(e["id"]) for e in [queue.get_nowait() for _ in range(queue.qsize())]] == ["100-1", "100-2", "100-3", "200-1"]
+    assert (hub.epoch, hub.last_seq) == (200, 1)
+
+
+def test_subscribe_without_resumable_id_starts_from_snapshot():
+    hub = EventHub()
+    hub.publish("counters", {"counts": {"totalAffiliates": 1}})
+    queue, initial = hub.subscribe("0-0", {"counters": {"counts": {"totalAffiliates": 1}}})
+    assert queue is not None
+    assert [e["type"] for e in initial] == ["reset", "counters"]
+    assert initial[0]["data"] == {"reason": "resume"}
+    assert initial[0]["id"] == f"{hub.epoch}-1"
+
+
+def test_subscribe_resumes_with_missed_events():
+    hub = EventHub()
+    first = hub.publish("counters", {"n": 1})
+    hub.publish("stats", {"changed": {"n": 2}})
+    _, initial = hub.subscribe(first["id"], {})
+    assert [e["type"] for e in initial] == ["stats"]
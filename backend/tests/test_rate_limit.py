@@ -0,0 +1,51 @@
+import pytest
+
+import rate_limit
+from rate_limit import Bucket, take_token
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    return now
+
+
+def test_burst_then_reject(clock):
+    bucket = Bucket(per_minute=60, burst=3)
+    results = [take_token("t", bucket)["allowed"] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+
+def test_retry_after_is_time_to_one_token(clock):
+    bucket = Bucket(per_minute=60, burst=1)
+    assert take_token("t", bucket)["allowed"]
+    state = take_token("t", bucket)
+    assert not state["allowed"]
+    assert state["retryAfter"] == pytest.approx(1.0)
+
+
+def test_tokens_refill_at_the_configured_rate(clock):
+    bucket = Bucket(per_minute=30, burst=2)
+    take_token("t", bucket)
+    take_token("t", bucket)
+    clock[0] += 1.0
+    # Half a token after one second at 30/min
+    assert not take_token("t", bucket)["allowed"]
+    clock[0] += 1.0
+    assert take_token("t", bucket)["allowed"]
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = Bucket(per_minute=60, burst=2)
+    take_token("t", bucket)
+    clock[0] += 3600
+    results = [take_token("t", bucket)["allowed"] for _ in range(3)]
+    assert results == [True, True, False]
+
+
+def test_buckets_are_independent_per_key(clock):
+    bucket = Bucket(per_minute=60, burst=1)
+    assert take_token("a", bucket)["allowed"]
+    assert take_token("b", bucket)["allowed"]
+    assert not take_token("a", bucket)["allowed"]
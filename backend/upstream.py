@@ -0,0 +1,46 @@
+"""
+Upstream HTTP client
+One pooled requests.Session for AppTrove and Adjust calls, created on first
+use so importing the API doesn't pull in requests/urllib3 up front.
+Keep-alive also saves a TLS handshake per upstream call.
+"""
+
+import threading
+
+from observability import track_upstream, upstream_name
+from startup import timed_init
+
+_session = None
+_lock = threading.Lock()
+
+
+def session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                with timed_init("upstream http"):
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    _session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+                    _session.mount("https://", adapter)
+                    _session.mount("http://", adapter)
+    return _session
+
+
+def request(method: str, url: str, **kwargs):
+    """session().request, timed and counted per upstream service"""
+    with track_upstream(upstream_name(url), method) as call:
+        response = session().request(method, url, **kwargs)
+        if response.status_code >= 400:
+            call["outcome"] = "error"
+        return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)